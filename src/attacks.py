@@ -0,0 +1,99 @@
+from const import *
+from typing import List, Tuple
+
+'''
+Attack tables shared by Board and BitboardPosition, built once at import.
+
+For every square (sq = row * 8 + col, row 0 is the 8th rank) they hold the squares a
+knight, king or pawn standing there attacks, and the rays a sliding piece follows in
+each of the 8 directions. Every table exists in two forms: lists of (row, col) squares
+for Board (which works on Square objects) and 64-bit masks for BitboardPosition.
+
+Attacks are symmetric, so the same tables answer "which squares can attack sq": a king
+on sq is attacked by a knight on one of KNIGHT_SQUARES[sq], by a pawn of the opposite
+color on one of PAWN_SQUARES[king color][sq], or by the first piece met along a ray.
+'''
+
+
+def square_index(row: int, col: int) -> int:
+    return row * COLS + col
+
+
+KNIGHT_STEPS = [(-2, 1), (-1, 2), (1, 2), (2, 1), (2, -1), (1, -2), (-1, -2), (-2, -1)]
+KING_STEPS = [(-1, -1), (-1, 0), (-1, 1), (0, -1), (0, 1), (1, -1), (1, 0), (1, 1)]
+
+# ray directions as (row_incr, col_incr); 'positive' rays run towards higher square numbers
+NORTH, SOUTH, WEST, EAST, NORTH_WEST, NORTH_EAST, SOUTH_WEST, SOUTH_EAST = range(8)
+DIRECTIONS = [(-1, 0), (1, 0), (0, -1), (0, 1), (-1, -1), (-1, 1), (1, -1), (1, 1)]
+POSITIVE_DIRECTIONS = (SOUTH, EAST, SOUTH_WEST, SOUTH_EAST)
+ROOK_DIRECTIONS = (NORTH, SOUTH, WEST, EAST)
+BISHOP_DIRECTIONS = (NORTH_WEST, NORTH_EAST, SOUTH_WEST, SOUTH_EAST)
+
+
+# for every square: the list of (row, col) squares reached by the given single steps
+def _step_squares(steps: List[Tuple[int, int]]) -> List[List[Tuple[int, int]]]:
+    table = []
+    for sq in range(ROWS * COLS):
+        row, col = divmod(sq, COLS)
+        table.append([(row + row_incr, col + col_incr) for row_incr, col_incr in steps
+                      if 0 <= row + row_incr < ROWS and 0 <= col + col_incr < COLS])
+    return table
+
+# for every square: the (row, col) squares of a ray in one direction, nearest first
+def _ray_squares(row_incr: int, col_incr: int) -> List[List[Tuple[int, int]]]:
+    table = []
+    for sq in range(ROWS * COLS):
+        row, col = divmod(sq, COLS)
+        ray = []
+        r, c = row + row_incr, col + col_incr
+        while 0 <= r < ROWS and 0 <= c < COLS:
+            ray.append((r, c))
+            r, c = r + row_incr, c + col_incr
+        table.append(ray)
+    return table
+
+def _bitboards(square_table: List[List[Tuple[int, int]]]) -> List[int]:
+    return [sum(1 << square_index(row, col) for row, col in squares) for squares in square_table]
+
+# square lists - used by Board, which probes Square objects
+KNIGHT_SQUARES = _step_squares(KNIGHT_STEPS)
+KING_SQUARES = _step_squares(KING_STEPS)
+# squares attacked BY a pawn of the given color standing on sq
+PAWN_SQUARES = {
+    WHITE_PIECE_COLOR: _step_squares([(-1, -1), (-1, 1)]),
+    BLACK_PIECE_COLOR: _step_squares([(1, -1), (1, 1)]),
+}
+RAY_SQUARES = [_ray_squares(row_incr, col_incr) for row_incr, col_incr in DIRECTIONS]
+
+# the same tables as bitboards - used by BitboardPosition
+KNIGHT_ATTACKS = _bitboards(KNIGHT_SQUARES)
+KING_ATTACKS = _bitboards(KING_SQUARES)
+PAWN_ATTACKS = {color: _bitboards(table) for color, table in PAWN_SQUARES.items()}
+RAYS = [_bitboards(table) for table in RAY_SQUARES]
+
+# (ray table, is positive direction) pairs used by the sliding attack functions
+ROOK_RAY_TABLES = [(RAYS[d], d in POSITIVE_DIRECTIONS) for d in ROOK_DIRECTIONS]
+BISHOP_RAY_TABLES = [(RAYS[d], d in POSITIVE_DIRECTIONS) for d in BISHOP_DIRECTIONS]
+# every square a rook / bishop on sq could ever reach - a cheap pre-filter
+ROOK_LINES = [RAYS[NORTH][sq] | RAYS[SOUTH][sq] | RAYS[WEST][sq] | RAYS[EAST][sq] for sq in range(64)]
+BISHOP_LINES = [RAYS[NORTH_WEST][sq] | RAYS[NORTH_EAST][sq] | RAYS[SOUTH_WEST][sq] | RAYS[SOUTH_EAST][sq]
+                for sq in range(64)]
+
+ROW_MASKS = [0xFF << (row * COLS) for row in range(ROWS)]
+COL_A = sum(1 << square_index(row, 0) for row in range(ROWS))
+COL_H = sum(1 << square_index(row, 7) for row in range(ROWS))
+
+# BETWEEN[a][b]: squares strictly between a and b when they share a line or diagonal, 0 otherwise
+# (the squares that block a check from b to a King on a, or that a piece pinned to it may use)
+def _between_table() -> List[List[int]]:
+    table = [[0] * (ROWS * COLS) for _ in range(ROWS * COLS)]
+    for sq in range(ROWS * COLS):
+        for ray in RAY_SQUARES:
+            between = 0
+            for row, col in ray[sq]:
+                target = square_index(row, col)
+                table[sq][target] = between
+                between |= 1 << target
+    return table
+
+BETWEEN = _between_table()
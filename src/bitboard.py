@@ -0,0 +1,874 @@
+from const import *
+from attacks import *
+from zobrist import *
+from evaluation import PSQT, PHASE, tapered_score
+from typing import Dict, List, Optional, Sequence, Tuple
+
+'''
+Bitboard representation of a chess position - the backend the AI search runs on.
+
+Every piece type of every color is kept in a single 64-bit integer (one bit per
+square), plus the occupancy of each color and of the whole board. A 'mailbox'
+list of 64 piece codes answers "what stands on this square" in O(1).
+Piece codes are the same int encoding as Board.squares_fast_method (piece type bit |
+color bit), without the PIECE_MOVED / EN_PASSANT_PAWN state bits - the castling
+rights and the en passant square are kept as separate fields instead.
+
+Squares are numbered like Board.squares: sq = row * 8 + col, where row 0 is the 8th
+rank (black's back rank), so white pawns move towards lower square numbers.
+
+make_move() / unmake_move() mutate the position in place and keep a small undo
+record per move, so search nodes never copy a board and never touch Square or
+Piece objects.
+'''
+
+FULL_BOARD = (1 << 64) - 1
+
+# move flags
+MOVE_NORMAL = 0
+MOVE_DOUBLE_PUSH = 1
+MOVE_EN_PASSANT = 2
+MOVE_CASTLING = 3
+MOVE_PROMOTION = 4 # the engine always promotes to a Queen (as Board.move() does)
+
+# A move is a single int (fits 30 bits, so it can be stored in an array('I') as well):
+#   bits  0-5   promotion piece type (0 if not a promotion)
+#   bits  6-11  captured piece type (0 for quiet moves, PAWN_PIECE for en passant)
+#   bits 12-14  move flag
+#   bits 15-20  destination square
+#   bits 21-26  origin square
+#   bits 27-29  ordering class: 0 = captures a Queen ... 4 = quiet move
+# The ordering class sits in the top bits, so sorting a move list in ascending order puts
+# the captures first, most valuable victim first, and then orders by origin square.
+MOVE_ORDER_SHIFT = 27
+MOVE_FROM_SHIFT = 21
+MOVE_TO_SHIFT = 15
+MOVE_FLAG_SHIFT = 12
+MOVE_CAPTURED_SHIFT = 6
+QUIET_ORDER = 4
+NULL_MOVE = 0 # move of a null-move undo record (no real move encodes to 0: from a8 to a8)
+
+def encode_move(from_sq: int, to_sq: int, flag: int = MOVE_NORMAL, captured: int = 0, promotion: int = 0) -> int:
+    return (CAPTURE_BITS[captured] | (from_sq << MOVE_FROM_SHIFT) | (to_sq << MOVE_TO_SHIFT)
+            | (flag << MOVE_FLAG_SHIFT) | promotion)
+
+def move_from(move: int) -> int:
+    return (move >> MOVE_FROM_SHIFT) & 0x3F
+
+def move_to(move: int) -> int:
+    return (move >> MOVE_TO_SHIFT) & 0x3F
+
+def move_flag(move: int) -> int:
+    return (move >> MOVE_FLAG_SHIFT) & 0x7
+
+def move_captured(move: int) -> int:
+    return (move >> MOVE_CAPTURED_SHIFT) & 0x3F
+
+def move_promotion(move: int) -> int:
+    return move & 0x3F
+
+PIECE_NAMES = {
+    PAWN_PIECE: "pawn",
+    KNIGHT_PIECE: "knight",
+    BISHOP_PIECE: "bishop",
+    ROOK_PIECE: "rook",
+    QUEEN_PIECE: "queen",
+    KING_PIECE: "king",
+}
+
+
+# ordering class + captured type bits of a move, indexed by the captured piece type (0 = quiet)
+_VICTIM_ORDER = {0: QUIET_ORDER, PAWN_PIECE: 3, KNIGHT_PIECE: 2, BISHOP_PIECE: 2, ROOK_PIECE: 1, QUEEN_PIECE: 0}
+CAPTURE_BITS = [0] * (ANY_PIECE + 1)
+for _victim, _order in _VICTIM_ORDER.items():
+    CAPTURE_BITS[_victim] = (_order << MOVE_ORDER_SHIFT) | (_victim << MOVE_CAPTURED_SHIFT)
+QUIET_BITS = CAPTURE_BITS[0]
+PROMOTION_BITS = (MOVE_PROMOTION << MOVE_FLAG_SHIFT) | QUEEN_PIECE
+DOUBLE_PUSH_BITS = MOVE_DOUBLE_PUSH << MOVE_FLAG_SHIFT
+
+
+def square_name(sq: int) -> str:
+    row, col = divmod(sq, COLS)
+    return f"{'abcdefgh'[col]}{ROWS - row}"
+
+def opponent(color: int) -> int:
+    return color ^ WHITE_PIECE_COLOR
+
+
+def _slider_attacks(sq: int, occupied: int, ray_tables) -> int:
+    attacks = 0
+    for rays, positive in ray_tables:
+        ray = rays[sq]
+        blockers = ray & occupied
+        if blockers:
+            # the nearest blocker is the lowest set bit on positive rays, the highest otherwise;
+            # everything behind it is cut off (the blocker itself stays attacked)
+            first = (blockers & -blockers).bit_length() - 1 if positive else blockers.bit_length() - 1
+            ray ^= rays[first]
+        attacks |= ray
+    return attacks
+
+def rook_attacks(sq: int, occupied: int) -> int:
+    return _slider_attacks(sq, occupied, ROOK_RAY_TABLES)
+
+def bishop_attacks(sq: int, occupied: int) -> int:
+    return _slider_attacks(sq, occupied, BISHOP_RAY_TABLES)
+
+
+# material value by piece type for BitboardPosition.see()
+SEE_VALUES = [0.0] * (ANY_PIECE + 1)
+for _piece_type, _value in PIECE_VALUES.items():
+    SEE_VALUES[_piece_type] = _value
+
+# castling: king destination -> (rook origin, rook destination)
+CASTLING_ROOK_MOVES = {
+    square_index(7, 6): (square_index(7, 7), square_index(7, 5)),
+    square_index(7, 2): (square_index(7, 0), square_index(7, 3)),
+    square_index(0, 6): (square_index(0, 7), square_index(0, 5)),
+    square_index(0, 2): (square_index(0, 0), square_index(0, 3)),
+}
+
+# castling rights that survive a move from/to a square (king and rook home squares burn them)
+CASTLING_RIGHTS_MASK = [0xF] * 64
+CASTLING_RIGHTS_MASK[square_index(7, 4)] &= ~(WHITE_KINGSIDE | WHITE_QUEENSIDE)
+CASTLING_RIGHTS_MASK[square_index(7, 7)] &= ~WHITE_KINGSIDE
+CASTLING_RIGHTS_MASK[square_index(7, 0)] &= ~WHITE_QUEENSIDE
+CASTLING_RIGHTS_MASK[square_index(0, 4)] &= ~(BLACK_KINGSIDE | BLACK_QUEENSIDE)
+CASTLING_RIGHTS_MASK[square_index(0, 7)] &= ~BLACK_KINGSIDE
+CASTLING_RIGHTS_MASK[square_index(0, 0)] &= ~BLACK_QUEENSIDE
+
+
+class BitboardPosition:
+    def __init__(self):
+        # bitboards are indexed directly by piece code (e.g. KNIGHT_PIECE | WHITE_PIECE_COLOR)
+        self.bitboards: List[int] = [0] * ((KING_PIECE | WHITE_PIECE_COLOR) + 1)
+        self.occupancy = {WHITE_PIECE_COLOR: 0, BLACK_PIECE_COLOR: 0}
+        self.occupied: int = 0
+        self.mailbox: List[int] = [0] * (ROWS * COLS)
+        self.side_to_move: int = WHITE_PIECE_COLOR
+        self.castling_rights: int = 0
+        self.en_passant_square: int = -1 # square a pawn captures to en passant, -1 if none
+        self.halfmove_clock: int = 0 # plies since the last pawn move or capture
+        self.zobrist_key: int = 0 # Zobrist key (zobrist.py), updated incrementally by make_move()
+        # packed material + piece-square sum and game phase (evaluation.py), updated
+        # incrementally by make_move() like the Zobrist key
+        self.psqt: int = 0
+        self.phase: int = 0
+        self.history: List[tuple] = [] # undo records of the moves made so far
+        self.game_keys: List[int] = [] # Zobrist keys of the game positions before this one (oldest first)
+        self._scratch_moves: List[int] = [] # move buffer of has_any_valid_move()
+
+    # Builds the bitboards from Board.squares_fast_method, which also carries the moved
+    # and en passant flags the castling rights and the en passant square are derived from.
+    # 'game_keys' are the keys of the positions played before (Game.position_history without
+    # the current one), so the search also sees repetitions of the game's positions.
+    @classmethod
+    def from_board(cls, board, side_to_move: int, game_keys: Sequence[int] = ()) -> 'BitboardPosition':
+        position = cls()
+        position.game_keys = list(game_keys)
+        fast = board.squares_fast_method
+        for row in range(ROWS):
+            for col in range(COLS):
+                code = fast[row][col]
+                if code & ANY_PIECE:
+                    position.put_piece(code & (ANY_PIECE | WHITE_PIECE_COLOR), square_index(row, col))
+                    if code & EN_PASSANT_PAWN:
+                        # the square the pawn skipped over
+                        behind = row + 1 if code & WHITE_PIECE_COLOR else row - 1
+                        position.en_passant_square = square_index(behind, col)
+
+        position.castling_rights = board.castling_rights()
+
+        state = board.current_state
+        last_irreversible = max(state.last_move_when_pawn_moved, state.last_move_when_piece_captured)
+        position.halfmove_clock = max(0, state.move_count - last_irreversible - 1)
+        position.side_to_move = side_to_move
+        position.zobrist_key = position.compute_zobrist_key()
+        position.psqt, position.phase = position.compute_evaluation()
+        return position
+
+    # Full Zobrist key of the position; make_move() keeps zobrist_key up to date incrementally
+    # with the same keys (equal to Board.compute_zobrist_key() for the same position)
+    def compute_zobrist_key(self) -> int:
+        key = CASTLING_KEYS[self.castling_rights]
+        for sq, code in enumerate(self.mailbox):
+            key ^= PIECE_KEYS[code][sq]
+        if self.en_passant_square >= 0:
+            key ^= EN_PASSANT_KEYS[self.en_passant_square & 7]
+        if self.side_to_move == BLACK_PIECE_COLOR:
+            key ^= SIDE_KEY
+        return key
+
+    # Full packed material + piece-square sum and game phase; make_move() keeps psqt and
+    # phase up to date incrementally
+    def compute_evaluation(self):
+        psqt = phase = 0
+        for sq, code in enumerate(self.mailbox):
+            psqt += PSQT[code][sq]
+            phase += PHASE[code]
+        return psqt, phase
+
+    def put_piece(self, code: int, sq: int):
+        bit = 1 << sq
+        self.bitboards[code] |= bit
+        self.occupancy[code & WHITE_PIECE_COLOR] |= bit
+        self.occupied |= bit
+        self.mailbox[sq] = code
+
+    def king_square(self, color: int) -> int:
+        return self.bitboards[KING_PIECE | color].bit_length() - 1
+
+    ########################################################################
+    # Attack detection
+
+    # True if square 'sq' is attacked by any piece of color 'by_color'; 'occupied' may
+    # override the board occupancy (e.g. without the King that is about to step away)
+    def is_square_attacked(self, sq: int, by_color: int, occupied: int = -1) -> bool:
+        bitboards = self.bitboards
+        if KNIGHT_ATTACKS[sq] & bitboards[KNIGHT_PIECE | by_color]:
+            return True
+        # a 'by_color' pawn attacks sq from the squares an opposite-color pawn on sq would attack
+        if PAWN_ATTACKS[by_color ^ WHITE_PIECE_COLOR][sq] & bitboards[PAWN_PIECE | by_color]:
+            return True
+        if KING_ATTACKS[sq] & bitboards[KING_PIECE | by_color]:
+            return True
+        if occupied < 0:
+            occupied = self.occupied
+        queens = bitboards[QUEEN_PIECE | by_color]
+        straight = (bitboards[ROOK_PIECE | by_color] | queens) & ROOK_LINES[sq]
+        if straight and rook_attacks(sq, occupied) & straight:
+            return True
+        diagonal = (bitboards[BISHOP_PIECE | by_color] | queens) & BISHOP_LINES[sq]
+        if diagonal and bishop_attacks(sq, occupied) & diagonal:
+            return True
+        return False
+
+    # bitboard of all pieces of color 'by_color' attacking square 'sq'
+    def attackers_of(self, sq: int, by_color: int) -> int:
+        bitboards = self.bitboards
+        occupied = self.occupied
+        queens = bitboards[QUEEN_PIECE | by_color]
+        return ((KNIGHT_ATTACKS[sq] & bitboards[KNIGHT_PIECE | by_color])
+                | (PAWN_ATTACKS[by_color ^ WHITE_PIECE_COLOR][sq] & bitboards[PAWN_PIECE | by_color])
+                | (KING_ATTACKS[sq] & bitboards[KING_PIECE | by_color])
+                | (rook_attacks(sq, occupied) & (bitboards[ROOK_PIECE | by_color] | queens))
+                | (bishop_attacks(sq, occupied) & (bitboards[BISHOP_PIECE | by_color] | queens)))
+
+    # True if the King of color 'color' is in check in the current position
+    def is_king_checked(self, color: int) -> bool:
+        return self.is_square_attacked(self.king_square(color), color ^ WHITE_PIECE_COLOR)
+
+    # Pieces of color 'us' pinned to their King: returns (pinned bitboard, {square: allowed squares}).
+    # A pinned piece may only move along the line between its King and the pinner (capturing
+    # the pinner included) - anything else would expose the King.
+    def pinned_pieces(self, us: int, king_sq: int):
+        bitboards = self.bitboards
+        them = us ^ WHITE_PIECE_COLOR
+        own = self.occupancy[us]
+        occupied = self.occupied
+        queens = bitboards[QUEEN_PIECE | them]
+        snipers = (((bitboards[ROOK_PIECE | them] | queens) & ROOK_LINES[king_sq])
+                   | ((bitboards[BISHOP_PIECE | them] | queens) & BISHOP_LINES[king_sq]))
+        pinned = 0
+        pin_rays = {}
+        between_king = BETWEEN[king_sq]
+        while snipers:
+            bit = snipers & -snipers
+            snipers ^= bit
+            sniper_sq = bit.bit_length() - 1
+            blockers = between_king[sniper_sq] & occupied
+            # exactly one piece in between, and it is ours
+            if blockers and not blockers & (blockers - 1) and blockers & own:
+                pinned |= blockers
+                pin_rays[blockers.bit_length() - 1] = between_king[sniper_sq] | bit
+        return pinned, pin_rays
+
+    # Static exchange evaluation: material balance (in pawns, for the side to move) of
+    # 'move' followed by the whole sequence of captures on its destination square, each
+    # side recapturing with its least valuable piece and free to stop when that is better.
+    # Sliders behind the pieces that captured (x-rays) join in as the square opens up.
+    def see(self, move: int) -> float:
+        bitboards = self.bitboards
+        from_sq = (move >> 21) & 0x3F # literal shifts: see _generate_moves()
+        to_sq = (move >> 15) & 0x3F
+        occupied = self.occupied ^ (1 << from_sq)
+        gains = [SEE_VALUES[(move >> 6) & 0x3F]]
+        attacker_value = SEE_VALUES[self.mailbox[from_sq] & ANY_PIECE]
+        if move & 0x3F: # promotion
+            gains[0] += SEE_VALUES[QUEEN_PIECE] - SEE_VALUES[PAWN_PIECE]
+            attacker_value = SEE_VALUES[QUEEN_PIECE]
+        if (move >> 12) & 0x7 == MOVE_EN_PASSANT:
+            occupied ^= 1 << (to_sq + 8 if self.side_to_move == WHITE_PIECE_COLOR else to_sq - 8)
+
+        # attackers of both colors that do not depend on the occupancy, and the sliders
+        stepping = ((KNIGHT_ATTACKS[to_sq] & (bitboards[KNIGHT_PIECE | WHITE_PIECE_COLOR]
+                                              | bitboards[KNIGHT_PIECE | BLACK_PIECE_COLOR]))
+                    | (KING_ATTACKS[to_sq] & (bitboards[KING_PIECE | WHITE_PIECE_COLOR]
+                                              | bitboards[KING_PIECE | BLACK_PIECE_COLOR]))
+                    | (PAWN_ATTACKS[BLACK_PIECE_COLOR][to_sq] & bitboards[PAWN_PIECE | WHITE_PIECE_COLOR])
+                    | (PAWN_ATTACKS[WHITE_PIECE_COLOR][to_sq] & bitboards[PAWN_PIECE | BLACK_PIECE_COLOR]))
+        queens = bitboards[QUEEN_PIECE | WHITE_PIECE_COLOR] | bitboards[QUEEN_PIECE | BLACK_PIECE_COLOR]
+        straight = (bitboards[ROOK_PIECE | WHITE_PIECE_COLOR] | bitboards[ROOK_PIECE | BLACK_PIECE_COLOR] | queens) \
+            & ROOK_LINES[to_sq]
+        diagonal = (bitboards[BISHOP_PIECE | WHITE_PIECE_COLOR] | bitboards[BISHOP_PIECE | BLACK_PIECE_COLOR]
+                    | queens) & BISHOP_LINES[to_sq]
+
+        side = self.side_to_move ^ WHITE_PIECE_COLOR
+        while True:
+            # gain of the side to capture next, if it takes the piece that just captured
+            gains.append(attacker_value - gains[-1])
+            if max(-gains[-2], gains[-1]) < 0:
+                break # neither side can improve by going on
+            attackers = (stepping | (rook_attacks(to_sq, occupied) & straight)
+                         | (bishop_attacks(to_sq, occupied) & diagonal)) & occupied
+            own = attackers & self.occupancy[side]
+            if not own:
+                break
+            for piece_type in PIECE_TYPES: # least valuable attacker first
+                pieces = own & bitboards[piece_type | side]
+                if pieces:
+                    break
+            if piece_type == KING_PIECE and attackers & ~own:
+                break # the King cannot capture into a defended square
+            occupied ^= pieces & -pieces
+            attacker_value = SEE_VALUES[piece_type]
+            side ^= WHITE_PIECE_COLOR
+        # the last speculative gain has no capture behind it; each side stops when it is ahead
+        for index in range(len(gains) - 2, 0, -1):
+            gains[index - 1] = -max(-gains[index - 1], gains[index])
+        return gains[0]
+
+    # Squares from which a piece of the side to move would give check, and the pieces of the
+    # side to move whose departure may uncover a check: returns ({piece code: squares},
+    # discoverers bitboard). A normal move gives check only if its destination is among the
+    # squares of the moved piece or it moves a discoverer - en passant, castling and
+    # promotion moves are not covered.
+    def check_threats(self):
+        bitboards = self.bitboards
+        us = self.side_to_move
+        them = us ^ WHITE_PIECE_COLOR
+        king_sq = self.king_square(them)
+        occupied = self.occupied
+        diagonal = bishop_attacks(king_sq, occupied)
+        straight = rook_attacks(king_sq, occupied)
+        checks = {PAWN_PIECE | us: PAWN_ATTACKS[them][king_sq], KNIGHT_PIECE | us: KNIGHT_ATTACKS[king_sq],
+                  BISHOP_PIECE | us: diagonal, ROOK_PIECE | us: straight, QUEEN_PIECE | us: diagonal | straight,
+                  KING_PIECE | us: 0}
+        queens = bitboards[QUEEN_PIECE | us]
+        snipers = (((bitboards[ROOK_PIECE | us] | queens) & ROOK_LINES[king_sq])
+                   | ((bitboards[BISHOP_PIECE | us] | queens) & BISHOP_LINES[king_sq]))
+        discoverers = 0
+        between_king = BETWEEN[king_sq]
+        own = self.occupancy[us]
+        while snipers:
+            bit = snipers & -snipers
+            snipers ^= bit
+            blockers = between_king[bit.bit_length() - 1] & occupied
+            # exactly one piece in between, and it is ours
+            if blockers and not blockers & (blockers - 1) and blockers & own:
+                discoverers |= blockers
+        return checks, discoverers
+
+    ########################################################################
+    # Move generation
+
+    # all pseudo-legal moves of the side to move (own king safety not verified yet)
+    def generate_pseudo_moves(self, moves: Optional[List[int]] = None) -> List[int]:
+        return self._generate_moves(False, [] if moves is None else moves)
+
+    # all legal moves of the side to move
+    # OPTIMIZATION: pins and checkers are computed once per position, so only legal moves are
+    # emitted - no make / is_king_checked / unmake probe per candidate move (only en passant,
+    # which removes two pieces from a line at once, is still verified that way)
+    # 'moves' is an optional buffer to fill (cleared first) - the search passes one reused
+    # list per ply instead of allocating a new one for every node
+    def generate_legal_moves(self, moves: Optional[List[int]] = None) -> List[int]:
+        return self._generate_moves(True, [] if moves is None else moves)
+
+    # legal captures (en passant included) and Queen promotions of the side to move - the
+    # moves of the quiescence search
+    def generate_legal_captures(self, moves: Optional[List[int]] = None) -> List[int]:
+        return self._generate_moves(True, [] if moves is None else moves, captures_only=True)
+
+    # the other legal moves: non-capturing moves except Queen promotions, castling included -
+    # generate_legal_captures() + generate_legal_quiets() are all legal moves
+    def generate_legal_quiets(self, moves: Optional[List[int]] = None) -> List[int]:
+        return self._generate_moves(True, [] if moves is None else moves, quiets_only=True)
+
+    # True if the side to move has any legal move
+    def has_any_valid_move(self) -> bool:
+        return bool(self._generate_moves(True, self._scratch_moves))
+
+    # True if 'move' is a legal move of the side to move. For a move taken from elsewhere
+    # than the generator of this position (a killer move of a sibling node, a table move):
+    # the piece, the captured piece and the flags must be those the generator would encode,
+    # and the destination reachable; King safety is verified by making the move.
+    # OPTIMIZATION: checks one move instead of generating all of them to look it up
+    def is_legal_move(self, move: int) -> bool:
+        from_sq = (move >> 21) & 0x3F
+        to_sq = (move >> 15) & 0x3F
+        flag = (move >> 12) & 0x7
+        mailbox = self.mailbox
+        us = self.side_to_move
+        piece = mailbox[from_sq]
+        target = mailbox[to_sq]
+        if not piece or piece & WHITE_PIECE_COLOR != us or move == NULL_MOVE:
+            return False
+        if target and (target & WHITE_PIECE_COLOR == us or target & KING_PIECE):
+            return False
+        if flag == MOVE_CASTLING:
+            castling_moves: List[int] = []
+            self._append_castling_moves(castling_moves.append, us, self.king_square(us))
+            return move in castling_moves
+        piece_type = piece & ANY_PIECE
+        to_bit = 1 << to_sq
+        if piece_type == PAWN_PIECE:
+            push = -8 if us == WHITE_PIECE_COLOR else 8
+            if flag == MOVE_EN_PASSANT:
+                reachable = to_sq == self.en_passant_square and PAWN_ATTACKS[us][from_sq] & to_bit
+                expected = encode_move(from_sq, to_sq, MOVE_EN_PASSANT, PAWN_PIECE)
+            elif flag == MOVE_DOUBLE_PUSH:
+                home_row = ROW_MASKS[6] if us == WHITE_PIECE_COLOR else ROW_MASKS[1]
+                reachable = to_sq == from_sq + 2 * push and home_row >> from_sq & 1 \
+                    and not mailbox[from_sq + push] and not target
+                expected = encode_move(from_sq, to_sq, MOVE_DOUBLE_PUSH)
+            else:
+                reachable = PAWN_ATTACKS[us][from_sq] & to_bit if target else to_sq == from_sq + push
+                if to_bit & (ROW_MASKS[0] | ROW_MASKS[7]):
+                    expected = encode_move(from_sq, to_sq, MOVE_PROMOTION, target & ANY_PIECE, QUEEN_PIECE)
+                else:
+                    expected = encode_move(from_sq, to_sq, MOVE_NORMAL, target & ANY_PIECE)
+        else:
+            if piece_type == KNIGHT_PIECE:
+                attacked = KNIGHT_ATTACKS[from_sq]
+            elif piece_type == BISHOP_PIECE:
+                attacked = bishop_attacks(from_sq, self.occupied)
+            elif piece_type == ROOK_PIECE:
+                attacked = rook_attacks(from_sq, self.occupied)
+            elif piece_type == QUEEN_PIECE:
+                attacked = rook_attacks(from_sq, self.occupied) | bishop_attacks(from_sq, self.occupied)
+            else:
+                attacked = KING_ATTACKS[from_sq]
+            reachable = attacked & to_bit
+            expected = encode_move(from_sq, to_sq, MOVE_NORMAL, target & ANY_PIECE)
+        if not reachable or move != expected:
+            return False
+        self.make_move(move)
+        exposed = self.is_king_checked(us)
+        self.unmake_move()
+        return not exposed
+
+    def _generate_moves(self, legal: bool, moves: List[int], captures_only: bool = False,
+                        quiets_only: bool = False) -> List[int]:
+        # NOTE: the move field shifts are written as literals (21 = MOVE_FROM_SHIFT, 15 = MOVE_TO_SHIFT)
+        # in this hot loop - a module global lookup per generated move is measurably slower
+        moves.clear()
+        append = moves.append
+        us = self.side_to_move
+        them = us ^ WHITE_PIECE_COLOR
+        bitboards = self.bitboards
+        mailbox = self.mailbox
+        own = self.occupancy[us]
+        occupied = self.occupied
+        king_sq = self.king_square(us)
+        # the enemy king is never a capture target (Board.calc_moves() never generates it either)
+        enemy = self.occupancy[them] & ~bitboards[KING_PIECE | them]
+        empty = ~occupied & FULL_BOARD
+        targets = ~own & ~bitboards[KING_PIECE | them] & FULL_BOARD
+        if captures_only:
+            targets = enemy
+        elif quiets_only:
+            targets = empty
+
+        # legal mode: 'evasion' limits non-King moves to capturing / blocking a single checker,
+        # pinned pieces are limited to their pin ray
+        pinned = 0
+        pin_rays: Dict[int, int] = {} # read only for the pinned pieces, none without 'legal'
+        evasion = FULL_BOARD
+        checkers = 0
+        if legal:
+            checkers = self.attackers_of(king_sq, them)
+            if checkers:
+                if checkers & (checkers - 1):
+                    # double check: only the King can move
+                    self._append_king_moves(append, us, king_sq, targets, legal)
+                    return moves
+                evasion = checkers | BETWEEN[king_sq][checkers.bit_length() - 1]
+            pinned, pin_rays = self.pinned_pieces(us, king_sq)
+
+        # pawns
+        pawns = bitboards[PAWN_PIECE | us]
+        captures: Tuple[Tuple[int, int], ...] # (target squares, from-square offset) per direction
+        if us == WHITE_PIECE_COLOR:
+            single = (pawns >> 8) & empty
+            double = ((single & ROW_MASKS[5]) >> 8) & empty
+            captures = (((pawns & ~COL_A) >> 9) & enemy, 9), (((pawns & ~COL_H) >> 7) & enemy, 7)
+            push, promotion_row = 8, ROW_MASKS[0]
+        else:
+            single = (pawns << 8) & empty
+            double = ((single & ROW_MASKS[2]) << 8) & empty
+            captures = (((pawns & ~COL_A) << 7) & enemy, -7), (((pawns & ~COL_H) << 9) & enemy, -9)
+            push, promotion_row = -8, ROW_MASKS[7]
+        single &= evasion
+        double &= evasion
+        if captures_only:
+            single &= promotion_row
+            double = 0
+        elif quiets_only:
+            single &= ~promotion_row
+            captures = ()
+        while single:
+            bit = single & -single
+            single ^= bit
+            to_sq = bit.bit_length() - 1
+            from_sq = to_sq + push
+            if pinned >> from_sq & 1 and not pin_rays[from_sq] & bit:
+                continue
+            append(QUIET_BITS | (from_sq << 21) | (to_sq << 15)
+                   | (PROMOTION_BITS if bit & promotion_row else 0))
+        while double:
+            bit = double & -double
+            double ^= bit
+            to_sq = bit.bit_length() - 1
+            from_sq = to_sq + 2 * push
+            if pinned >> from_sq & 1 and not pin_rays[from_sq] & bit:
+                continue
+            append(QUIET_BITS | (from_sq << 21) | (to_sq << 15)
+                   | DOUBLE_PUSH_BITS)
+        for attacked, offset in captures:
+            attacked &= evasion
+            while attacked:
+                bit = attacked & -attacked
+                attacked ^= bit
+                to_sq = bit.bit_length() - 1
+                from_sq = to_sq + offset
+                if pinned >> from_sq & 1 and not pin_rays[from_sq] & bit:
+                    continue
+                append(CAPTURE_BITS[mailbox[to_sq] & ANY_PIECE] | (from_sq << 21)
+                       | (to_sq << 15) | (PROMOTION_BITS if bit & promotion_row else 0))
+        if self.en_passant_square >= 0 and not quiets_only:
+            attackers = PAWN_ATTACKS[them][self.en_passant_square] & pawns
+            while attackers:
+                bit = attackers & -attackers
+                attackers ^= bit
+                move = encode_move(bit.bit_length() - 1, self.en_passant_square, MOVE_EN_PASSANT, PAWN_PIECE)
+                if legal:
+                    # rare edge cases (the captured pawn gives check, both pawns leave a rank
+                    # the King is on) - verify by making the move
+                    self.make_move(move)
+                    exposed = self.is_king_checked(us)
+                    self.unmake_move()
+                    if exposed:
+                        continue
+                append(move)
+
+        # knights, bishops, rooks, queens
+        piece_targets = targets & evasion
+        for piece_type in (KNIGHT_PIECE, BISHOP_PIECE, ROOK_PIECE, QUEEN_PIECE):
+            pieces = bitboards[piece_type | us]
+            while pieces:
+                bit = pieces & -pieces
+                pieces ^= bit
+                from_sq = bit.bit_length() - 1
+                if piece_type == KNIGHT_PIECE:
+                    if bit & pinned: # a pinned knight can never stay on the pin ray
+                        continue
+                    attacked = KNIGHT_ATTACKS[from_sq]
+                elif piece_type == BISHOP_PIECE:
+                    attacked = bishop_attacks(from_sq, occupied)
+                elif piece_type == ROOK_PIECE:
+                    attacked = rook_attacks(from_sq, occupied)
+                else:
+                    attacked = rook_attacks(from_sq, occupied) | bishop_attacks(from_sq, occupied)
+                attacked &= piece_targets
+                if bit & pinned:
+                    attacked &= pin_rays[from_sq]
+                from_bits = from_sq << 21
+                while attacked:
+                    to_bit = attacked & -attacked
+                    attacked ^= to_bit
+                    to_sq = to_bit.bit_length() - 1
+                    append(CAPTURE_BITS[mailbox[to_sq] & ANY_PIECE] | from_bits | (to_sq << 15))
+
+        self._append_king_moves(append, us, king_sq, targets, legal)
+        if not checkers and not captures_only:
+            self._append_castling_moves(append, us, king_sq)
+        return moves
+
+    def _append_king_moves(self, append, us: int, king_sq: int, targets: int, legal: bool):
+        them = us ^ WHITE_PIECE_COLOR
+        mailbox = self.mailbox
+        attacked = KING_ATTACKS[king_sq] & targets
+        # the King must not stay on a line it is checked along, so it is removed from the occupancy
+        occupied = self.occupied ^ (1 << king_sq)
+        from_bits = king_sq << 21
+        while attacked:
+            to_bit = attacked & -attacked
+            attacked ^= to_bit
+            to_sq = to_bit.bit_length() - 1
+            if legal and self.is_square_attacked(to_sq, them, occupied):
+                continue
+            append(CAPTURE_BITS[mailbox[to_sq] & ANY_PIECE] | from_bits | (to_sq << 15))
+
+    def _append_castling_moves(self, append, us: int, king_sq: int):
+        if us == WHITE_PIECE_COLOR:
+            rights = self.castling_rights & (WHITE_KINGSIDE | WHITE_QUEENSIDE)
+            kingside, queenside, row = WHITE_KINGSIDE, WHITE_QUEENSIDE, 7
+        else:
+            rights = self.castling_rights & (BLACK_KINGSIDE | BLACK_QUEENSIDE)
+            kingside, queenside, row = BLACK_KINGSIDE, BLACK_QUEENSIDE, 0
+        if not rights:
+            return
+        them = us ^ WHITE_PIECE_COLOR
+        # castling is not allowed out of check, through an attacked square or into check
+        if self.is_square_attacked(king_sq, them):
+            return
+        occupied = self.occupied
+        f, g = square_index(row, 5), square_index(row, 6)
+        if rights & kingside and not occupied & ((1 << f) | (1 << g)):
+            if not self.is_square_attacked(f, them) and not self.is_square_attacked(g, them):
+                append(encode_move(king_sq, g, MOVE_CASTLING))
+        b, c, d = square_index(row, 1), square_index(row, 2), square_index(row, 3)
+        if rights & queenside and not occupied & ((1 << b) | (1 << c) | (1 << d)):
+            if not self.is_square_attacked(d, them) and not self.is_square_attacked(c, them):
+                append(encode_move(king_sq, c, MOVE_CASTLING))
+
+    ########################################################################
+    # Make / unmake
+
+    def make_move(self, move: int):
+        from_sq = (move >> 21) & 0x3F # literal shifts: see _generate_moves()
+        to_sq = (move >> 15) & 0x3F
+        flag = (move >> 12) & 0x7
+        bitboards = self.bitboards
+        occupancy = self.occupancy
+        mailbox = self.mailbox
+        us = self.side_to_move
+        them = us ^ WHITE_PIECE_COLOR
+        piece = mailbox[from_sq]
+        captured = mailbox[to_sq]
+        self.history.append((move, captured, self.castling_rights, self.en_passant_square, self.halfmove_clock,
+                             self.zobrist_key, self.psqt, self.phase))
+        key = self.zobrist_key ^ SIDE_KEY ^ PIECE_KEYS[piece][from_sq] ^ PIECE_KEYS[piece][to_sq]
+        # OPTIMIZATION: the evaluation terms change like the key - per piece moved, captured
+        # or promoted - so the static score never needs a board scan
+        piece_values = PSQT[piece]
+        psqt = self.psqt - piece_values[from_sq] + piece_values[to_sq]
+
+        from_bit = 1 << from_sq
+        to_bit = 1 << to_sq
+        if captured:
+            bitboards[captured] ^= to_bit
+            occupancy[them] ^= to_bit
+            key ^= PIECE_KEYS[captured][to_sq]
+            psqt -= PSQT[captured][to_sq]
+            self.phase -= PHASE[captured]
+        elif flag == MOVE_EN_PASSANT:
+            victim_sq = to_sq + 8 if us == WHITE_PIECE_COLOR else to_sq - 8
+            victim_bit = 1 << victim_sq
+            bitboards[PAWN_PIECE | them] ^= victim_bit
+            occupancy[them] ^= victim_bit
+            mailbox[victim_sq] = 0
+            key ^= PIECE_KEYS[PAWN_PIECE | them][victim_sq]
+            psqt -= PSQT[PAWN_PIECE | them][victim_sq]
+
+        move_bits = from_bit | to_bit
+        bitboards[piece] ^= move_bits
+        occupancy[us] ^= move_bits
+        mailbox[from_sq] = 0
+        mailbox[to_sq] = piece
+
+        if flag == MOVE_PROMOTION:
+            promoted = (move & 0x3F) | us
+            bitboards[piece] ^= to_bit
+            bitboards[promoted] |= to_bit
+            mailbox[to_sq] = promoted
+            key ^= PIECE_KEYS[piece][to_sq] ^ PIECE_KEYS[promoted][to_sq]
+            psqt += PSQT[promoted][to_sq] - piece_values[to_sq]
+            self.phase += PHASE[promoted]
+        elif flag == MOVE_CASTLING:
+            rook_from, rook_to = CASTLING_ROOK_MOVES[to_sq]
+            rook = ROOK_PIECE | us
+            rook_bits = (1 << rook_from) | (1 << rook_to)
+            bitboards[rook] ^= rook_bits
+            occupancy[us] ^= rook_bits
+            mailbox[rook_from] = 0
+            mailbox[rook_to] = rook
+            key ^= PIECE_KEYS[rook][rook_from] ^ PIECE_KEYS[rook][rook_to]
+            psqt += PSQT[rook][rook_to] - PSQT[rook][rook_from]
+
+        rights = self.castling_rights
+        self.castling_rights &= CASTLING_RIGHTS_MASK[from_sq] & CASTLING_RIGHTS_MASK[to_sq]
+        if rights != self.castling_rights:
+            key ^= CASTLING_KEYS[rights] ^ CASTLING_KEYS[self.castling_rights]
+        if self.en_passant_square >= 0:
+            key ^= EN_PASSANT_KEYS[self.en_passant_square & 7]
+        if flag == MOVE_DOUBLE_PUSH:
+            self.en_passant_square = (from_sq + to_sq) >> 1
+            key ^= EN_PASSANT_KEYS[to_sq & 7]
+        else:
+            self.en_passant_square = -1
+        self.zobrist_key = key
+        self.psqt = psqt
+        if captured or piece & PAWN_PIECE:
+            self.halfmove_clock = 0
+        else:
+            self.halfmove_clock += 1
+        self.occupied = occupancy[WHITE_PIECE_COLOR] | occupancy[BLACK_PIECE_COLOR]
+        self.side_to_move = them
+
+    def unmake_move(self):
+        (move, captured, self.castling_rights, self.en_passant_square, self.halfmove_clock, self.zobrist_key,
+         self.psqt, self.phase) = self.history.pop()
+        from_sq = (move >> 21) & 0x3F # literal shifts: see _generate_moves()
+        to_sq = (move >> 15) & 0x3F
+        flag = (move >> 12) & 0x7
+        bitboards = self.bitboards
+        occupancy = self.occupancy
+        mailbox = self.mailbox
+        them = self.side_to_move
+        us = them ^ WHITE_PIECE_COLOR
+        self.side_to_move = us
+
+        from_bit = 1 << from_sq
+        to_bit = 1 << to_sq
+        piece = mailbox[to_sq]
+        if flag == MOVE_PROMOTION:
+            bitboards[piece] ^= to_bit
+            piece = PAWN_PIECE | us
+            bitboards[piece] |= to_bit
+        elif flag == MOVE_CASTLING:
+            rook_from, rook_to = CASTLING_ROOK_MOVES[to_sq]
+            rook = ROOK_PIECE | us
+            rook_bits = (1 << rook_from) | (1 << rook_to)
+            bitboards[rook] ^= rook_bits
+            occupancy[us] ^= rook_bits
+            mailbox[rook_to] = 0
+            mailbox[rook_from] = rook
+
+        move_bits = from_bit | to_bit
+        bitboards[piece] ^= move_bits
+        occupancy[us] ^= move_bits
+        mailbox[from_sq] = piece
+        mailbox[to_sq] = captured
+
+        if captured:
+            bitboards[captured] |= to_bit
+            occupancy[them] |= to_bit
+        elif flag == MOVE_EN_PASSANT:
+            victim_sq = to_sq + 8 if us == WHITE_PIECE_COLOR else to_sq - 8
+            victim_bit = 1 << victim_sq
+            bitboards[PAWN_PIECE | them] |= victim_bit
+            occupancy[them] |= victim_bit
+            mailbox[victim_sq] = PAWN_PIECE | them
+        self.occupied = occupancy[WHITE_PIECE_COLOR] | occupancy[BLACK_PIECE_COLOR]
+
+    # Passes the turn (null-move pruning in the search): only the side to move changes and
+    # the en passant square is cleared. The undo record carries NULL_MOVE, so the search can
+    # tell a null move from a real one (e.g. never two null moves in a row). The halfmove
+    # clock restarts like after an irreversible move: a position before a null move is
+    # never a repetition of one after it. Undone only by unmake_null_move().
+    def make_null_move(self):
+        self.history.append((NULL_MOVE, 0, self.castling_rights, self.en_passant_square, self.halfmove_clock,
+                             self.zobrist_key, self.psqt, self.phase))
+        key = self.zobrist_key ^ SIDE_KEY
+        if self.en_passant_square >= 0:
+            key ^= EN_PASSANT_KEYS[self.en_passant_square & 7]
+            self.en_passant_square = -1
+        self.zobrist_key = key
+        self.halfmove_clock = 0
+        self.side_to_move ^= WHITE_PIECE_COLOR
+
+    def unmake_null_move(self):
+        _, _, self.castling_rights, self.en_passant_square, self.halfmove_clock, self.zobrist_key, _, _ \
+            = self.history.pop()
+        self.side_to_move ^= WHITE_PIECE_COLOR
+
+    # True if 'color' has a piece other than pawns and the King - without one, zugzwang
+    # (every move makes the position worse) is common and passing the turn is no test
+    def has_non_pawn_material(self, color: int) -> bool:
+        bitboards = self.bitboards
+        return bool(bitboards[KNIGHT_PIECE | color] | bitboards[BISHOP_PIECE | color]
+                    | bitboards[ROOK_PIECE | color] | bitboards[QUEEN_PIECE | color])
+
+    ########################################################################
+    # Evaluation and draw rules
+
+    # Returns score of the current position in pawns (white positive): material and
+    # piece-square values blended by game phase (evaluation.py) - same values as
+    # Board.calculate_piece_score()
+    # OPTIMIZATION: reads the incrementally updated psqt / phase - a few int operations
+    def calculate_piece_score(self) -> float:
+        return tapered_score(self.psqt, self.phase)
+
+    # Same rule as Board.check_insufficient_mating_material(): K vs K, K vs K+B, K vs K+Kn
+    def check_insufficient_mating_material(self) -> bool:
+        pieces_count = self.occupied.bit_count()
+        if pieces_count == 2:
+            return True
+        if pieces_count == 3:
+            bitboards = self.bitboards
+            return bool(bitboards[BISHOP_PIECE | WHITE_PIECE_COLOR] | bitboards[KNIGHT_PIECE | WHITE_PIECE_COLOR]
+                        | bitboards[BISHOP_PIECE | BLACK_PIECE_COLOR] | bitboards[KNIGHT_PIECE | BLACK_PIECE_COLOR])
+        return False
+
+    # Draw by material signature: neither side can force mate - no pawns, Rooks or Queens,
+    # and at most one minor piece per side (K vs K, K+minor vs K, K+minor vs K+minor) or
+    # two Knights against the bare King. Wider than check_insufficient_mating_material()
+    # (the rule the game is adjudicated by): the search scores these positions 0 instead
+    # of searching for a mate that cannot be forced.
+    # OPTIMIZATION: one bit_count() rejects every position with more than 4 pieces
+    def is_material_draw(self) -> bool:
+        pieces_count = self.occupied.bit_count()
+        if pieces_count > 4:
+            return False
+        bitboards = self.bitboards
+        white_minors = bitboards[KNIGHT_PIECE | WHITE_PIECE_COLOR] | bitboards[BISHOP_PIECE | WHITE_PIECE_COLOR]
+        black_minors = bitboards[KNIGHT_PIECE | BLACK_PIECE_COLOR] | bitboards[BISHOP_PIECE | BLACK_PIECE_COLOR]
+        if (white_minors | black_minors).bit_count() != pieces_count - 2:
+            return False # a pawn, Rook or Queen is left
+        if white_minors.bit_count() < 2 and black_minors.bit_count() < 2:
+            return True
+        return white_minors == bitboards[KNIGHT_PIECE | WHITE_PIECE_COLOR] \
+            and black_minors == bitboards[KNIGHT_PIECE | BLACK_PIECE_COLOR]
+
+    # True if the position occurred before, since the last irreversible move (in the search
+    # tree or in the game before it): the side to move can repeat it again, so the search
+    # scores it a draw. The same side is to move only at even distances, and a position
+    # cannot come back within fewer than 4 plies.
+    # OPTIMIZATION: compares the Zobrist keys saved in the undo records, only back to the
+    # last pawn move or capture (halfmove_clock) - no position tuples are built
+    def is_repetition(self) -> bool:
+        clock = self.halfmove_clock
+        if clock < 4:
+            return False
+        key = self.zobrist_key
+        history = self.history
+        game_keys = self.game_keys
+        played = len(history)
+        for distance in range(4, min(clock, played + len(game_keys)) + 1, 2):
+            if (history[-distance][5] if distance <= played else game_keys[played - distance]) == key:
+                return True
+        return False
+
+    # Zobrist keys of the positions since the last irreversible move, newest first (index 0
+    # is the position before the last move)
+    def reversible_keys(self) -> List[int]:
+        history = self.history
+        game_keys = self.game_keys
+        played = len(history)
+        return [history[-distance][5] if distance <= played else game_keys[played - distance]
+                for distance in range(1, min(self.halfmove_clock, played + len(game_keys)) + 1)]
+
+    # 50 moves (100 plies) without a pawn move or a capture
+    def check_fifty_move_rule(self, limit_moves_count: int = 50) -> bool:
+        return self.halfmove_clock >= 2 * limit_moves_count
+
+    ########################################################################
+    # DEBUG METHODS
+
+    # same output format as Move.show()
+    def show_move(self, move: int, comment: str):
+        from_sq, to_sq = move_from(move), move_to(move)
+        piece_name = PIECE_NAMES[self.mailbox[from_sq] & ANY_PIECE]
+        print(f"{comment} {piece_name}: {square_name(from_sq)} -> {square_name(to_sq)}")
@@ -5,6 +5,9 @@ from typing import List, Tuple
 from move import Move
 from square import Square
 from sound import Sound
+from attacks import *
+from zobrist import *
+from evaluation import PSQT, PHASE, tapered_score
 
 import os
 
@@ -24,6 +27,25 @@ class BoardState:
         self.black_pieces_count = 16 # initial number of black pieces
         self.last_move_when_pawn_moved = 0 # Stores game move number when pawn was last moved. Will be set to move_count value when any Pawn will move.
         self.last_move_when_piece_captured = 0 # Stores game move number when a piece was last moved. Will be set to move_count when any piece will be captured.
+        self.en_passant_pawn = None # (row, col) of the Pawn which can be captured en passant in the next move (set by a two-square push only)
+        self.zobrist_key: int = 0 # Zobrist key of the position (see zobrist.py), updated incrementally by Board.move()
+        self.psqt: int = 0 # packed material + piece-square sum (see evaluation.py), updated incrementally by Board.move()
+        self.phase: int = 0 # game phase (see evaluation.py), updated incrementally by Board.move()
+
+    # all fields as a tuple - Board.move() keeps it in the undo record, Board.undo_move() restores it
+    def save(self) -> tuple:
+        return (self.move_count, self.player_color, self.move, self.piece, self.en_passant_captured_piece,
+                self.captured, self.en_passant_move, self.castling_move, self.opponent_king_checked,
+                self.opponent_has_no_valid_moves, self.white_pieces_count, self.black_pieces_count,
+                self.last_move_when_pawn_moved, self.last_move_when_piece_captured, self.en_passant_pawn,
+                self.zobrist_key, self.psqt, self.phase)
+
+    def restore(self, saved: tuple):
+        (self.move_count, self.player_color, self.move, self.piece, self.en_passant_captured_piece,
+         self.captured, self.en_passant_move, self.castling_move, self.opponent_king_checked,
+         self.opponent_has_no_valid_moves, self.white_pieces_count, self.black_pieces_count,
+         self.last_move_when_pawn_moved, self.last_move_when_piece_captured, self.en_passant_pawn,
+         self.zobrist_key, self.psqt, self.phase) = saved
 
 
 '''
@@ -40,15 +62,23 @@ class Board:
         self.squares: List[List[Square]] = [[0, 0, 0, 0, 0, 0, 0, 0] for col in range(COLS)]
         self.squares_fast_method: List[List[int]] = [[0, 0, 0, 0, 0, 0, 0, 0] for col in range(COLS)] # piece info is stored as integers
         self.current_state: BoardState = BoardState()
+        # one undo record per move made (pushed by move(), popped by undo_move())
+        self.undo_stack: List[tuple] = []
+        # last known King squares, verified before use (see king_square())
+        self.king_squares = {WHITE_PIECE_COLOR: (7, 4), BLACK_PIECE_COLOR: (0, 4)}
+        # (row, col) squares of the pieces of each color, kept up to date by move() and
+        # undo_move() and rebuilt when a position is set up (see update_piece_squares())
+        self.piece_squares = {WHITE_PIECE_COLOR: set(), BLACK_PIECE_COLOR: set()}
         # self.previous_states: List[BoardState] = []
         self._create()
         self._add_pieces(WHITE_PIECE_COLOR)
         self._add_pieces(BLACK_PIECE_COLOR)
+        self.dump_to_squares_fast_method()
 
     # Check if two boards are equal. This means there is identical position on both boards.
-    # NOTE: the 3 fold repetition rule does NOT use this - it compares Game.position_key()
-    # tuples built from squares_fast_method (piece name/color equality here ignores
-    # castling rights, en passant state and the side to move).
+    # NOTE: the 3 fold repetition rule does NOT use this - it compares the Zobrist keys
+    # of current_state (piece name/color equality here ignores castling rights, en passant
+    # state and the side to move).
     # Returns:
     #   True if position on both boards is identical
     #   False otherwise
@@ -62,83 +92,131 @@ class Board:
                     return False
         return True
 
-    # Fast copy board contents without referencing to previous board or it's inner objects 
-    # currently it copies only squares_fast_method and current_state
-    def copy_board_content(self, other):
-        # copy squares_fast_method (int values are actually copied)
-        for row in range(ROWS):
-            for col in range(COLS):
-                self.squares_fast_method[row][col] = other.squares_fast_method[row][col]
-
-        # only references are assigned for squares structure, no copy is created!
-        for row in range(ROWS):
-            for col in range(COLS):
-                self.squares[row][col].piece = other.squares[row][col].piece
-
-        # copy current_state (only non-mutable variables are copied)
-        self.current_state.black_pieces_count = other.current_state.black_pieces_count
-        self.current_state.captured = other.current_state.captured   
-        self.current_state.castling_move = other.current_state.castling_move
-        self.current_state.en_passant_captured_piece = other.current_state.en_passant_captured_piece # piece object
-        self.current_state.en_passant_move = other.current_state.en_passant_move
-        self.current_state.last_move_when_pawn_moved = other.current_state.last_move_when_pawn_moved
-        self.current_state.last_move_when_piece_captured = other.current_state.last_move_when_piece_captured
-        self.current_state.move_count = other.current_state.move_count
-        self.current_state.move = other.current_state.move # move object
-        self.current_state.piece = other.current_state.piece # piece object
-        self.current_state.player_color = other.current_state.player_color
-        self.current_state.white_pieces_count = other.current_state.white_pieces_count
-        # FIXED BUG: these two flags were not copied, so after prepare_board_state_for_next_move()
-        # check_win()/check_draw() read stale values left over from previously explored
-        # minimax branches instead of the result of the move just made
-        self.current_state.opponent_king_checked = other.current_state.opponent_king_checked
-        self.current_state.opponent_has_no_valid_moves = other.current_state.opponent_has_no_valid_moves
-
     # dumps board information from 'squares' structure into 'squares_fast_method' structure
+    # (and into the piece lists and the evaluation sums - every position set up square by
+    # square is dumped)
+    # FIXED BUG: the evaluation sums were only recomputed by Game.__init__() and the test
+    # set-ups, so calculate_piece_score() of a board edited by hand scored the old position
     def dump_to_squares_fast_method(self):
-        piece_code: int = 0
         for row in range(ROWS):
             for col in range(COLS):
-                piece_code = 0
-                if not self.squares[row][col].has_piece(): # if square is empty
-                    self.squares_fast_method[row][col] = piece_code
-                    continue
-
-                if self.squares[row][col].piece.color == WHITE_PIECE_COLOR:
-                    piece_code |= WHITE_PIECE_COLOR
-                else:
-                    piece_code |= BLACK_PIECE_COLOR
-
-                if self.squares[row][col].piece.moved == True:
-                    piece_code |= PIECE_MOVED
-
-
-                if isinstance(self.squares[row][col].piece, Pawn):
-                    piece_code |= PAWN_PIECE
-                    if self.squares[row][col].piece.en_passant == True: # encode en passant state
-                        piece_code |= EN_PASSANT_PAWN                       
-                elif isinstance(self.squares[row][col].piece, Knight):
-                    piece_code |= KNIGHT_PIECE
-                elif isinstance(self.squares[row][col].piece, Bishop):
-                    piece_code |= BISHOP_PIECE
-                elif isinstance(self.squares[row][col].piece, Rook):
-                    piece_code |= ROOK_PIECE
-                elif isinstance(self.squares[row][col].piece, Queen):
-                    piece_code |= QUEEN_PIECE
-                elif isinstance(self.squares[row][col].piece, King):
-                    piece_code |= KING_PIECE
-                else:
-                    print(f"dump_to_squares_fast_method(): Unexpected value of the piece: {self.squares[row][col].piece}")
-
-                #print(f"Piece encoded as: {hex(piece_code)}")
-                self.squares_fast_method[row][col] = piece_code
-
+                self.squares_fast_method[row][col] = self.encode_square(row, col)
+        self.update_piece_squares()
+        self.current_state.psqt, self.current_state.phase = self.compute_evaluation()
+
+    # Rebuilds piece_squares and king_squares from the 'squares' structure. move() and
+    # undo_move() update them incrementally - this is needed only when a position is set up.
+    def update_piece_squares(self):
+        self.piece_squares = {WHITE_PIECE_COLOR: set(), BLACK_PIECE_COLOR: set()}
+        for row in range(ROWS):
+            for col in range(COLS):
+                piece = self.squares[row][col].piece
+                if piece is not None:
+                    self.piece_squares[piece.color].add((row, col))
+                    if isinstance(piece, King):
+                        self.king_squares[piece.color] = (row, col)
+
+    # Brings everything derived from the 'squares' structure in line with a position set up
+    # square by square, with 'side_to_move' to move: squares_fast_method, the piece lists
+    # and the evaluation sums (dump_to_squares_fast_method()) and the Zobrist key.
+    # FIXED BUG: a hand set-up kept the Zobrist key of the start position, so repetition
+    # detection and the search's game keys hashed the wrong position
+    def setup_position(self, side_to_move: int):
+        self.current_state.player_color = side_to_move
+        self.dump_to_squares_fast_method()
+        self.current_state.zobrist_key = self.compute_zobrist_key(side_to_move)
+
+    # OPTIMIZATION: re-encode only the given (row, col) squares - a move touches 2-6 squares,
+    # so Board.move() and undo_move() don't need the 64-square dump_to_squares_fast_method()
+    def update_squares_fast_method(self, squares: list):
+        for row, col in squares:
+            self.squares_fast_method[row][col] = self.encode_square(row, col)
+
+    # castling rights (WHITE_KINGSIDE | ... bits) read from the moved bits of the King and
+    # Rook home squares in squares_fast_method
+    def castling_rights(self) -> int:
+        fast = self.squares_fast_method
+        rights = 0
+        for row, color, kingside, queenside in ((7, WHITE_PIECE_COLOR, WHITE_KINGSIDE, WHITE_QUEENSIDE),
+                                                (0, BLACK_PIECE_COLOR, BLACK_KINGSIDE, BLACK_QUEENSIDE)):
+            if fast[row][4] & (ANY_PIECE | WHITE_PIECE_COLOR | PIECE_MOVED) == KING_PIECE | color:
+                if fast[row][7] & (ANY_PIECE | WHITE_PIECE_COLOR | PIECE_MOVED) == ROOK_PIECE | color:
+                    rights |= kingside
+                if fast[row][0] & (ANY_PIECE | WHITE_PIECE_COLOR | PIECE_MOVED) == ROOK_PIECE | color:
+                    rights |= queenside
+        return rights
+
+    # XOR of the Zobrist keys of the pieces on the given (row, col) squares, as encoded in
+    # squares_fast_method
+    def zobrist_squares(self, squares) -> int:
+        fast = self.squares_fast_method
+        key = 0
+        for row, col in squares:
+            key ^= PIECE_KEYS[fast[row][col] & PIECE_CODE_MASK][row * COLS + col]
+        return key
+
+    # Full Zobrist key of the position with 'side_to_move' to move. move() keeps
+    # current_state.zobrist_key up to date incrementally - this is needed only when a
+    # position is set up (and to verify the incremental key).
+    def compute_zobrist_key(self, side_to_move: int) -> int:
+        key = self.zobrist_squares([(row, col) for row in range(ROWS) for col in range(COLS)])
+        key ^= CASTLING_KEYS[self.castling_rights()]
+        if self.current_state.en_passant_pawn is not None:
+            key ^= EN_PASSANT_KEYS[self.current_state.en_passant_pawn[1]]
+        if side_to_move == BLACK_PIECE_COLOR:
+            key ^= SIDE_KEY
+        return key
+
+    # Sums of the packed material + piece-square values and of the phase weights (see
+    # evaluation.py) of the pieces on the given (row, col) squares, as encoded in
+    # squares_fast_method
+    def evaluation_squares(self, squares):
+        fast = self.squares_fast_method
+        psqt = phase = 0
+        for row, col in squares:
+            code = fast[row][col] & PIECE_CODE_MASK
+            psqt += PSQT[code][row * COLS + col]
+            phase += PHASE[code]
+        return psqt, phase
+
+    # Full packed material + piece-square sum and game phase of the position. move() keeps
+    # current_state.psqt / phase up to date incrementally - this is needed only when a
+    # position is set up (and to verify the incremental values).
+    def compute_evaluation(self):
+        return self.evaluation_squares([(row, col) for row in range(ROWS) for col in range(COLS)])
+
+    # int encoding (see const.py) of the piece on square [row][col] of the 'squares' structure
+    def encode_square(self, row: int, col: int) -> int:
+        piece = self.squares[row][col].piece
+        if piece is None: # if square is empty
+            return 0
+
+        piece_code = WHITE_PIECE_COLOR if piece.color == WHITE_PIECE_COLOR else BLACK_PIECE_COLOR
+        if piece.moved == True:
+            piece_code |= PIECE_MOVED
 
+        if isinstance(piece, Pawn):
+            piece_code |= PAWN_PIECE
+            if (row, col) == self.current_state.en_passant_pawn: # encode en passant state
+                piece_code |= EN_PASSANT_PAWN
+        elif isinstance(piece, Knight):
+            piece_code |= KNIGHT_PIECE
+        elif isinstance(piece, Bishop):
+            piece_code |= BISHOP_PIECE
+        elif isinstance(piece, Rook):
+            piece_code |= ROOK_PIECE
+        elif isinstance(piece, Queen):
+            piece_code |= QUEEN_PIECE
+        elif isinstance(piece, King):
+            piece_code |= KING_PIECE
+        else:
+            print(f"encode_square(): Unexpected value of the piece: {piece}")
+        return piece_code
 
 
     # Idea of board.move() method:
     # - adjust 'square' structure based on the move
-    # - dump content of 'square' structure into 'squares_fast_method'
+    # - re-encode the touched squares of 'square' structure into 'squares_fast_method'
     # - store additional info in 'current_state' structure
     # Note: right after move() method game.move_count must be increased by 1
 
@@ -158,6 +236,14 @@ class Board:
         # current_state.captured (the GUI did, the minimax search never did - deep search
         # nodes read a stale flag and corrupted the piece counters and draw detection)
         destination_had_piece = self.squares[final.row][final.col].has_piece()
+        # delta needed to undo a real move: captured piece and its square, the Rook of a
+        # castling move, the moved flags, the en passant flags cleared and the state fields
+        if not test_check:
+            saved_state = self.current_state.save()
+            previous_moved = piece.moved
+            captured = self.squares[final.row][final.col].piece
+            captured_square = (final.row, final.col)
+            castling_rook = None
         # 1. adjust 'square' structure based on the move
 
         # standard board update for the 'move'
@@ -168,6 +254,9 @@ class Board:
         if pawn_moved:
             diff = final.col - initial.col
             if diff != 0 and en_passant_empty:
+                if not test_check:
+                    captured = self.squares[initial.row][initial.col + diff].piece
+                    captured_square = (initial.row, initial.col + diff)
                 self.squares[initial.row][initial.col + diff].piece = None
                 if not test_check:
                     self.current_state.en_passant_move = True
@@ -196,20 +285,63 @@ class Board:
                     # queenside (diff < 0): rook (row, 0) -> (row, 3), kingside: rook (row, 7) -> (row, 5)
                     rook_initial_col, rook_final_col = (0, 3) if (diff < 0) else (7, 5)
                     rook = self.squares[final.row][rook_initial_col].piece
+                    castling_rook = (rook, rook.moved, final.row, rook_initial_col, rook_final_col)
                     self.squares[final.row][rook_initial_col].piece = None
                     self.squares[final.row][rook_final_col].piece = rook
                     rook.moved = True
 
-        # make sure en passant state for pawns lasts only for 1 turn, so clear the en passant flag for all other pawns on the board
+        # OPTIMIZATION: the piece lists and the King square follow the move, so the routines
+        # looking for the pieces of a color don't scan the 64 squares
+        if not test_check:
+            own_squares = self.piece_squares[piece.color]
+            own_squares.discard((initial.row, initial.col))
+            own_squares.add((final.row, final.col))
+            if captured is not None:
+                self.piece_squares[captured.color].discard(captured_square)
+            if castling_rook is not None:
+                own_squares.discard((final.row, castling_rook[3]))
+                own_squares.add((final.row, castling_rook[4]))
+            if isinstance(piece, King):
+                self.king_squares[piece.color] = (final.row, final.col)
+
+        # en passant state lasts only for 1 turn: a single state field replaces the previous target
         if not test_check:
             # FIXED BUG: only a two-square pawn push makes the pawn capturable en passant,
             # a single push must not set the flag
             double_pawn_push = pawn_moved and abs(final.row - initial.row) == 2
-            self.set_true_en_passant(piece, double_pawn_push)
+            previous_en_passant_pawn = self.current_state.en_passant_pawn
+            self.current_state.en_passant_pawn = (final.row, final.col) if double_pawn_push else None
             
-        # 2. dump content of 'square' structure into 'squares_fast_method'
+        # 2. re-encode the touched squares of 'square' structure into 'squares_fast_method'
+        # FIXED BUG: set the moved flag before encoding - the moved piece was encoded as
+        # not moved until the next move re-dumped the board (a King move kept its castling
+        # rights in position keys taken right after the move)
         if not test_check:
-            self.dump_to_squares_fast_method()
+            piece.moved = True
+            touched = [(initial.row, initial.col), (final.row, final.col)]
+            if captured_square != touched[1]: # en passant victim
+                touched.append(captured_square)
+            if castling_rook is not None:
+                touched += [(final.row, castling_rook[3]), (final.row, castling_rook[4])]
+            if previous_en_passant_pawn is not None and previous_en_passant_pawn not in touched:
+                touched.append(previous_en_passant_pawn) # each square once - the Zobrist XORs below rely on it
+            # OPTIMIZATION: Zobrist key updated incrementally - XOR out the old content of
+            # the touched squares, castling rights and en passant file, XOR in the new ones
+            key = self.current_state.zobrist_key ^ SIDE_KEY ^ CASTLING_KEYS[self.castling_rights()]
+            key ^= self.zobrist_squares(touched)
+            if previous_en_passant_pawn is not None:
+                key ^= EN_PASSANT_KEYS[previous_en_passant_pawn[1]]
+            # OPTIMIZATION: so are the evaluation sums - subtract the old content of the
+            # touched squares, add the new one (undo_move() restores them with current_state)
+            old_psqt, old_phase = self.evaluation_squares(touched)
+            self.update_squares_fast_method(touched)
+            key ^= self.zobrist_squares(touched) ^ CASTLING_KEYS[self.castling_rights()]
+            if double_pawn_push:
+                key ^= EN_PASSANT_KEYS[final.col]
+            self.current_state.zobrist_key = key
+            new_psqt, new_phase = self.evaluation_squares(touched)
+            self.current_state.psqt += new_psqt - old_psqt
+            self.current_state.phase += new_phase - old_phase
 
         # 3. save additional info to 'current_state' structure        
         if not test_check:
@@ -237,7 +369,8 @@ class Board:
 
         # final processing of the move
         if not test_check:
-            piece.moved = True
+            self.undo_stack.append((piece, move, previous_moved, captured, captured_square,
+                                    castling_rook, touched, saved_state))
         else: # if just test for check restore value of 'moved' attribute from the previous move stored in squares_fast_method!
             piece.moved = piece_moved(self.squares_fast_method[initial.row][initial.col])
 
@@ -255,17 +388,40 @@ class Board:
     def castling(self, initial, final):
         return abs(initial.col - final.col) == 2
 
-    # clear the en_passant flag of all pawns on the board; if the last move was a two-square
-    # pawn push, flag that pawn as capturable en passant (the flag lasts only 1 turn)
-    def set_true_en_passant(self, piece, double_pawn_push: bool):
-
-        for row in range(ROWS):
-            for col in range(COLS):
-                if isinstance(self.squares[row][col].piece, Pawn):
-                    self.squares[row][col].piece.en_passant = False
+    # Takes back the last move made with move() (not a test_check probe) in O(1): restores the
+    # moved and captured pieces, the castling Rook, the moved flags and the current_state
+    # fields (en passant target included) from the undo record, and re-encodes the squares
+    # the move touched in squares_fast_method.
+    def undo_move(self):
+        piece, move, previous_moved, captured, captured_square, castling_rook, touched, saved_state \
+            = self.undo_stack.pop()
+        initial = move.initial
+        final = move.final
 
-        if double_pawn_push:
-            piece.en_passant = True
+        # the destination may hold the promoted Queen - the Pawn object goes back instead
+        self.squares[final.row][final.col].piece = None
+        if captured is not None:
+            self.squares[captured_square[0]][captured_square[1]].piece = captured
+        self.squares[initial.row][initial.col].piece = piece
+        piece.moved = previous_moved
+        own_squares = self.piece_squares[piece.color]
+        own_squares.discard((final.row, final.col))
+        own_squares.add((initial.row, initial.col))
+        if captured is not None:
+            self.piece_squares[captured.color].add(captured_square)
+        if isinstance(piece, King):
+            self.king_squares[piece.color] = (initial.row, initial.col)
+
+        if castling_rook is not None:
+            rook, rook_previous_moved, rook_row, rook_initial_col, rook_final_col = castling_rook
+            self.squares[rook_row][rook_final_col].piece = None
+            self.squares[rook_row][rook_initial_col].piece = rook
+            rook.moved = rook_previous_moved
+            own_squares.discard((rook_row, rook_final_col))
+            own_squares.add((rook_row, rook_initial_col))
+
+        self.current_state.restore(saved_state)
+        self.update_squares_fast_method(touched)
 
     # verify if the move of the piece will uncover a check of King of the same color as the moved piece
     def in_check(self, piece: Piece, move: Move):
@@ -288,7 +444,10 @@ class Board:
 
         self.move(piece, move, test_check = True, clear_moves = False) # simulate the move
 
-        king_checked = self.is_king_checked(piece.color)
+        if isinstance(piece, King): # the King's new square is known, no need to look it up
+            king_checked = self.square_attacked(move.final.row, move.final.col, piece.color)
+        else:
+            king_checked = self.is_king_checked(piece.color)
 
         # move(test_check = True) don't update square_fast_method struct so based on it we can revert attributes of moved piece
 
@@ -321,24 +480,21 @@ class Board:
     # returns True if there is insufficient mating material: K vs K, K vs K+B, K vs K+Kn
     # returns False if there is sufficient mating position (all other cases)
     # TODO: there is one more case of insufficient material: king and bishop versus king and bishop with the bishops on the same color.
+    # OPTIMIZATION: looks only at the 2 pieces of the stronger side (piece_squares), not the 64 squares
     def check_insufficient_mating_material(self):
         if self.current_state.black_pieces_count == 1 and self.current_state.white_pieces_count == 1:
             print(f"Draw! Insufficient mating material (K vs K)!")
             return True
         elif self.current_state.black_pieces_count == 1 and self.current_state.white_pieces_count == 2:
-            for row in range(ROWS):
-                for col in range(COLS):
-                    if self.squares[row][col].has_team_piece(WHITE_PIECE_COLOR):
-                        if isinstance(self.squares[row][col].piece, Bishop) or isinstance(self.squares[row][col].piece, Knight):
-                            print(f"Draw! Insufficient mating material (K vs K+B or K vs K+Kn)!") 
-                            return True
+            for row, col in self.piece_squares[WHITE_PIECE_COLOR]:
+                if isinstance(self.squares[row][col].piece, Bishop) or isinstance(self.squares[row][col].piece, Knight):
+                    print(f"Draw! Insufficient mating material (K vs K+B or K vs K+Kn)!") 
+                    return True
         elif self.current_state.black_pieces_count == 2 and self.current_state.white_pieces_count == 1:
-            for row in range(ROWS):
-                for col in range(COLS):
-                    if self.squares[row][col].has_team_piece(BLACK_PIECE_COLOR):
-                        if isinstance(self.squares[row][col].piece, Bishop) or isinstance(self.squares[row][col].piece, Knight):
-                            print(f"Draw! Insufficient mating material (K vs K+B or K vs K+Kn)!") 
-                            return True
+            for row, col in self.piece_squares[BLACK_PIECE_COLOR]:
+                if isinstance(self.squares[row][col].piece, Bishop) or isinstance(self.squares[row][col].piece, Knight):
+                    print(f"Draw! Insufficient mating material (K vs K+B or K vs K+Kn)!") 
+                    return True
         else:
             return False
 
@@ -349,25 +505,24 @@ class Board:
     # Sets value of no_valid_moves member variable:
     # True if there is no valid moves for all pieces of 'color' color
     # False if any piece of 'color' color has a valid move
+    # OPTIMIZATION: visits the squares of piece_squares[color] only, not the 64 squares - sorted,
+    # so the pieces are tried in the order of the old scan and the early exit comes as soon
     def player_has_no_valid_moves(self, color: int):
-        for row in range(ROWS):
-            for col in range(COLS):
-                if self.squares[row][col].has_team_piece(color):
-                    
-                    #piece=copy.deepcopy(self.squares[row][col].piece)
-                    piece=self.squares[row][col].piece  
-                    # OPTIMIZATION: a shallow copy is enough - the list is only saved and
-                    # restored around the probe, the Move objects are never mutated
-                    # (deepcopy recursed into whole Piece objects via Move.final.piece)
-                    tmp_moves = piece.moves[:]
-                    piece.clear_moves()
-                    self.calc_moves(piece, row, col)
-                    if piece.moves != []:
-                        #print(f"Piece on {Square.get_alphacol(col)}{ROWS - row} can move, player {color} has valid moves.")
-                        piece.moves=tmp_moves  
-                        return False
-                    else:
-                        piece.moves=tmp_moves
+        for row, col in sorted(self.piece_squares[color]):
+            #piece=copy.deepcopy(self.squares[row][col].piece)
+            piece=self.squares[row][col].piece  
+            # OPTIMIZATION: a shallow copy is enough - the list is only saved and
+            # restored around the probe, the Move objects are never mutated
+            # (deepcopy recursed into whole Piece objects via Move.final.piece)
+            tmp_moves = piece.moves[:]
+            piece.clear_moves()
+            self.calc_moves(piece, row, col)
+            if piece.moves != []:
+                #print(f"Piece on {Square.get_alphacol(col)}{ROWS - row} can move, player {color} has valid moves.")
+                piece.moves=tmp_moves  
+                return False
+            else:
+                piece.moves=tmp_moves
                         
         print(f"Player {color_name(color)} has no valid moves!")
         return True
@@ -377,45 +532,65 @@ class Board:
     # NOTE: rebinds piece.moves (clear_moves) without restoring it - safe inside minimax,
     # where every node clears and regenerates moves before using them.
     def has_any_valid_move(self, color: int) -> bool:
+        for row, col in sorted(self.piece_squares[color]): # same order as player_has_no_valid_moves()
+            piece = self.squares[row][col].piece
+            piece.clear_moves()
+            self.calc_moves(piece, row, col)
+            if piece.moves:
+                return True
+        return False
+
+    # Returns the (row, col) square of the King of 'color' color, or None if there is none.
+    # OPTIMIZATION: move(), undo_move() and update_piece_squares() keep the King square in
+    # king_squares; it is verified first, the 64-square scan only runs for a board edited
+    # square by square without dump_to_squares_fast_method().
+    def king_square(self, color: int):
+        row, col = self.king_squares[color]
+        piece = self.squares[row][col].piece
+        if isinstance(piece, King) and piece.color == color:
+            return row, col
         for row in range(ROWS):
             for col in range(COLS):
-                if self.squares[row][col].has_team_piece(color):
-                    piece = self.squares[row][col].piece
-                    piece.clear_moves()
-                    self.calc_moves(piece, row, col)
-                    if piece.moves:
+                piece = self.squares[row][col].piece
+                if isinstance(piece, King) and piece.color == color:
+                    self.king_squares[color] = (row, col)
+                    return row, col
+        return None
+
+    # Evaluates if square [row][col] is attacked by any piece of the opposite color than 'color'.
+    # OPTIMIZATION ("super-piece" probing): instead of scanning the board for enemy pieces and
+    # generating their attacks, look outward from the square using the precomputed attack tables -
+    # a knight on a knight square, a pawn on a pawn-capture square, a King next to it or a
+    # sliding piece as the first piece met along a ray.
+    # NOTE: reads 'squares' only - squares_fast_method is stale during in_check() probes.
+    def square_attacked(self, row: int, col: int, color: int) -> bool:
+        squares = self.squares
+        sq = row * COLS + col
+        for check_row, check_col in KNIGHT_SQUARES[sq]:
+            piece = squares[check_row][check_col].piece
+            if isinstance(piece, Knight) and piece.color != color:
+                return True
+        # an enemy pawn attacks sq from the squares a pawn of 'color' on sq would attack
+        for check_row, check_col in PAWN_SQUARES[color][sq]:
+            piece = squares[check_row][check_col].piece
+            if isinstance(piece, Pawn) and piece.color != color:
+                return True
+        # an enemy King next to the square (calc_moves() never puts the Kings side by side,
+        # but this keeps the answer right for castling transit squares too)
+        for check_row, check_col in KING_SQUARES[sq]:
+            piece = squares[check_row][check_col].piece
+            if isinstance(piece, King) and piece.color != color:
+                return True
+        for directions, slider in ((ROOK_DIRECTIONS, Rook), (BISHOP_DIRECTIONS, Bishop)):
+            for direction in directions:
+                for check_row, check_col in RAY_SQUARES[direction][sq]:
+                    piece = squares[check_row][check_col].piece
+                    if piece is None:
+                        continue
+                    # the first piece met along the ray decides; anything behind it is blocked
+                    if piece.color != color and isinstance(piece, (slider, Queen)):
                         return True
-        return False
-
-    # Evaluates if a piece on a sqare [row][col] is giving check in a straight line to the King of 'color' color
-    # Used for Bishop, Rook and Queen pieces in is_king_checked() method
-    # Returns:
-    # True if check detected
-    # False if no check detected
-    def straightline_checks(self, row: int, col: int, color: int, check_directions: List[Tuple]) -> bool:
-        for check_direction in check_directions:
-            row_incr, col_incr = check_direction
-            possible_move_row = row + row_incr
-            possible_move_col = col + col_incr
-            while True:
-                if Square.in_range(possible_move_row, possible_move_col):
-                    # empty square -> continue checking squares in this direction
-                    if self.squares[possible_move_row][possible_move_col].isempty():
-                    # if is_empty(self.squares_fast_method[possible_move_row][possible_move_col]): # OPTIMIZATION
-                        pass
-                    # square with King of other color found -> signal check                   
-                    elif isinstance(self.squares[possible_move_row][possible_move_col].piece, King) and self.squares[possible_move_row][possible_move_col].has_team_piece(color):
-                            # print(f"{self.squares[row][col].piece.name} on {Square.get_alphacol(col)}{ROWS - row} is checking the {color} King!")
-                            return True
-                    # any other piece found, stop checking next squares in this direction
-                    else:
-                        break
-                # square not on board, break the loop
-                else: 
                     break
-                # incrementing incrs
-                possible_move_row = possible_move_row + row_incr
-                possible_move_col = possible_move_col + col_incr
         return False
 
 
@@ -424,75 +599,47 @@ class Board:
     # True if King of color 'color' is being checked (as of current board position)
     # False otherwise
     def is_king_checked(self, color: int):
-        for row in range(ROWS):
-            for col in range(COLS):
-                if self.squares[row][col].has_enemy_piece(color): # if piece of opposite color found then evaluate if this piece is checking the King
-                    piece = self.squares[row][col].piece
-
-                    # is checked by a Pawn?
-                    if isinstance(piece, Pawn):
-                        check_row = row + 1 if color == WHITE_PIECE_COLOR else row - 1
-                        # check if King can be 'captured' by a pawn
-                        # FIXED BUG: the guard must test check_row (the row actually indexed),
-                        # not row+1 - for the black king check_row is row-1, and at row == 0
-                        # squares[-1] silently wrapped around to row 7
-                        if Square.in_range(check_row, col+1):
-                            if isinstance(self.squares[check_row][col+1].piece, King):
-                                if self.squares[check_row][col+1].has_team_piece(color):
-                                    #print(f"Pawn on {Square.get_alphacol(col)}{ROWS - row} is checking the {color} King!")
-                                    return True
-                        if Square.in_range(check_row, col-1):
-                            if isinstance(self.squares[check_row][col-1].piece, King): 
-                                if self.squares[check_row][col-1].has_team_piece(color):  
-                                    #print(f"Pawn on {Square.get_alphacol(col)}{ROWS - row} is checking the {color} King!")
-                                    return True
-                                
-                    # is checked by Knight?
-                    elif isinstance(piece, Knight):
-                        possible_knight_checks = [
-                            (row-2, col+1),
-                            (row-1, col+2),
-                            (row+1, col+2),
-                            (row+2, col+1),
-                            (row+2, col-1),
-                            (row+1, col-2),
-                            (row-1, col-2),
-                            (row-2, col-1),
-                        ]
-                        for possible_knight_check in possible_knight_checks:
-                            check_row, check_col = possible_knight_check
-                            if Square.in_range(check_row, check_col):
-                                if isinstance(self.squares[check_row][check_col].piece, King):
-                                    if self.squares[check_row][check_col].has_team_piece(color):
-                                        #print(f"Knight on {Square.get_alphacol(col)}{ROWS - row} is checking the {color} King!")
-                                        return True
-
-                                
-                    # is checked by a Bishop?
-                    elif isinstance(piece, Bishop):
-                        possible_bishop_check_directions = [(-1, 1), (-1, -1), (1, -1), (1, 1)]
-                        if self.straightline_checks(row, col, color, possible_bishop_check_directions) == True:
-                            return True
-                                    
-                                    
-                    # is checked by a Rook?
-                    elif isinstance(piece, Rook):
-                        possible_rook_check_directions = [(-1,0), (0, -1), (0, 1), (1, 0)]
-                        if self.straightline_checks(row, col, color, possible_rook_check_directions) == True:
-                            return True
-
-                    # is checked by a Queen?
-                    elif isinstance(piece, Queen):
-                        possible_queen_check_directions = [(-1, 1), (-1, -1), (1, -1), (1, 1), (-1,0), (0, -1), (0, 1), (1, 0)]
-                        if self.straightline_checks(row, col, color, possible_queen_check_directions) == True:
-                            return True
-                        
-                    # King cannot be checked by King of opposite color
-                    else:
-                        pass
-
-        # if no checks found, return False
-        return False
+        king_square = self.king_square(color)
+        if king_square is None:
+            return False
+        return self.square_attacked(king_square[0], king_square[1], color)
+
+    # Squares a piece of 'color' other than the King can move to when its King is in check:
+    # None if the King is not in check, an empty set in double check (only the King can move),
+    # otherwise the checking piece and, for a sliding checker, the squares between it and
+    # the King. Same "super-piece" probing from the King square as square_attacked(), but
+    # every checker is collected instead of stopping at the first one.
+    def check_evasion_squares(self, color: int):
+        king_square = self.king_square(color)
+        if king_square is None or not self.square_attacked(king_square[0], king_square[1], color):
+            return None # the common case, answered by the allocation-free probe
+        squares = self.squares
+        sq = king_square[0] * COLS + king_square[1]
+        checkers = []
+        for check_row, check_col in KNIGHT_SQUARES[sq]:
+            piece = squares[check_row][check_col].piece
+            if isinstance(piece, Knight) and piece.color != color:
+                checkers.append([(check_row, check_col)])
+        for check_row, check_col in PAWN_SQUARES[color][sq]:
+            piece = squares[check_row][check_col].piece
+            if isinstance(piece, Pawn) and piece.color != color:
+                checkers.append([(check_row, check_col)])
+        for directions, slider in ((ROOK_DIRECTIONS, Rook), (BISHOP_DIRECTIONS, Bishop)):
+            for direction in directions:
+                ray = []
+                for check_row, check_col in RAY_SQUARES[direction][sq]:
+                    ray.append((check_row, check_col))
+                    piece = squares[check_row][check_col].piece
+                    if piece is None:
+                        continue
+                    if piece.color != color and isinstance(piece, (slider, Queen)):
+                        checkers.append(ray)
+                    break
+        if not checkers:
+            return None
+        if len(checkers) > 1:
+            return set()
+        return set(checkers[0])
 
     # Check if a King of oppostie color is in adjacent square.
     # This method is needed to prevent two Kings of opposite color to occupy adjacent squares. 
@@ -519,17 +666,11 @@ class Board:
                         return True
         return False
 
-    # Returns score of the current board position
+    # Returns score of the current board position in pawns (white positive): material and
+    # piece-square values blended by game phase (see evaluation.py)
+    # OPTIMIZATION: reads the sums move() keeps up to date instead of scanning the 64 squares
     def calculate_piece_score(self) -> float:
-        # OPTIMIZATION: runs once per minimax leaf, so iterate the squares directly
-        # instead of indexing through both board representations
-        score = 0.0
-        for row_squares in self.squares:
-            for square in row_squares:
-                piece = square.piece
-                if piece is not None:
-                    score += piece.value
-        return score
+        return tapered_score(self.current_state.psqt, self.current_state.phase)
 
 
     def calc_moves(self, piece: Piece, row: int, col: int, move_the_piece: bool = False):
@@ -539,6 +680,14 @@ class Board:
             move_the_piece == False means we will just calculate the piece but don't move it
         '''
         
+        # OPTIMIZATION: check evasions - with its King in check, a piece other than the King
+        # can only move onto the checking piece or the squares between it and the King (and
+        # not at all in double check), so other destinations are rejected before a Move is
+        # built and in_check() simulates it
+        evasion_squares = None if isinstance(piece, King) else self.check_evasion_squares(piece.color)
+
+        def evades(final_row: int, final_col: int) -> bool:
+            return evasion_squares is None or (final_row, final_col) in evasion_squares
         
         def pawn_moves():
             # get possible number of squares to move forward
@@ -552,6 +701,8 @@ class Board:
                 if Square.in_range(possible_move_row):
                     # if self.squares[possible_move_row][col].isempty():
                     if is_empty(self.squares_fast_method[possible_move_row][col]): # OPTIMIZATION
+                        if not evades(possible_move_row, col):
+                            continue # a double push may still block the check
                         # create initial and finam move squares
                         initial = Square(row, col)
                         final = Square(possible_move_row, col)
@@ -572,7 +723,8 @@ class Board:
             possible_move_cols = [col-1, col+1]
             for possible_move_col in possible_move_cols:
                 if Square.in_range(possible_move_row, possible_move_col):
-                    if self.squares[possible_move_row][possible_move_col].has_enemy_piece(piece.color):
+                    if self.squares[possible_move_row][possible_move_col].has_enemy_piece(piece.color) \
+                            and evades(possible_move_row, possible_move_col):
                     # if has_enemy_piece(self.squares_fast_method[possible_move_row][possible_move_col], piece.color): # OPTIMIZATION
                         # create initial and finam move squares
                         initial = Square(row, col)
@@ -586,7 +738,8 @@ class Board:
                             piece.add_move(move)
 
 
-            # en passant moves
+            # en passant moves (not filtered by evades(): the captured pawn is not on the
+            # destination square, in_check() decides)
             r = 3 if piece.color == WHITE_PIECE_COLOR else 4 # assign a row where this type of move may happen
             fr = 2 if piece.color == WHITE_PIECE_COLOR else 5  # final row
             # left en passant
@@ -594,37 +747,35 @@ class Board:
                 if self.squares[row][col-1].has_enemy_piece(piece.color): # check for enemy piece left to the pawn
                 # if has_enemy_piece(self.squares_fast_method[row][col-1], piece.color): # OPTIMIZATION
                     p = self.squares[row][col-1].piece # p = enemy piece
-                    if isinstance(p, Pawn): # if enemy piece is pawn
-                        if p.en_passant: # if enemy piece is in en passant state
+                    if self.current_state.en_passant_pawn == (row, col - 1): # if enemy piece is the Pawn in en passant state
 
-                            #print(f"Pawn on row {row}, col {col} is in en-passant state")
-                            # create initial and finam move squares
-                            initial = Square(row, col)
-                            final = Square(fr, col-1, p)
-                            # create a new move
-                            move = Move(initial, final)
-                            
-                            #  see if there are potential checks
-                            if not self.in_check(piece, move):
-                                piece.add_move(move)
+                        #print(f"Pawn on row {row}, col {col} is in en-passant state")
+                        # create initial and finam move squares
+                        initial = Square(row, col)
+                        final = Square(fr, col-1, p)
+                        # create a new move
+                        move = Move(initial, final)
+                        
+                        #  see if there are potential checks
+                        if not self.in_check(piece, move):
+                            piece.add_move(move)
 
             # right en passant
             if Square.in_range(col+1) and row == r: 
                 if self.squares[row][col+1].has_enemy_piece(piece.color): # check for enemy piece left to the pawn
                 #if has_enemy_piece(self.squares_fast_method[row][col+1], piece.color): # OPTIMIZATION
                     p = self.squares[row][col+1].piece # p = enemy piece
-                    if isinstance(p, Pawn): # if enemy piece is pawn
-                        if p.en_passant: # if enemy piece is in en passant state
-                            #print(f"Pawn on row {row}, col {col} is in en-passant state")                                
-                            # create initial and finam move squares
-                            initial = Square(row, col)
-                            final = Square(fr, col+1, p)
-                            # create a new move
-                            move = Move(initial, final)
-                            
-                            #  see if there are potential checks
-                            if not self.in_check(piece, move):
-                                piece.add_move(move)
+                    if self.current_state.en_passant_pawn == (row, col + 1): # if enemy piece is the Pawn in en passant state
+                        #print(f"Pawn on row {row}, col {col} is in en-passant state")                                
+                        # create initial and finam move squares
+                        initial = Square(row, col)
+                        final = Square(fr, col+1, p)
+                        # create a new move
+                        move = Move(initial, final)
+                        
+                        #  see if there are potential checks
+                        if not self.in_check(piece, move):
+                            piece.add_move(move)
 
 
 
@@ -642,7 +793,7 @@ class Board:
             ]
             for possible_move in possible_moves:
                 possible_move_row, possible_move_col = possible_move
-                if Square.in_range(possible_move_row, possible_move_col):
+                if Square.in_range(possible_move_row, possible_move_col) and evades(possible_move_row, possible_move_col):
                     # check if it is empty or if it is of rival color
                     if self.squares[possible_move_row][possible_move_col].isempty_or_enemy(piece.color):
                         # FIXED BUG: Piece cannot 'capture' enemy King!
@@ -668,6 +819,13 @@ class Board:
                 
                 while True:
                     if Square.in_range(possible_move_row, possible_move_col):
+                        if not evades(possible_move_row, possible_move_col):
+                            # the ray goes on over an empty square, stops at any piece
+                            if self.squares[possible_move_row][possible_move_col].has_piece():
+                                break
+                            possible_move_row = possible_move_row + row_incr
+                            possible_move_col = possible_move_col + col_incr
+                            continue
                         # create squares of the possible new move
                         initial = Square(row, col)
                         final_piece = self.squares[possible_move_row][possible_move_col].piece
@@ -790,6 +948,8 @@ class Board:
                                     piece.add_move(moveKing)
       
         #print(f"performing calc_moves for {color_name(piece.color)} {piece.name}.")
+        if evasion_squares is not None and not evasion_squares:
+            return # double check: only the King can move
         if isinstance(piece, Pawn): 
             pawn_moves()
         elif isinstance(piece, Knight): 
@@ -924,21 +1084,16 @@ class Board:
 
     # get board position of a Pawn which can be captured en-passant in current move
     def get_en_passant_pawn_position(self):
-        for row in range(ROWS):
-            for col in range(COLS):
-                if isinstance(self.squares[row][col].piece, Pawn):
-                    if self.squares[row][col].piece.en_passant == True:
-                        #print(f"En Passant pawn is on {Square.get_alphacol(col)}{ROWS-row}")
-                        return row, col
+        if self.current_state.en_passant_pawn is not None:
+            return self.current_state.en_passant_pawn
         return 0, 0 # if not found
     
     def get_pieces_not_moved_yet(self):
         rows = []
         cols = []
-        for row in range(ROWS):
-            for col in range(COLS):
-                if self.squares[row][col].piece:
-                    if self.squares[row][col].piece.moved == False:
-                        rows.append(row)
-                        cols.append(col)
+        for color in (WHITE_PIECE_COLOR, BLACK_PIECE_COLOR):
+            for row, col in self.piece_squares[color]:
+                if self.squares[row][col].piece.moved == False:
+                    rows.append(row)
+                    cols.append(col)
         return rows, cols
@@ -9,9 +9,43 @@ SQSIZE = WIDTH // COLS
 
 # AI constants
 AI_MAX_DEPTH = 3
+# seconds per move of the GUI AI; iterative deepening stops at the last depth completed in time
+AI_TIME_LIMIT = 5.0
+# processes of the GUI AI searching root moves in parallel (1 = search in the GUI process)
+AI_WORKERS = 1
+# seconds between the parallel search's checks of the stop conditions while workers search
+WORKER_POLL_INTERVAL = 0.01
+# GUI frames per second while the AI searches or ponders in the background; the rest of the CPU time
+# is left to the search thread
+THINKING_FPS = 20
+# the GUI AI searches the human's expected reply during the human's turn
+AI_PONDER = True
 # base score of a checkmate found by minimax; the depth at which the mate occurs is
 # subtracted from it so that faster mates score higher (must exceed any material score)
 MATE_SCORE = 100000
+# upper bound of the search depth in plies (size of the per-ply search buffers)
+MAX_PLY = 64
+# default size of the AI transposition table in megabytes (AI(tt_size_mb=0) disables it)
+TT_SIZE_MB = 16
+# quiescence search delta pruning: a capture is skipped when even winning the captured
+# piece plus this margin (in pawns) cannot bring the static score up to the window
+QS_DELTA_MARGIN = 2.0
+# width of the principal variation search scout windows; smaller than any score difference
+# the evaluation can produce
+NULL_WINDOW = 1e-6
+# aspiration window at the root: each iteration first searches prev_score +- this (in pawns)
+ASPIRATION_WINDOW = 0.5
+# null-move pruning: plies by which the search after a passed turn is shortened
+NULL_MOVE_REDUCTION = 2
+# late move reductions: quiet moves after the first LMR_FULL_DEPTH_MOVES of a node with at
+# least LMR_MIN_DEPTH plies left are searched one ply shallower first
+LMR_FULL_DEPTH_MOVES = 3
+LMR_MIN_DEPTH = 3
+# frontier pruning margins in pawns: futility (1 ply left) skips quiet moves, razoring
+# (2 plies left) drops straight into the quiescence search, when the static score is this
+# far outside the window
+FUTILITY_MARGIN = 2.0
+RAZOR_MARGIN = 3.0
 
 from enum import Enum
 
@@ -34,4 +68,21 @@ ANY_PIECE = 0x3F
 WHITE_PIECE_COLOR = 0x40 # bit indicating white color
 BLACK_PIECE_COLOR = 0x0 # for clarity when the above bit is off
 PIECE_MOVED = 0x80 # bit indicating whether the piece was already moved during the game
-EN_PASSANT_PAWN = 0x100 # bit indicating whether the piece can be captured en passant (applies only to Pawns!)
\ No newline at end of file
+EN_PASSANT_PAWN = 0x100 # bit indicating whether the piece can be captured en passant (applies only to Pawns!)
+PIECE_TYPES = (PAWN_PIECE, KNIGHT_PIECE, BISHOP_PIECE, ROOK_PIECE, QUEEN_PIECE, KING_PIECE)
+
+# Castling rights bits (Board.castling_rights(), BitboardPosition.castling_rights)
+WHITE_KINGSIDE = 0x1
+WHITE_QUEENSIDE = 0x2
+BLACK_KINGSIDE = 0x4
+BLACK_QUEENSIDE = 0x8
+
+# Material value of each piece type (shared by the Piece classes and the bitboard search)
+PIECE_VALUES = {
+    PAWN_PIECE: 1.0,
+    KNIGHT_PIECE: 3.0,
+    BISHOP_PIECE: 3.0,
+    ROOK_PIECE: 5.0,
+    QUEEN_PIECE: 9.0,
+    KING_PIECE: 10000.0,
+}
\ No newline at end of file
@@ -0,0 +1,140 @@
+from const import *
+from typing import List
+
+'''
+Tapered material + piece-square table evaluation shared by Board and BitboardPosition.
+
+Every (piece code, square) pair has a fixed value: the material value of the piece
+(PIECE_VALUES, in centipawns) plus a piece-square bonus, signed by color (white
+positive). The piece-square tables are those of the Simplified Evaluation Function
+(Tomasz Michniewski, Chess Programming Wiki); the King has a middlegame table (shelter
+behind the pawns) and an endgame table (centralization), and passed-pawn-like
+advancement is worth more in the endgame.
+
+Middlegame and endgame values are packed into one int (endgame * 2^16 + middlegame), so
+a move adds and subtracts single ints. The game phase counts the remaining pieces
+(Knight/Bishop 1, Rook 2, Queen 4 - 24 at the start); the score blends the middlegame
+value (phase 24) into the endgame value (phase 0).
+
+The position keeps the packed sum and the phase up to date on every move, so evaluating
+it is a few integer operations instead of a board scan.
+'''
+
+PHASE_MAX = 24
+PHASE_WEIGHTS = {PAWN_PIECE: 0, KNIGHT_PIECE: 1, BISHOP_PIECE: 1, ROOK_PIECE: 2, QUEEN_PIECE: 4, KING_PIECE: 0}
+
+# tables from white's point of view, index = row * 8 + col (row 0 = 8th rank)
+_PAWN_MG = [
+      0,   0,   0,   0,   0,   0,   0,   0,
+     50,  50,  50,  50,  50,  50,  50,  50,
+     10,  10,  20,  30,  30,  20,  10,  10,
+      5,   5,  10,  25,  25,  10,   5,   5,
+      0,   0,   0,  20,  20,   0,   0,   0,
+      5,  -5, -10,   0,   0, -10,  -5,   5,
+      5,  10,  10, -20, -20,  10,  10,   5,
+      0,   0,   0,   0,   0,   0,   0,   0]
+_PAWN_EG = [
+      0,   0,   0,   0,   0,   0,   0,   0,
+     80,  80,  80,  80,  80,  80,  80,  80,
+     50,  50,  50,  50,  50,  50,  50,  50,
+     30,  30,  30,  30,  30,  30,  30,  30,
+     15,  15,  15,  15,  15,  15,  15,  15,
+      5,   5,   5,   5,   5,   5,   5,   5,
+      0,   0,   0,   0,   0,   0,   0,   0,
+      0,   0,   0,   0,   0,   0,   0,   0]
+_KNIGHT = [
+    -50, -40, -30, -30, -30, -30, -40, -50,
+    -40, -20,   0,   0,   0,   0, -20, -40,
+    -30,   0,  10,  15,  15,  10,   0, -30,
+    -30,   5,  15,  20,  20,  15,   5, -30,
+    -30,   0,  15,  20,  20,  15,   0, -30,
+    -30,   5,  10,  15,  15,  10,   5, -30,
+    -40, -20,   0,   5,   5,   0, -20, -40,
+    -50, -40, -30, -30, -30, -30, -40, -50]
+_BISHOP = [
+    -20, -10, -10, -10, -10, -10, -10, -20,
+    -10,   0,   0,   0,   0,   0,   0, -10,
+    -10,   0,   5,  10,  10,   5,   0, -10,
+    -10,   5,   5,  10,  10,   5,   5, -10,
+    -10,   0,  10,  10,  10,  10,   0, -10,
+    -10,  10,  10,  10,  10,  10,  10, -10,
+    -10,   5,   0,   0,   0,   0,   5, -10,
+    -20, -10, -10, -10, -10, -10, -10, -20]
+_ROOK = [
+      0,   0,   0,   0,   0,   0,   0,   0,
+      5,  10,  10,  10,  10,  10,  10,   5,
+     -5,   0,   0,   0,   0,   0,   0,  -5,
+     -5,   0,   0,   0,   0,   0,   0,  -5,
+     -5,   0,   0,   0,   0,   0,   0,  -5,
+     -5,   0,   0,   0,   0,   0,   0,  -5,
+     -5,   0,   0,   0,   0,   0,   0,  -5,
+      0,   0,   0,   5,   5,   0,   0,   0]
+_QUEEN = [
+    -20, -10, -10,  -5,  -5, -10, -10, -20,
+    -10,   0,   0,   0,   0,   0,   0, -10,
+    -10,   0,   5,   5,   5,   5,   0, -10,
+     -5,   0,   5,   5,   5,   5,   0,  -5,
+      0,   0,   5,   5,   5,   5,   0,  -5,
+    -10,   5,   5,   5,   5,   5,   0, -10,
+    -10,   0,   5,   0,   0,   0,   0, -10,
+    -20, -10, -10,  -5,  -5, -10, -10, -20]
+_KING_MG = [
+    -30, -40, -40, -50, -50, -40, -40, -30,
+    -30, -40, -40, -50, -50, -40, -40, -30,
+    -30, -40, -40, -50, -50, -40, -40, -30,
+    -30, -40, -40, -50, -50, -40, -40, -30,
+    -20, -30, -30, -40, -40, -30, -30, -20,
+    -10, -20, -20, -20, -20, -20, -20, -10,
+     20,  20,   0,   0,   0,   0,  20,  20,
+     20,  30,  10,   0,   0,  10,  30,  20]
+_KING_EG = [
+    -50, -40, -30, -20, -20, -30, -40, -50,
+    -30, -20, -10,   0,   0, -10, -20, -30,
+    -30, -10,  20,  30,  30,  20, -10, -30,
+    -30, -10,  30,  40,  40,  30, -10, -30,
+    -30, -10,  30,  40,  40,  30, -10, -30,
+    -30, -10,  20,  30,  30,  20, -10, -30,
+    -30, -30,   0,   0,   0,   0, -30, -30,
+    -50, -30, -30, -30, -30, -30, -30, -50]
+
+# (middlegame, endgame) piece-square tables by piece type
+_TABLES = {
+    PAWN_PIECE: (_PAWN_MG, _PAWN_EG),
+    KNIGHT_PIECE: (_KNIGHT, _KNIGHT),
+    BISHOP_PIECE: (_BISHOP, _BISHOP),
+    ROOK_PIECE: (_ROOK, _ROOK),
+    QUEEN_PIECE: (_QUEEN, _QUEEN),
+    KING_PIECE: (_KING_MG, _KING_EG),
+}
+
+
+def pack_score(mg: int, eg: int) -> int:
+    return (eg << 16) + mg
+
+def unpack_score(score: int):
+    eg = (score + 0x8000) >> 16
+    return score - (eg << 16), eg
+
+
+# PSQT[piece code][sq]: packed material + piece-square value, signed by color; PHASE[piece
+# code]: phase weight. Code 0 (empty square) is worth 0. Kings carry no material - both are
+# always on the board.
+PSQT: List[List[int]] = [[0] * (ROWS * COLS) for _ in range((KING_PIECE | WHITE_PIECE_COLOR) + 1)]
+PHASE: List[int] = [0] * ((KING_PIECE | WHITE_PIECE_COLOR) + 1)
+for _piece_type, (_mg_table, _eg_table) in _TABLES.items():
+    _material = 0 if _piece_type == KING_PIECE else round(PIECE_VALUES[_piece_type] * 100)
+    for _sq in range(ROWS * COLS):
+        _mirrored = _sq ^ 56 # same file, rank seen from black's side
+        PSQT[_piece_type | WHITE_PIECE_COLOR][_sq] = pack_score(_material + _mg_table[_sq], _material + _eg_table[_sq])
+        PSQT[_piece_type | BLACK_PIECE_COLOR][_sq] = -pack_score(_material + _mg_table[_mirrored],
+                                                                 _material + _eg_table[_mirrored])
+    PHASE[_piece_type | WHITE_PIECE_COLOR] = PHASE[_piece_type | BLACK_PIECE_COLOR] = PHASE_WEIGHTS[_piece_type]
+
+
+# Score in pawns (white positive) of a packed material + piece-square sum at a game phase
+def tapered_score(psqt: int, phase: int) -> float:
+    eg = (psqt + 0x8000) >> 16
+    mg = psqt - (eg << 16)
+    if phase > PHASE_MAX: # promotions
+        phase = PHASE_MAX
+    return (mg * phase + eg * (PHASE_MAX - phase)) / (100 * PHASE_MAX)
@@ -0,0 +1,83 @@
+from const import *
+from bitboard import (BitboardPosition, MOVE_FROM_SHIFT, MOVE_TO_SHIFT, MOVE_FLAG_SHIFT, MOVE_CAPTURED_SHIFT, MOVE_EN_PASSANT,
+                      CASTLING_RIGHTS_MASK)
+from zobrist import PIECE_KEYS, SIDE_KEY, CASTLING_KEYS, EN_PASSANT_KEYS
+from evaluation import PSQT, PHASE, PHASE_MAX
+from typing import List, Tuple
+
+try:
+    import numpy as np
+    HAVE_NUMPY = True
+except ImportError: # optional - without NumPy the search scores the frontier children one by one
+    HAVE_NUMPY = False
+
+'''
+Batched NumPy evaluation of the frontier children of the search.
+
+Without the quiescence search, the children of a node one ply before the horizon are
+scored statically: the search used to make each move, read calculate_piece_score() and
+unmake it again, one child at a time. frontier_scores() scores all of them in one
+vectorized pass instead: the moves are decoded as an int array, and the packed
+piece-square deltas (evaluation.py) of the moved and captured pieces are gathered from
+a NumPy copy of the tables and added to the node's incremental sum.
+
+Only normal moves, double pushes and captures are scored this way. A child that may give
+check (it could be a checkmate, and it is searched a ply deeper), a child repeating an
+earlier position (a draw), and en passant, castling and promotion moves are flagged
+instead - the search makes those moves and searches them normally.
+
+NumPy is optional: without it HAVE_NUMPY is False and the search never calls this module
+(AI(batch_frontier=True) is ignored).
+'''
+
+if HAVE_NUMPY:
+    PSQT_ARRAY = np.array(PSQT, dtype=np.int64)
+    PHASE_ARRAY = np.array(PHASE, dtype=np.int64)
+    PIECE_KEY_ARRAY = np.array(PIECE_KEYS, dtype=np.uint64)
+    CASTLING_KEY_ARRAY = np.array(CASTLING_KEYS, dtype=np.uint64)
+    CASTLING_MASK_ARRAY = np.array(CASTLING_RIGHTS_MASK, dtype=np.int64)
+
+
+# Static scores of the positions after each of 'moves' (legal moves of 'position'): returns
+# (scores, maybe_check) arrays in move order. The scores are those calculate_piece_score()
+# gives after make_move(); where maybe_check is True the score is not valid and the move
+# must be made and searched (it may give check, may repeat an earlier position, or is a
+# special move).
+def frontier_scores(position: BitboardPosition, moves: List[int]) -> 'Tuple[np.ndarray, np.ndarray]':
+    them = position.side_to_move ^ WHITE_PIECE_COLOR
+    move_array = np.array(moves, dtype=np.int64)
+    from_sq = (move_array >> MOVE_FROM_SHIFT) & 0x3F
+    to_sq = (move_array >> MOVE_TO_SHIFT) & 0x3F
+    # captured type | enemy color: with no capture that is the bare color bit, a code
+    # whose table row and phase weight are all 0
+    captured = ((move_array >> MOVE_CAPTURED_SHIFT) & 0x3F) | them
+    piece = np.array(position.mailbox, dtype=np.int64)[from_sq]
+
+    psqt = position.psqt + PSQT_ARRAY[piece, to_sq] - PSQT_ARRAY[piece, from_sq] - PSQT_ARRAY[captured, to_sq]
+    phase = np.minimum(position.phase - PHASE_ARRAY[captured], PHASE_MAX)
+    eg = (psqt + 0x8000) >> 16
+    mg = psqt - (eg << 16)
+    scores = (mg * phase + eg * (PHASE_MAX - phase)) / (100 * PHASE_MAX)
+
+    checks, discoverers = position.check_threats()
+    check_squares = np.zeros(len(PHASE), dtype=np.uint64) # by piece code
+    for code, squares in checks.items():
+        check_squares[code] = squares
+    maybe_check = ((((move_array >> MOVE_FLAG_SHIFT) & 0x7) >= MOVE_EN_PASSANT)
+                   | (((check_squares[piece] >> to_sq.astype(np.uint64)) & np.uint64(1)) != 0)
+                   | (((np.uint64(discoverers) >> from_sq.astype(np.uint64)) & np.uint64(1)) != 0))
+
+    # a child can repeat the positions 3, 5, 7... plies before this one, if its move is
+    # reversible (no capture, no pawn move): compare the Zobrist keys of those children,
+    # updated like make_move() does
+    repeatable = position.reversible_keys()[2::2]
+    if repeatable:
+        reversible = (captured == them) & ((piece & PAWN_PIECE) == 0)
+        key = position.zobrist_key ^ SIDE_KEY ^ CASTLING_KEYS[position.castling_rights]
+        if position.en_passant_square >= 0:
+            key ^= EN_PASSANT_KEYS[position.en_passant_square & 7]
+        rights = position.castling_rights & CASTLING_MASK_ARRAY[from_sq] & CASTLING_MASK_ARRAY[to_sq]
+        child_keys = (np.uint64(key) ^ PIECE_KEY_ARRAY[piece, from_sq] ^ PIECE_KEY_ARRAY[piece, to_sq]
+                      ^ CASTLING_KEY_ARRAY[rights])
+        maybe_check |= reversible & np.isin(child_keys, np.array(repeatable, dtype=np.uint64))
+    return scores, maybe_check
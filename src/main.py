@@ -10,7 +10,9 @@ from move import Move
 from piece import color_name
 import copy
 from minimax import *
+from search_thread import SearchThread
 from sound import Sound
+import queue
 import os
 import tkinter as tk
 
@@ -25,9 +27,11 @@ class Main:
         self.game = Game()
         self.move_sound = Sound(os.path.join('assets/sounds/move.wav'))
         self.capture_sound = Sound(os.path.join('assets/sounds/capture.wav'))
-        self.AI_engine = AI()
+        self.AI_engine = AI(time_limit=AI_TIME_LIMIT, workers=AI_WORKERS)
         self.human_player_moved = False # set to True if human (white player) made a move, reset to False afte AI made a move
         self.show_popup_screen = False # controls whether to display end of game screen
+        self.AI_search = None # SearchThread of the AI move being searched, None when not thinking
+        self.clock = pygame.time.Clock()
 
     # Function to show the pop up with buttons and return user selection
     def get_game_mode(self):
@@ -81,57 +85,115 @@ class Main:
         else:
             self.move_sound.play()
 
-    def AI_turn(self):
+    def AI_to_move(self) -> bool:
         ai_turn_as_white = (self.human_player_moved and self.game.current_player == WHITE_PIECE_COLOR) or self.game.first_move_made == False # condition for move when AI plays as white
-        ai_turn_as_black = self.human_player_moved and self.game.current_player == BLACK_PIECE_COLOR and self.game.stopAI == False # condition for move when AI plays as black
-        if (self.game.mode == GameMode.AI_VS_PLAYER_MODE and ai_turn_as_white) or (self.game.mode == GameMode.PLAYER_VS_AI_MODE and ai_turn_as_black): 
+        ai_turn_as_black = self.human_player_moved and self.game.current_player == BLACK_PIECE_COLOR # condition for move when AI plays as black
+        return (self.game.mode == GameMode.AI_VS_PLAYER_MODE and ai_turn_as_white) or (self.game.mode == GameMode.PLAYER_VS_AI_MODE and ai_turn_as_black)
+
+    # Starts the AI search on a background thread when it is the AI's turn, and plays the
+    # move once the search thread has found it. Called once per frame of mainloop().
+    # OPTIMIZATION: best_move() no longer blocks the event loop - the window keeps drawing
+    # (with a "thinking" indicator) and handling events during the search
+    # FIXED BUG: the AI (as white) also searched after the human ended the game, and its
+    # "AI has resigned" message replaced the checkmate / draw message
+    # OPTIMIZATION: pondering - after its move the AI keeps searching, on the human's time,
+    # the position after the reply it expects. When the human plays that reply (ponder hit)
+    # the running search simply becomes the AI's search, usually finished already;
+    # any other move cancels it and a new search starts (on a table warmed by the ponder)
+    def AI_turn(self):
+        if self.AI_search is not None and self.AI_search.pondering:
+            if self.game.stopAI: # the human ended the game
+                self.AI_search.cancel()
+                self.AI_search = None
+                return
+            if not self.AI_to_move():
+                return # the human is still thinking
+            position = BitboardPosition.from_board(self.game.board, self.game.current_player)
+            if position.zobrist_key == self.AI_search.ponder_key:
+                print("Ponder hit.")
+                self.AI_search.ponder_hit()
+            else:
+                print("Ponder miss.")
+                self.AI_search.cancel()
+                self.AI_search = None
+                self.game.stopAI = False
+        if self.AI_search is not None:
+            self.AI_move_found()
+            return
+        if self.game.stopAI:
+            return
+        if self.AI_to_move():
             print("Now it is AI turn...")
+            self.AI_search = SearchThread(self.AI_engine, self.game)
+
+    # AI is searching for its own move (not pondering)
+    def AI_thinking(self) -> bool:
+        return self.AI_search is not None and not self.AI_search.pondering
+
+    # Starts pondering on the human's reply predicted by the last search, if there is one
+    def start_pondering(self):
+        position = BitboardPosition.from_board(self.game.board, self.game.current_player)
+        predicted_reply = self.AI_engine.predicted_reply(position)
+        if predicted_reply:
+            self.AI_search = SearchThread(self.AI_engine, self.game, ponder_move=predicted_reply)
+
+    def AI_move_found(self):
+        try:
+            best_bitboard_move = self.AI_search.result()
+        except queue.Empty:
+            return # still thinking
+        self.AI_search = None
+
+        #profiler.enable()  # Start profiling
+        best_piece, best_move = self.AI_engine.play_move(self.game, best_bitboard_move)
+        #profiler.disable()  # Stop profiling
+
+
+        #profiler.print_stats(sort=1)
+        if best_move:
+            if self.game.first_move_made == False:
+                self.game.first_move_made = True
+            
+            # remember last move - append to the moves history
+            self.game.moves_history.append((copy.deepcopy(best_piece), copy.deepcopy(best_move)))
+            
+            self.play_sound(self.game.board.current_state.captured)
+
+            #show methods
             self.game.show_bg(self.screen)
             self.game.show_last_move(self.screen)
-            #game.show_pieces_not_moved_yet(screen)
             self.game.show_pieces(self.screen)
             pygame.display.update()
-            
-            #profiler.enable()  # Start profiling
-            best_piece, best_move = self.AI_engine.best_move(self.game, self.screen)
-            #profiler.disable()  # Stop profiling
-
+            best_move.show(best_piece.name, "AI made a move! ")
 
-            #profiler.print_stats(sort=1)
-            if best_move:
-                if self.game.first_move_made == False:
-                    self.game.first_move_made = True
-                
-                # remember last move - append to the moves history
-                self.game.moves_history.append((copy.deepcopy(best_piece), copy.deepcopy(best_move)))
-                
-                self.play_sound(self.game.board_states[self.game.move_count].current_state.captured)
-
-                #show methods
-                self.game.show_bg(self.screen)
-                self.game.show_last_move(self.screen)
-                self.game.show_pieces(self.screen)
-                pygame.display.update()
-                best_move.show(best_piece.name, "AI made a move! ")
-
-                # check if win or draw condition is on the board
-                if self.game.check_draw():
-                    self.show_popup_screen = True                               
-                elif self.game.check_win(self.game.current_player):
-                    self.show_popup_screen = True
-                else:
-                    self.show_popup_screen = False                        
-                if self.show_popup_screen:
-                    self.game.draw_popup(self.screen, self.game.game_message)
+            # check if win or draw condition is on the board
+            if self.game.check_draw():
+                self.show_popup_screen = True                               
+            elif self.game.check_win(self.game.current_player):
+                self.show_popup_screen = True
             else:
-                self.game.game_message = f"You won! AI has resigned."
-                self.game.game_message += "Press 'r' to restart or close the app window to quit."
-                self.show_popup_screen = True                        
+                self.show_popup_screen = False                        
+            if self.show_popup_screen:
                 self.game.draw_popup(self.screen, self.game.game_message)
+        else:
+            self.game.game_message = f"You won! AI has resigned."
+            self.game.game_message += "Press 'r' to restart or close the app window to quit."
+            self.show_popup_screen = True                        
+            self.game.draw_popup(self.screen, self.game.game_message)
 
-            self.game.prepare_board_state_for_next_move()
-            
-            self.human_player_moved = False        
+        self.game.prepare_board_state_for_next_move()
+        
+        self.human_player_moved = False        
+        if AI_PONDER and best_move and not self.show_popup_screen:
+            self.start_pondering()
+
+    # Stops a running AI search or ponder through Game.stopAI (restart, undo or quit)
+    def cancel_AI_search(self):
+        if self.AI_search is not None:
+            self.AI_search.cancel()
+            self.AI_search = None
+            self.game.stopAI = False
+            self.human_player_moved = False
         
         
     def mainloop(self):
@@ -146,7 +208,7 @@ class Main:
         # At the very beginning set counters to first move
         # increment by 1 'game.move_count' and move_count counter in next board_state
         game.move_count += 1
-        game.board_states[game.move_count].current_state.move_count = game.move_count # move count was already incresed in above line
+        game.board.current_state.move_count = game.move_count # move count was already incresed in above line
 
         while True:
             # show methods
@@ -166,13 +228,18 @@ class Main:
 
             if dragger.dragging:
                 dragger.update_blit(screen)
+
+            # AI turn
+            if game.mode != GameMode.PLAYER_VS_PLAYER_MODE:
+                self.AI_turn()
+            if self.AI_thinking():
+                game.show_AI_thinking(screen, self.AI_engine.nodes)
+            # FIXED BUG: the loop ran uncapped while pondering, taking the CPU from the search
+            if self.AI_search is not None:
+                self.clock.tick(THINKING_FPS)
                 
             for event in pygame.event.get():
 
-                # AI turn
-                if game.mode != GameMode.PLAYER_VS_PLAYER_MODE:
-                    self.AI_turn()
-
                 # click event
                 if event.type == pygame.MOUSEBUTTONDOWN:
                     # Operation on the board
@@ -180,9 +247,10 @@ class Main:
                     clicked_row = dragger.mouseY // SQSIZE
                     clicked_col = dragger.mouseX // SQSIZE
                     # if clicked square has a piece and the piece is of the color of current player turn 
-                    if game.board_states[game.move_count].squares[clicked_row][clicked_col].has_team_piece(game.current_player):
-                        piece = game.board_states[game.move_count].squares[clicked_row][clicked_col].piece
-                        game.board_states[game.move_count].calc_moves(piece, clicked_row, clicked_col)
+                    # (the AI's pieces stay put while it is thinking)
+                    if not self.AI_thinking() and game.board.squares[clicked_row][clicked_col].has_team_piece(game.current_player):
+                        piece = game.board.squares[clicked_row][clicked_col].piece
+                        game.board.calc_moves(piece, clicked_row, clicked_col)
                         dragger.save_initial(event.pos)
                         dragger.drag_piece(piece)
                         # show methods
@@ -222,17 +290,17 @@ class Main:
                         final = Square(released_row, released_col)
                         move = Move(initial, final)
                         
-                        if game.board_states[game.move_count].valid_move(dragger.piece, move):
+                        if game.board.valid_move(dragger.piece, move):
                             if game.first_move_made == False:
                                 game.first_move_made = True
 
                             # move the piece
-                            game.board_states[game.move_count].move(dragger.piece, move)
+                            game.board.move(dragger.piece, move)
 
                             # add a new move to game.moves_history
                             game.moves_history.append((copy.deepcopy(piece), copy.deepcopy(move)))
 
-                            self.play_sound(game.board_states[game.move_count].current_state.captured)
+                            self.play_sound(game.board.current_state.captured)
 
                             #show methods
                             game.show_bg(screen)
@@ -241,10 +309,10 @@ class Main:
                             game.show_pieces(screen)
                             pygame.display.update()
                             # DEBUG INFO
-                            #game.board_states[game.move_count].show_pieces_count()
+                            #game.board.show_pieces_count()
                             #game.show_move_counters()
-                            #game.board_states[game.move_count].show_move_counters()
-                            print(f"Game score based on value of pieces is: {game.board_states[game.move_count].calculate_piece_score()}")
+                            #game.board.show_move_counters()
+                            print(f"Game score based on value of pieces is: {game.board.calculate_piece_score()}")
                             
                             # check if win or draw condition is on the board
                             if game.check_draw():
@@ -282,6 +350,7 @@ class Main:
 
                     # resetting game
                     if event.key == pygame.K_r: # on 'r' key pressed
+                        self.cancel_AI_search()
                         game.reset()
                         self.show_popup_screen = False
                         # we need to reset values of game, board and dragger as well as they were created based on previous game object
@@ -290,6 +359,7 @@ class Main:
 
                     # undoing last move
                     if event.key == pygame.K_u: # on 'u' key pressed
+                        self.cancel_AI_search()
                         self.show_popup_screen = False
                         # remove last move from history
                         if game.move_count == 0:
@@ -308,11 +378,16 @@ class Main:
                             pygame.display.update()
 
                 elif event.type == pygame.QUIT:
+                    self.cancel_AI_search()
+                    self.AI_engine.close()
                     pygame.quit()
                     sys.exit()
 
             pygame.display.update()
 
 
-main = Main()
-main.mainloop()
+# the guard keeps the AI worker processes (AI_WORKERS > 1), which import this file as
+# their main module, from opening a window of their own
+if __name__ == '__main__':
+    main = Main()
+    main.mainloop()
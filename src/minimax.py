@@ -2,61 +2,294 @@ from const import *
 from game import Game
 from move import Move
 from piece import Piece
-from typing import Tuple
-import copy
-
+from bitboard import BitboardPosition, move_from, move_to, move_captured, move_promotion, QUIET_BITS, NULL_MOVE
+from frontier import HAVE_NUMPY, frontier_scores
+if HAVE_NUMPY: # used only by the batched frontier search
+    import numpy as np
+from transposition import (TranspositionTable, SharedTranspositionTable, TT_EXACT, TT_LOWER, TT_UPPER, MATE_THRESHOLD, score_to_tt,
+                           score_from_tt)
+from typing import Dict, List, Optional, Tuple
+from bisect import bisect_left
+from multiprocessing import shared_memory
+
+import multiprocessing
 import pygame
 import time
 
+# raised inside the search when the time or node budget of best_move() runs out; the
+# iteration in progress is discarded
+class SearchAborted(Exception):
+    pass
+
+
+# Stop flags already attached in this process, by shared memory name
+_attached_stop_flags: Dict[str, 'SharedStopFlag'] = {}
+
+def attach_stop_flag(name: str):
+    flag = _attached_stop_flags.get(name)
+    if flag is None:
+        flag = _attached_stop_flags[name] = SharedStopFlag(name)
+    return flag
+
+
+# Stop signal from a parallel search to its worker processes: one byte in a shared memory
+# block, set by the searching process and read by the workers' budget_exhausted() every
+# 1024 nodes. Pickled (as a task argument) as its block name, like SharedTranspositionTable;
+# the process that created it must close() it, which also frees the block.
+class SharedStopFlag:
+    def __init__(self, name: Optional[str] = None):
+        self.owner = name is None
+        if self.owner:
+            self.memory = shared_memory.SharedMemory(create=True, size=1)
+        else:
+            self.memory = shared_memory.SharedMemory(name=name)
+        self.name = self.memory.name
+        assert self.memory.buf is not None
+        self.buf = self.memory.buf # a new block is zero-filled: not set
+
+    def __reduce__(self):
+        return attach_stop_flag, (self.name,)
+
+    def set(self):
+        self.buf[0] = 1
+
+    def clear(self):
+        self.buf[0] = 0
+
+    def is_set(self) -> bool:
+        return self.buf[0] == 1
+
+    def close(self):
+        _attached_stop_flags.pop(self.name, None)
+        del self.buf
+        self.memory.close()
+        if self.owner:
+            self.memory.unlink()
+
+# material value by piece type as a flat list (indexed by move_captured() / mailbox type bits)
+CAPTURE_VALUES = [0.0] * (ANY_PIECE + 1)
+for _piece_type, _value in PIECE_VALUES.items():
+    CAPTURE_VALUES[_piece_type] = _value
+PROMOTION_GAIN = PIECE_VALUES[QUEEN_PIECE] - PIECE_VALUES[PAWN_PIECE]
+
+# quiet move ordering keys above any history score: promotions, killers, countermove
+PROMOTION_ORDER = 1 << 33
+KILLER_ORDER = 1 << 32
+COUNTERMOVE_ORDER = 1 << 31
+
+# from-square and to-square bits of a packed move (bits 15-26) as one index 0..4095
+def butterfly_index(move: int) -> int:
+    return (move >> 15) & 0xFFF
+
 class AI:
     # max_depth semantics: best_move() plays ply 1 itself and calls minimax() with depth=1;
     # recursion stops when depth > max_depth, so max_depth = N means the AI analyzes
     # N+1 plies in total (e.g. max_depth = 2 predicts 3 piece moves ahead)
     # pruning=False disables the alpha-beta cutoff (plain minimax), kept only so tests
     # can assert that pruning never changes the root score
-    def __init__(self, max_depth = AI_MAX_DEPTH, pruning = True):
+    # tt_size_mb sets the transposition table size; 0 (or pruning=False) disables the table
+    # iterative_deepening: best_move() searches max_depth 0, 1, 2... up to max_depth and stops
+    # early when time_limit (seconds) or node_limit (minimax nodes) is used up, playing the
+    # best move of the last completed iteration; False runs one search at max_depth
+    # quiescence: at the horizon keep searching captures (and Queen promotions) until the
+    # position is quiet instead of scoring it in the middle of an exchange (needs pruning)
+    # ordering_heuristics: quiet moves are ordered by killer moves, countermoves and the
+    # history table, all learned from beta cutoffs (needs pruning - no cutoffs otherwise)
+    # pvs: principal variation search - the first move of a node gets the full window, the
+    # others a null-window scout, re-searched only if they beat it (needs pruning)
+    # aspiration: iterations after the first search the root with a window around the
+    # previous iteration's score, widened when the score falls outside (needs pruning)
+    # null_move: null-move pruning - a side that stays above beta even after passing the
+    # turn is cut off after a shallower search (needs pruning)
+    # late_move_reductions: late quiet moves are searched one ply shallower first, and fully
+    # only if they beat the bound (needs pruning)
+    # futility: futility pruning and razoring at the last two plies before the horizon,
+    # based on the static score (needs pruning)
+    # workers: number of processes searching the root moves in parallel; 1 searches them
+    # one after another in this process (call close() to shut the process pool down)
+    # shared_tt: the transposition table lives in shared memory and the worker processes
+    # probe and store into it, instead of each root move task filling a table of its own.
+    # Workers then use each other's results, but what a worker finds in the table depends
+    # on timing, so the chosen move is no longer guaranteed to be the same in every run
+    # check_extensions: a node whose side to move is in check is searched one ply deeper, so
+    # a checking line is never cut off while the King escapes (mates just past the horizon)
+    # see: static exchange evaluation - captures losing material are searched after the quiet
+    # moves, and skipped by the quiescence search (needs pruning)
+    # batch_frontier: one ply before the horizon, score the children in one NumPy pass
+    # (frontier.py) instead of making each move; needs NumPy and quiescence=False (with the
+    # quiescence search the horizon is no static score), ignored otherwise
+    def __init__(self, max_depth = AI_MAX_DEPTH, pruning = True, tt_size_mb = TT_SIZE_MB,
+                 iterative_deepening = True, time_limit = None, node_limit = None,
+                 quiescence = True, ordering_heuristics = True, pvs = True, aspiration = True,
+                 null_move = True, late_move_reductions = True, futility = True, workers = 1,
+                 shared_tt = False, batch_frontier = False, see = True, check_extensions = True):
         self.max_depth = max_depth
+        self.quiescence = quiescence and pruning # plain minimax (pruning=False) stops at the horizon
+        self.search_depth = max_depth # horizon of the current iteration
         self.pruning = pruning
+        self.iterative_deepening = iterative_deepening
+        self.time_limit = time_limit
+        self.node_limit = node_limit
+        self.deadline = None
+        self.can_abort = False # the first iteration always completes, so there is a move to play
+        # Game whose stopAI flag cancels the search at any iteration (GUI background search)
+        self.stop_game = None
+        self.pondering = False # searching on the opponent's time: no time limit until ponder_hit()
+        self.nodes = 0 # minimax nodes visited by the last best_move()
+        self.completed_depth = None # max_depth of the last completed iteration
+        # kept between best_move() calls - stored positions stay valid as the game goes on
+        self.tt = None
+        if pruning and tt_size_mb > 0:
+            self.tt = SharedTranspositionTable(tt_size_mb) if shared_tt else TranspositionTable(tt_size_mb)
         self.moves_analyzed = 0
         self.best_score = None  # root score of the last best_move() search
         self.visual_mode = False
-
-    # all legal moves of 'color' as (piece, move) pairs, captures first (highest
-    # captured-piece value first) - good ordering is what makes alpha-beta cut
-    def collect_ordered_moves(self, board, color: int) -> list:
-        legal_moves = []
-        for row in range(ROWS):
-            for col in range(COLS):
-                if board.squares[row][col].has_team_piece(color):
-                    current_piece = board.squares[row][col].piece
-                    current_piece.clear_moves()
-                    board.calc_moves(current_piece, row, col)
-                    for move in current_piece.moves:
-                        legal_moves.append((current_piece, move))
-        # piece.value is signed by color, so order by absolute value; non-captures
-        # (empty destination) get key 0 and stay behind all captures
-        legal_moves.sort(key = lambda pair:
-                         -abs(pair[1].final.piece.value) if pair[1].final.piece else 0.0)
+        # one reusable move list per ply (index = minimax depth), filled by the move generator
+        self.move_buffers = [[] for _ in range(MAX_PLY)]
+        self.quiet_buffers = [[] for _ in range(MAX_PLY)] # quiet moves of staged_moves()
+        self.ordering_heuristics = ordering_heuristics and pruning
+        self.killers = [[0, 0] for _ in range(MAX_PLY)] # two quiet cutoff moves per ply
+        # butterfly history: cutoff count weighted by depth, per side and (from, to) square pair
+        self.history = {WHITE_PIECE_COLOR: [0] * 4096, BLACK_PIECE_COLOR: [0] * 4096}
+        self.countermoves = [0] * 4096 # quiet move that refuted the opponent's previous (from, to)
+        self.pvs = pvs and pruning
+        self.aspiration = aspiration and pruning
+        self.researches = 0 # PVS scouts and aspiration windows searched again by the last best_move()
+        self.null_move = null_move and pruning
+        self.null_move_cutoffs = 0 # nodes cut off by a null move in the last best_move()
+        self.late_move_reductions = late_move_reductions and pruning
+        self.futility = futility and pruning
+        self.reduced_moves = 0 # moves searched with a late move reduction by the last best_move()
+        self.futile_moves = 0 # quiet moves skipped by futility pruning in the last best_move()
+        self.razored_nodes = 0 # nodes answered by the quiescence search through razoring
+        self.see = see and pruning
+        self.check_extensions = check_extensions
+        self.extensions = 0 # nodes searched a ply deeper for being in check in the last best_move()
+        self.repetitions = 0 # nodes scored as a draw by repetition in the last best_move()
+        self.see_pruned = 0 # losing captures skipped by the quiescence search in the last best_move()
+        self.batch_frontier = batch_frontier and HAVE_NUMPY and not self.quiescence
+        self.frontier_batches = 0 # nodes whose children were scored by frontier_scores() in the last best_move()
+        self.workers = workers
+        self.pool = None # process pool, started by the first parallel search
+        self.stop_flag: Optional[SharedStopFlag] = None # stops the workers' searches (see search_root_parallel())
+        # AI options of the worker processes (each builds its own AI per root move)
+        self.worker_options = dict(pruning=pruning, tt_size_mb=tt_size_mb, quiescence=quiescence,
+                                   ordering_heuristics=ordering_heuristics, pvs=pvs,
+                                   null_move=null_move, late_move_reductions=late_move_reductions,
+                                   futility=futility, batch_frontier=batch_frontier, see=see,
+                                   check_extensions=check_extensions)
+
+    # all legal moves of the side to move, captures first (highest captured-piece
+    # value first) - good ordering is what makes alpha-beta cut
+    # OPTIMIZATION: moves are packed ints whose top bits hold the ordering class, so a plain
+    # in-place sort() orders them (no key function, no tuples); ties keep the board scan order
+    # (by from-square) of the Board-based search. Each ply fills its own reused buffer.
+    # 'first_move' (the best move stored in the transposition table) is searched first.
+    # OPTIMIZATION: inside the search the quiet moves (the sorted tail of the list) are ordered
+    # by promotion, killer moves of this ply, the countermove of the opponent's last move and
+    # then the history score - quiet moves that cut off elsewhere in the tree are tried first
+    # OPTIMIZATION: a capture that loses material in the static exchange evaluation (a Queen
+    # taking a defended pawn) goes after the quiet moves instead of ahead of them; only a
+    # capture by a piece worth more than its victim can lose, so only those are evaluated
+    def collect_ordered_moves(self, position: BitboardPosition, ply: int = 0, first_move: int = 0) -> list:
+        legal_moves = position.generate_legal_moves(self.move_buffers[ply])
+        legal_moves.sort()
+        quiet_start = bisect_left(legal_moves, QUIET_BITS)
+        losing_captures: List[int] = []
+        if self.see and quiet_start:
+            mailbox = position.mailbox
+            losing_captures = [move for move in legal_moves[:quiet_start]
+                               if CAPTURE_VALUES[mailbox[(move >> 21) & 0x3F] & ANY_PIECE]
+                               > CAPTURE_VALUES[(move >> 6) & 0x3F] and position.see(move) < 0]
+            for move in losing_captures:
+                legal_moves.remove(move)
+            quiet_start -= len(losing_captures)
+        if ply and self.ordering_heuristics:
+            if len(legal_moves) - quiet_start > 1:
+                killer_1, killer_2 = self.killers[ply]
+                countermove = self.countermoves[butterfly_index(position.history[-1][0])] if position.history else 0
+                history = self.history[position.side_to_move]
+
+                def quiet_order(move):
+                    if move & 0x3F: # promotion
+                        return PROMOTION_ORDER
+                    if move == killer_1:
+                        return KILLER_ORDER + 1
+                    if move == killer_2:
+                        return KILLER_ORDER
+                    if move == countermove:
+                        return COUNTERMOVE_ORDER
+                    return history[(move >> 15) & 0xFFF]
+
+                legal_moves[quiet_start:] = sorted(legal_moves[quiet_start:], key=quiet_order, reverse=True)
+        legal_moves.extend(losing_captures)
+        if first_move and first_move in legal_moves:
+            legal_moves.remove(first_move)
+            legal_moves.insert(0, first_move)
         return legal_moves
 
+    # OPTIMIZATION: staged move picker - the moves of a search node in the order of
+    # collect_ordered_moves(), produced lazily one stage at a time: the table move, the
+    # captures (and Queen promotions) not losing material, the killer moves, the other quiet
+    # moves, and the losing captures. A stage is generated only when the moves before it did
+    # not cut off, so a cut node pays for the moves it tries: the table move and the killers
+    # are checked with is_legal_move() just before they are searched, and the quiet moves
+    # (most of the list) are not generated at all when a capture or a killer cuts off.
+    def staged_moves(self, position: BitboardPosition, ply: int, first_move: int = 0):
+        searched: Tuple[int, ...] = ()
+        if first_move and position.is_legal_move(first_move):
+            yield first_move
+            searched = (first_move,)
+
+        captures = position.generate_legal_captures(self.move_buffers[ply])
+        captures.sort()
+        losing_captures = []
+        mailbox = position.mailbox
+        for move in captures:
+            if move in searched:
+                continue
+            if self.see and move < QUIET_BITS and CAPTURE_VALUES[mailbox[(move >> 21) & 0x3F] & ANY_PIECE] \
+                    > CAPTURE_VALUES[(move >> 6) & 0x3F] and position.see(move) < 0:
+                losing_captures.append(move)
+                continue
+            yield move
+
+        heuristics = ply and self.ordering_heuristics
+        if heuristics:
+            for killer in self.killers[ply]:
+                if killer and killer not in searched and position.is_legal_move(killer):
+                    yield killer
+                    searched += (killer,)
+
+        quiets = position.generate_legal_quiets(self.quiet_buffers[ply])
+        quiets.sort()
+        if heuristics and len(quiets) > 1:
+            countermove = self.countermoves[butterfly_index(position.history[-1][0])] if position.history else 0
+            history = self.history[position.side_to_move]
+            quiets = sorted(quiets, key=lambda move: COUNTERMOVE_ORDER if move == countermove
+                            else history[(move >> 15) & 0xFFF], reverse=True)
+        for move in quiets:
+            if move not in searched:
+                yield move
+        yield from losing_captures
+
     # returns score of the current node in a minimax tree; [alpha, beta] is the
     # window of scores still relevant to the ancestors - branches proven outside
     # it are cut off (pure optimization, never changes the root result)
-    def minimax(self, game_state: Game, screen, depth: int = 0, is_maximizing: bool = True,
-                alpha: float = float('-inf'), beta: float = float('inf')) -> float:
-
-        if self.visual_mode:
-            game_state.show_bg(screen)
-            game_state.show_last_move(screen)
-            game_state.show_pieces_not_moved_yet(screen)                        
-            game_state.show_moves(screen)
-            game_state.show_pieces(screen)
-            game_state.show_AI_moves_analyzed(screen, self.moves_analyzed)
-            pygame.display.update()
-            #time.sleep(1)
-
-        board = game_state.board_states[game_state.move_count]  # creating board variable for better readibility!
-        current_player = game_state.current_player
+    # OPTIMIZATION: the search runs on a BitboardPosition with make/unmake instead of
+    # copying a whole Board (Square and Piece objects) for every node of the tree
+    # 'depth' is the ply from the root; 'reduction' is the number of plies this line was
+    # shortened by (null-move pruning), so the horizon is reached at a smaller depth -
+    # check extensions lengthen it again (a negative reduction moves the horizon out)
+    def minimax(self, position: BitboardPosition, screen, depth: int = 0, is_maximizing: bool = True,
+                alpha: float = float('-inf'), beta: float = float('inf'), reduction: int = 0) -> float:
+
+        current_player = position.side_to_move
+
+        # time / node budget, checked every 1024 nodes
+        self.nodes += 1
+        if self.can_abort and not self.nodes & 1023 and self.budget_exhausted():
+            raise SearchAborted()
 
         # score of the side to move being checkmated at this node; finite and depth-adjusted
         # so that faster mates are preferred and the scores are never masked by the
@@ -64,51 +297,178 @@ class AI:
         mated_score = float(-(MATE_SCORE - depth)) if is_maximizing else float(MATE_SCORE - depth)
 
         # draws detectable from counters alone (cheap, no move generation needed)
-        if game_state.check_fifty_move_rule() or board.check_insufficient_mating_material():
+        if position.check_fifty_move_rule() or position.is_material_draw():
             return 0
 
+        # OPTIMIZATION: draw by repetition inside the tree - a position that already occurred
+        # since the last irreversible move is scored 0 at once (a perpetual check line is not
+        # searched again at every repetition), by comparing Zobrist keys of the undo records
+        if depth and position.is_repetition():
+            self.repetitions += 1
+            return 0
+
+        # OPTIMIZATION: check extension - a node in check is searched one ply deeper: there are
+        # few evasions, and a forced line of checks no longer ends at the horizon before the
+        # mate. At most 2 * search_depth plies deep, so mutual checks cannot run away.
+        in_check = position.is_king_checked(current_player)
+        if in_check and self.check_extensions and depth < 2 * self.search_depth:
+            self.extensions += 1
+            reduction -= 1
+
         # FIXED BUG: the module constant AI_MAX_DEPTH was read here instead of
         # self.max_depth, so the AI(max_depth=...) constructor argument was ignored
-        if depth > self.max_depth:  # if max depth is reached stop recurrence
+        # (search_depth is max_depth of the current iterative deepening iteration)
+        if depth + reduction > self.search_depth:  # if max depth is reached stop recurrence
+            if self.quiescence:
+                return self.quiescence_search(position, depth, is_maximizing, alpha, beta)
             # OPTIMIZATION (no per-node player_has_no_valid_moves scan): at the horizon
             # only look for a checkmate, and only when the king is actually in check
-            if board.is_king_checked(current_player) and not board.has_any_valid_move(current_player):
+            if in_check and not position.has_any_valid_move():
                 return mated_score
-            return board.calculate_piece_score()
+            return position.calculate_piece_score()
+
+        # OPTIMIZATION: transposition table - a position already searched at least as deep
+        # is answered from the table when its stored bound decides this window, otherwise
+        # its stored best move is searched first
+        tt = self.tt
+        tt_move = 0
+        remaining_depth = self.search_depth - depth - reduction + 1
+        if tt is not None:
+            entry = tt.probe(position.zobrist_key)
+            if entry is not None:
+                entry_depth, entry_score, bound, tt_move = entry
+                if entry_depth >= remaining_depth:
+                    entry_score = score_from_tt(entry_score, depth)
+                    if bound == TT_EXACT or (bound == TT_LOWER and entry_score >= beta) \
+                            or (bound == TT_UPPER and entry_score <= alpha):
+                        return entry_score
+        alpha_original, beta_original = alpha, beta
+
+        # OPTIMIZATION: razoring - two plies before the horizon, a static score far below the
+        # window (white to move; above it for black) is unlikely to be rescued by a quiet
+        # move, so the quiescence search decides; only if it gets back into the window is the
+        # node searched normally
+        if self.futility and remaining_depth == 2 and not in_check:
+            static_score = position.calculate_piece_score()
+            if (static_score + RAZOR_MARGIN <= alpha) if is_maximizing else (static_score - RAZOR_MARGIN >= beta):
+                if self.quiescence:
+                    if is_maximizing:
+                        score = self.quiescence_search(position, depth, True, alpha, alpha + NULL_WINDOW)
+                    else:
+                        score = self.quiescence_search(position, depth, False, beta - NULL_WINDOW, beta)
+                else:
+                    score = static_score
+                if (score <= alpha) if is_maximizing else (score >= beta):
+                    self.razored_nodes += 1
+                    return score
+
+        # OPTIMIZATION: null-move pruning - let the side to move pass and search the opponent's
+        # reply NULL_MOVE_REDUCTION plies shallower with a null window at beta (white to move)
+        # / alpha (black to move). If passing still does not let the opponent back into the
+        # window, a real move will not either (some move is almost always better than passing)
+        # and the node is cut without generating its moves. Never two null moves in a row,
+        # never in check (passing would be illegal), and never without pieces other than pawns,
+        # where zugzwang (every move makes it worse) breaks that assumption.
+        if self.null_move and depth and remaining_depth > NULL_MOVE_REDUCTION and position.history[-1][0] != NULL_MOVE \
+                and position.has_non_pawn_material(current_player) and not in_check:
+            static_score = position.calculate_piece_score()
+            if (static_score >= beta) if is_maximizing else (static_score <= alpha):
+                position.make_null_move()
+                if is_maximizing:
+                    score = self.minimax(position, screen, depth + 1, False, beta - NULL_WINDOW, beta,
+                                         reduction + NULL_MOVE_REDUCTION)
+                else:
+                    score = self.minimax(position, screen, depth + 1, True, alpha, alpha + NULL_WINDOW,
+                                         reduction + NULL_MOVE_REDUCTION)
+                position.unmake_null_move()
+                if (score >= beta) if is_maximizing else (score <= alpha):
+                    self.null_move_cutoffs += 1
+                    # the bound itself, not the score: a mate found after passing is no real mate
+                    return beta if is_maximizing else alpha
+
+        # the children are horizon nodes: after the first one (which usually cuts off), score
+        # the rest in one batch - unless a child could be a draw by the counters (fifty-move
+        # rule, a material draw after a capture). The batch scores the whole move list at
+        # once, so those nodes generate it in full instead of stage by stage.
+        frontier = self.batch_frontier and remaining_depth == 1 \
+            and position.halfmove_clock < 99 and position.occupied.bit_count() > 5
+        if frontier:
+            legal_moves = self.collect_ordered_moves(position, depth, tt_move)
+            frontier = len(legal_moves) > 2
+        else:
+            legal_moves = self.staged_moves(position, depth, tt_move)
 
-        # generate all legal moves of the side to move; an empty list means the game is
-        # over at this node - checkmate if the king is in check, stalemate otherwise.
-        # OPTIMIZATION: this replaces the player_has_no_valid_moves() scan formerly done
-        # inside Board.move() for every single node of the search tree.
-        legal_moves = self.collect_ordered_moves(board, current_player)
+        best_score = float('-inf') if is_maximizing else float('inf')
+        best_move = 0
+
+        # OPTIMIZATION: futility pruning - one ply before the horizon, a quiet move cannot
+        # change the material, so with the static score FUTILITY_MARGIN outside the window
+        # (white to move: below alpha, black: above beta) quiet moves that give no check are
+        # skipped. The node then scores at least its futility value (a fail-low bound).
+        futile = False
+        if self.futility and remaining_depth == 1 and not in_check:
+            static_score = position.calculate_piece_score()
+            if is_maximizing and static_score + FUTILITY_MARGIN <= alpha:
+                futile, best_score = True, static_score + FUTILITY_MARGIN
+            elif not is_maximizing and static_score - FUTILITY_MARGIN >= beta:
+                futile, best_score = True, static_score - FUTILITY_MARGIN
+        # late move reductions need a few plies left and no check to escape from
+        reducible = self.late_move_reductions and remaining_depth >= LMR_MIN_DEPTH and not in_check
+        index = -1
+        for index, move in enumerate(legal_moves):
+            if index == 1 and frontier:
+                best_score, frontier_move = self.search_frontier(position, screen, legal_moves[1:], depth, is_maximizing,
+                                                                 alpha, beta, futile, best_score, reduction)
+                best_move = frontier_move or best_move
+                break
 
-        if not legal_moves:
-            if board.is_king_checked(current_player):
-                return mated_score
-            return 0  # stalemate
+            quiet = move >= QUIET_BITS and not move & 0x3F
 
-        best_score = float('-inf') if is_maximizing else float('inf')
+            position.make_move(move)
 
-        for current_piece, move in legal_moves:
-            if depth == self.max_depth:
+            if futile and quiet and not position.is_king_checked(position.side_to_move):
+                self.futile_moves += 1
+                position.unmake_move()
+                continue
+
+            if remaining_depth == 1:
                 self.moves_analyzed += 1
 
-            board.move(current_piece, move, test_check = False, clear_moves = False, ai_minimax=True)
-            game_state.prepare_board_state_for_next_move()
+            # OPTIMIZATION: late move reductions - with good ordering a quiet move this late
+            # in the list rarely beats the earlier ones, so it is first searched one ply
+            # shallower with a null window; only a move that still beats the bound gets the
+            # normal search. Checking moves are never reduced.
+            needs_full_search = True
+            if reducible and quiet and index >= LMR_FULL_DEPTH_MOVES \
+                    and not position.is_king_checked(position.side_to_move):
+                self.reduced_moves += 1
+                if is_maximizing:
+                    score = self.minimax(position, screen, depth + 1, False, alpha, alpha + NULL_WINDOW, reduction + 1)
+                    needs_full_search = score > alpha
+                else:
+                    score = self.minimax(position, screen, depth + 1, True, beta - NULL_WINDOW, beta, reduction + 1)
+                    needs_full_search = score < beta
 
             # - recursively invoke minimax function for the move until 'max_depth' depth is reached
-            score = self.minimax(game_state, screen, depth + 1, not is_maximizing, alpha, beta)
+            if not needs_full_search:
+                pass # the reduced search already proved the move no better than the bound
+            elif index and self.pvs:
+                score = self.scout(position, screen, depth + 1, is_maximizing, alpha, beta, reduction)
+            else:
+                score = self.minimax(position, screen, depth + 1, not is_maximizing, alpha, beta, reduction)
 
-            # - revert to original player and board position
-            game_state.undo_last_move()
+            # - revert to original position
+            position.unmake_move()
 
             # - calculate current best score based on score received from minimax
             # and narrow the alpha-beta window with it
             if is_maximizing:
-                best_score = max(best_score, score)
+                if score > best_score:
+                    best_score, best_move = score, move
                 alpha = max(alpha, best_score)
             else:
-                best_score = min(best_score, score)
+                if score < best_score:
+                    best_score, best_move = score, move
                 beta = min(beta, best_score)
 
             if self.moves_analyzed % 1000 == 0:
@@ -118,13 +478,205 @@ class AI:
             # in the tree, so no ancestor will ever let the game reach this node -
             # the remaining sibling moves cannot influence the root decision
             if self.pruning and beta <= alpha:
+                if self.ordering_heuristics and move >= QUIET_BITS and not move & 0x3F:
+                    self.store_quiet_cutoff(position, move, depth, remaining_depth)
+                break
+
+        # no legal move: the game is over at this node - checkmate if the King is in check,
+        # stalemate otherwise
+        if index < 0:
+            return mated_score if in_check else 0
+
+        if tt is not None:
+            # the returned score is exact only strictly inside the original window
+            if best_score <= alpha_original:
+                bound = TT_UPPER
+            elif best_score >= beta_original:
+                bound = TT_LOWER
+            else:
+                bound = TT_EXACT
+            tt.store(position.zobrist_key, remaining_depth, score_to_tt(best_score, depth), bound, best_move)
+
+        return best_score
+
+    # OPTIMIZATION: principal variation search - with good ordering the first move of a
+    # node is usually the best, so a later move only has to be proven worse, which a
+    # null-window search around the current bound does much cheaper than the full
+    # window. Only a move that beats the bound is searched again with the full window.
+    # 'is_maximizing' is the side of the parent node (the move was already made).
+    def scout(self, position: BitboardPosition, screen, depth: int, is_maximizing: bool,
+              alpha: float, beta: float, reduction: int = 0) -> float:
+        if is_maximizing:
+            score = self.minimax(position, screen, depth, False, alpha, alpha + NULL_WINDOW, reduction)
+        else:
+            score = self.minimax(position, screen, depth, True, beta - NULL_WINDOW, beta, reduction)
+        if alpha < score < beta:
+            self.researches += 1
+            score = self.minimax(position, screen, depth, not is_maximizing, alpha, beta, reduction)
+        return score
+
+    # OPTIMIZATION: batched frontier - the children of a node one ply before the horizon are
+    # static scores, so frontier_scores() computes them in one NumPy pass and alpha-beta runs
+    # over the score vector: the running best in move order, cut at the first score reaching
+    # the bound. Only the children flagged as possible checks (mates, check extensions),
+    # repetitions or special moves are made and searched by minimax(), in move order with the
+    # window the make/unmake loop of minimax() would give them. Same result, move counters and
+    # cutoff move as that loop; 'futile' / 'best_score' come from its futility pruning.
+    def search_frontier(self, position: BitboardPosition, screen, moves: list, depth: int, is_maximizing: bool,
+                        alpha: float, beta: float, futile: bool, best_score: float, reduction: int):
+        self.frontier_batches += 1
+        scores, maybe_check = frontier_scores(position, moves)
+        move_array = np.array(moves, dtype=np.int64)
+        quiet = (move_array >= QUIET_BITS) & ((move_array & 0x3F) == 0)
+        skipped = quiet & ~maybe_check if futile else np.zeros(len(moves), dtype=bool)
+        worst = float('-inf') if is_maximizing else float('inf')
+        # the flagged children in move order, until the ones before them already cut off
+        flagged = np.flatnonzero(maybe_check).tolist()
+        scores[maybe_check | skipped] = worst
+        made = 0 # children searched by minimax(), which counts them itself
+        for index in flagged:
+            if is_maximizing:
+                window = max(alpha, best_score, scores[:index].max() if index else worst), beta
+            else:
+                window = alpha, min(beta, best_score, scores[:index].min() if index else worst)
+            if self.pruning and window[0] >= window[1]:
+                break
+            position.make_move(moves[index])
+            if futile and quiet[index] and not position.is_king_checked(position.side_to_move):
+                skipped[index] = True
+            else:
+                if self.pvs:
+                    scores[index] = self.scout(position, screen, depth + 1, is_maximizing, *window, reduction)
+                else:
+                    scores[index] = self.minimax(position, screen, depth + 1, not is_maximizing, *window, reduction)
+                made += 1
+            position.unmake_move()
+
+        if is_maximizing:
+            running = np.maximum(np.maximum.accumulate(scores), best_score)
+            cutoffs = np.flatnonzero(running >= beta) if self.pruning else np.empty(0, dtype=np.intp)
+        else:
+            running = np.minimum(np.minimum.accumulate(scores), best_score)
+            cutoffs = np.flatnonzero(running <= alpha) if self.pruning else np.empty(0, dtype=np.intp)
+        last = int(cutoffs[0]) if len(cutoffs) else len(moves) - 1
+        searched = last + 1 - int(np.count_nonzero(skipped[:last + 1]))
+        self.futile_moves += last + 1 - searched
+        self.moves_analyzed += searched
+        nodes_before = self.nodes
+        self.nodes += searched - made
+        if self.can_abort and nodes_before >> 10 != self.nodes >> 10 and self.budget_exhausted():
+            raise SearchAborted()
+
+        best_move = 0
+        if running[last] != best_score: # some child beat the initial (futility) score
+            best_score = float(running[last])
+            best_move = moves[int(np.flatnonzero(scores[:last + 1] == best_score)[0])]
+            if len(cutoffs) and self.ordering_heuristics and quiet[last]:
+                self.store_quiet_cutoff(position, moves[last], depth, 1)
+        return best_score, best_move
+
+    # a quiet move caused a beta cutoff: remember it as a killer of this ply, as the
+    # countermove of the opponent's previous move, and raise its history score
+    def store_quiet_cutoff(self, position: BitboardPosition, move: int, ply: int, remaining_depth: int):
+        killers = self.killers[ply]
+        if killers[0] != move:
+            killers[1] = killers[0]
+            killers[0] = move
+        if position.history:
+            self.countermoves[butterfly_index(position.history[-1][0])] = move
+        self.history[position.side_to_move][butterfly_index(move)] += remaining_depth * remaining_depth
+
+    # killers belong to the plies of one search, history scores fade between searches
+    def age_ordering_heuristics(self):
+        for killers in self.killers:
+            killers[0] = killers[1] = 0
+        for history in self.history.values():
+            for index, value in enumerate(history):
+                if value:
+                    history[index] = value >> 1
+
+    # captures of the quiescence search in MVV-LVA order: most valuable victim first, and
+    # among equal victims the least valuable attacker first
+    def collect_ordered_captures(self, position: BitboardPosition, ply: int) -> list:
+        captures = position.generate_legal_captures(self.move_buffers[ply])
+        mailbox = position.mailbox
+        captures.sort(key=lambda move: CAPTURE_VALUES[mailbox[move_from(move)] & ANY_PIECE]
+                      - 16 * (CAPTURE_VALUES[move_captured(move)] + (PROMOTION_GAIN if move_promotion(move) else 0)))
+        return captures
+
+    # OPTIMIZATION: quiescence search - beyond the horizon only captures are searched, until
+    # the position is quiet. The side to move may also "stand pat" (decline every capture and
+    # keep the static score), so the static score bounds the node and a stand pat outside the
+    # window cuts immediately. Delta pruning skips captures that cannot reach the window even
+    # with QS_DELTA_MARGIN to spare, and (with see) captures losing material in the static
+    # exchange evaluation. A side in check has no stand pat and searches all evasions.
+    # Much cheaper than an extra full ply, and the horizon no longer scores half an exchange.
+    def quiescence_search(self, position: BitboardPosition, depth: int, is_maximizing: bool,
+                          alpha: float, beta: float) -> float:
+        current_player = position.side_to_move
+
+        if position.is_material_draw():
+            return 0
+
+        if position.is_king_checked(current_player):
+            stand_pat = None
+            moves = self.collect_ordered_moves(position, depth) if depth < MAX_PLY - 1 else []
+            if not moves:
+                if position.has_any_valid_move():
+                    return position.calculate_piece_score() # out of per-ply buffers
+                return float(-(MATE_SCORE - depth)) if is_maximizing else float(MATE_SCORE - depth)
+            best_score = float('-inf') if is_maximizing else float('inf')
+        else:
+            stand_pat = position.calculate_piece_score()
+            if depth >= MAX_PLY - 1:
+                return stand_pat
+            best_score = stand_pat
+            if is_maximizing:
+                if stand_pat >= beta:
+                    return stand_pat
+                alpha = max(alpha, stand_pat)
+            else:
+                if stand_pat <= alpha:
+                    return stand_pat
+                beta = min(beta, stand_pat)
+            moves = self.collect_ordered_captures(position, depth)
+
+        for move in moves:
+            # delta pruning (never when in check: evasions have no stand pat to compare with)
+            if stand_pat is not None:
+                gain = CAPTURE_VALUES[move_captured(move)] + (PROMOTION_GAIN if move_promotion(move) else 0)
+                if (stand_pat + gain + QS_DELTA_MARGIN <= alpha) if is_maximizing \
+                        else (stand_pat - gain - QS_DELTA_MARGIN >= beta):
+                    continue
+                # a capture losing material in the static exchange evaluation cannot beat
+                # the stand pat (only a piece worth more than its victim can lose)
+                if self.see and CAPTURE_VALUES[position.mailbox[move_from(move)] & ANY_PIECE] \
+                        > CAPTURE_VALUES[move_captured(move)] and position.see(move) < 0:
+                    self.see_pruned += 1
+                    continue
+
+            self.nodes += 1
+            if self.can_abort and not self.nodes & 1023 and self.budget_exhausted():
+                raise SearchAborted()
+
+            position.make_move(move)
+            score = self.quiescence_search(position, depth + 1, not is_maximizing, alpha, beta)
+            position.unmake_move()
+
+            if is_maximizing:
+                best_score = max(best_score, score)
+                alpha = max(alpha, best_score)
+            else:
+                best_score = min(best_score, score)
+                beta = min(beta, best_score)
+            if beta <= alpha:
                 break
 
         return best_score
 
     # function for debugging
     def show_all_possible_moves(self, game_state: Game) -> None:
-        board = game_state.board_states[game_state.move_count]
+        board = game_state.board
         for row in range(ROWS):
             for col in range(COLS):
                 if board.squares[row][col].has_team_piece(game_state.current_player):
@@ -134,32 +686,61 @@ class AI:
                         move.show(current_piece.name, comment)
 
 
-    # Choosing best move for the AI
-    # returns Piece and Move of the best move found
-    # returns None, None Tuple if move not found
-    # we as black are minimizing the score    
-    def best_move(self, game_state: Game, screen) -> tuple[Piece, Move]:
-        best_score: float
-        best_piece: Piece = None
-        best_move: Move = None
-        self.moves_analyzed = 0
-
+    # Returns the Board's (Piece, Move) pair matching a bitboard move found by the search
+    @staticmethod
+    def board_move_for(board, move: int) -> Tuple[Piece, Move]:
+        from_row, from_col = divmod(move_from(move), COLS)
+        to_row, to_col = divmod(move_to(move), COLS)
+        piece = board.squares[from_row][from_col].piece
+        piece.clear_moves()
+        board.calc_moves(piece, from_row, from_col)
+        for board_move in piece.moves:
+            if (board_move.final.row, board_move.final.col) == (to_row, to_col):
+                return piece, board_move
+        return None, None
+
+    # visual mode: show the position being analyzed and the moves count (root moves only)
+    def show_search_progress(self, game_state: Game, screen) -> None:
+        game_state.show_bg(screen)
+        game_state.show_last_move(screen)
+        game_state.show_pieces_not_moved_yet(screen)
+        game_state.show_moves(screen)
+        game_state.show_pieces(screen)
+        game_state.show_AI_moves_analyzed(screen, self.moves_analyzed)
+        pygame.display.update()
+
+    def budget_exhausted(self) -> bool:
+        if self.stop_flag is not None and self.stop_flag.is_set():
+            return True # a worker process stopped by the parallel search
+        if self.stop_game is not None:
+            if self.stop_game.stopAI:
+                return True # cancelled by the GUI
+            if self.completed_depth is None:
+                return False # the time / node budget never stops the first iteration
+        if self.deadline is not None and time.perf_counter() >= self.deadline:
+            return True
+        return self.node_limit is not None and self.nodes >= self.node_limit
+
+    # Searches every root move in the given order to the current search_depth, within the
+    # (alpha, beta) aspiration window; stops at the first move scoring outside the window.
+    # Returns the best score, the best move (None if no move beats the initial bound)
+    # and the (score, move) pairs of the searched root moves.
+    def search_root(self, game_state: Game, screen, position: BitboardPosition, root_moves: list,
+                    alpha: float = float('-inf'), beta: float = float('inf')):
+        best_move = None
+        maximizing = position.side_to_move == WHITE_PIECE_COLOR
         # initialize best_score with the worst possible score for player
-        if game_state.current_player == WHITE_PIECE_COLOR:
-            best_score = -1000
-        else:
-            best_score = 1000
-
-        board = game_state.board_states[game_state.move_count]
-        maximizing = game_state.current_player == WHITE_PIECE_COLOR
+        best_score: float = -1000 if maximizing else 1000
+        root_scores = []
 
-        # test each valid move in current position, best captures first so that the
+        # test each valid move in current position, best moves first so that the
         # alpha-beta window narrows as early as possible
-        for current_piece, move in self.collect_ordered_moves(board, game_state.current_player):
+        for index, move in enumerate(root_moves):
             moves_analyzed_so_far = self.moves_analyzed
+            if self.visual_mode:
+                self.show_search_progress(game_state, screen)
 
-            board.move(current_piece, move, test_check = False, clear_moves = False, ai_minimax=True)
-            game_state.prepare_board_state_for_next_move()
+            position.make_move(move)
 
             # - recursively invoke minimax function for the move until 'max_depth' depth is reached
             # invoke minimax method at depth=1 because best_move() method covers moves at depth=0.
@@ -167,30 +748,247 @@ class AI:
             # worse than the best move found so far is cut off, which can only affect
             # scores of moves that would not be chosen anyway
             if maximizing:
-                score = self.minimax(game_state, screen, 1, is_maximizing = False,
-                                     alpha = best_score, beta = float('inf'))
+                window = max(alpha, best_score), beta
             else:
-                score = self.minimax(game_state, screen, 1, is_maximizing = True,
-                                     alpha = float('-inf'), beta = best_score)
+                window = alpha, min(beta, best_score)
+            if index and self.pvs:
+                score = self.scout(position, screen, 1, maximizing, *window)
+            else:
+                score = self.minimax(position, screen, 1, not maximizing, *window)
 
-            # - revert to original player and board position
-            game_state.undo_last_move()
+            # - revert to original position
+            position.unmake_move()
+            root_scores.append((score, move))
             comment = f"Calculated score {score} for move based on {self.moves_analyzed-moves_analyzed_so_far} moves."
-            move.show(current_piece.name, comment)
+            position.show_move(move, comment)
 
             # if found score is better for the root player, set it as best_score
             if (score > best_score) if maximizing else (score < best_score):
                 best_score = score
                 best_move = move
-                best_piece = current_piece
                 comment = f"Found new best move: {best_score}"
-                best_move.show(best_piece.name, comment)
+                position.show_move(best_move, comment)
+                if (score >= beta) if maximizing else (score <= alpha):
+                    break # fails high out of the aspiration window - the caller widens it
+
+        return best_score, best_move, root_scores
+
+    def worker_pool(self):
+        if self.pool is None:
+            # spawn: workers start from a fresh interpreter on every platform (no forked
+            # pygame state), importing this module to run search_root_move()
+            self.pool = multiprocessing.get_context("spawn").Pool(self.workers)
+            self.stop_flag = SharedStopFlag()
+        return self.pool
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.terminate()
+            self.pool.join()
+            self.pool = None
+        if self.stop_flag is not None:
+            self.stop_flag.close()
+            self.stop_flag = None
+        if isinstance(self.tt, SharedTranspositionTable):
+            self.tt.close()
+            self.tt = None
+
+    # search_root() spread over the process pool, same arguments and result.
+    # OPTIMIZATION: root moves are searched in parallel, 'workers' moves at a time. The first
+    # move (the previous iteration's best) is searched alone and sets the bound; each later
+    # batch is searched with the best score of all batches before it as its root alpha (white)
+    # / beta (black). The bound a move is searched with therefore depends only on the root
+    # order, never on which worker finishes first, and each move is searched by a fresh AI
+    # (search_root_move()), so the chosen move at a fixed depth is the same in every run -
+    # and the same move search_root() chooses when the search does not depend on the window.
+    # FIXED BUG: the workers only got a snapshot of the deadline, so neither Game.stopAI
+    # (SearchThread.cancel()) nor a ponder_hit() deadline reached a running batch, and a
+    # cancelled ponder search froze the GUI until the batch finished at full depth. While a
+    # batch runs, this process now checks budget_exhausted() every WORKER_POLL_INTERVAL and
+    # sets the shared stop flag, which the workers read every 1024 nodes.
+    def search_root_parallel(self, game_state: Game, screen, position: BitboardPosition, root_moves: list,
+                             alpha: float = float('-inf'), beta: float = float('inf')):
+        best_move = None
+        maximizing = position.side_to_move == WHITE_PIECE_COLOR
+        best_score = -1000 if maximizing else 1000
+        root_scores = []
+        pool = self.worker_pool()
+        deadline = self.deadline if self.can_abort else None
+        # pickled as its shared memory name - the workers attach to this process's table
+        shared_tt = self.tt if isinstance(self.tt, SharedTranspositionTable) else None
+
+        start = 0
+        while start < len(root_moves):
+            batch = root_moves[start:start + (self.workers if start else 1)]
+            start += len(batch)
+            if self.visual_mode:
+                self.show_search_progress(game_state, screen)
+            if maximizing:
+                window = max(alpha, best_score), beta
+            else:
+                window = alpha, min(beta, best_score)
+            stop_flag = self.stop_flag
+            assert stop_flag is not None # started with the pool
+            stop_flag.clear()
+            pending = pool.starmap_async(search_root_move, [(position, move, self.search_depth, *window,
+                                                             self.worker_options, deadline, shared_tt, stop_flag)
+                                                            for move in batch])
+            while not pending.ready():
+                pending.wait(WORKER_POLL_INTERVAL)
+                if self.can_abort and self.budget_exhausted():
+                    stop_flag.set() # the workers return no score within 1024 nodes
+            results = pending.get()
+            for move, (score, nodes, moves_analyzed) in zip(batch, results):
+                self.nodes += nodes
+                self.moves_analyzed += moves_analyzed
+                if score is None:
+                    raise SearchAborted()
+                root_scores.append((score, move))
+            # batch results in root order: ties go to the earlier move, as in search_root()
+            for score, move in root_scores[-len(batch):]:
+                if (score > best_score) if maximizing else (score < best_score):
+                    best_score = score
+                    best_move = move
+                    comment = f"Found new best move: {best_score}"
+                    position.show_move(best_move, comment)
+                    if (score >= beta) if maximizing else (score <= alpha):
+                        return best_score, best_move, root_scores # fails high out of the aspiration window
+            if self.can_abort and self.budget_exhausted():
+                raise SearchAborted()
+
+        return best_score, best_move, root_scores
+
+    # Choosing best move for the AI
+    # returns Piece and Move of the best move found
+    # returns None, None Tuple if move not found
+    # we as black are minimizing the score
+    # OPTIMIZATION: iterative deepening - each iteration orders the root moves by the scores
+    # of the previous one (and fills the transposition table with best moves for the next),
+    # and the time / node budget makes the move time predictable
+    def best_move(self, game_state: Game, screen) -> tuple[Piece, Move]:
+        position = BitboardPosition.from_board(game_state.board, game_state.current_player,
+                                               game_state.position_history[:-1])
+        return self.play_move(game_state, self.search_position(game_state, screen, position))
+
+    # The search part of best_move(): returns the best bitboard move for the side to move of
+    # 'position' (None = no non-losing move or search cancelled) and sets best_score.
+    # Touches neither the Board nor the screen (unless visual_mode), so the GUI runs it on a
+    # background thread (search_thread.py) on a position converted beforehand.
+    def search_position(self, game_state: Game, screen, position: BitboardPosition):
+        self.moves_analyzed = 0
+        self.nodes = 0
+        self.deadline = None
+        if self.time_limit is not None and not self.pondering:
+            self.deadline = time.perf_counter() + self.time_limit
+        self.completed_depth = None
+        self.researches = 0
+        self.null_move_cutoffs = 0
+        self.reduced_moves = self.futile_moves = self.razored_nodes = self.frontier_batches = 0
+        self.see_pruned = self.extensions = self.repetitions = 0
+        if self.ordering_heuristics:
+            self.age_ordering_heuristics()
+
+        maximizing = position.side_to_move == WHITE_PIECE_COLOR
+        root_moves = list(self.collect_ordered_moves(position))
+        best_score, best_move = None, None
+        search_root = self.search_root_parallel if self.workers > 1 else self.search_root
+
+        first_depth = 0 if self.iterative_deepening else self.max_depth
+        for search_depth in range(first_depth, self.max_depth + 1):
+            self.search_depth = search_depth
+            self.can_abort = self.completed_depth is not None or self.stop_game is not None
+            # OPTIMIZATION: aspiration window - the score rarely moves much from one iteration
+            # to the next, so the root is first searched with a narrow window around the
+            # previous score (more cutoffs); a score outside it widens that side and searches again
+            alpha, beta = float('-inf'), float('inf')
+            if self.aspiration and best_score is not None and abs(best_score) < MATE_THRESHOLD:
+                alpha, beta = best_score - ASPIRATION_WINDOW, best_score + ASPIRATION_WINDOW
+            try:
+                while True:
+                    iteration_score, iteration_move, root_scores = \
+                        search_root(game_state, screen, position, root_moves, alpha, beta)
+                    if iteration_score <= alpha:
+                        alpha = float('-inf')
+                    elif iteration_score >= beta:
+                        beta = float('inf')
+                    else:
+                        break
+                    self.researches += 1
+                best_score, best_move = iteration_score, iteration_move
+            except SearchAborted:
+                if self.stop_game is not None and self.stop_game.stopAI:
+                    print(f"Search cancelled during depth {search_depth}.")
+                    best_move = None
+                else:
+                    print(f"Search budget used up during depth {search_depth}.")
+                break
+            self.completed_depth = search_depth
+            # best move first, then the others by their score (stable: ties keep their order)
+            root_scores.sort(key=lambda scored: scored[0], reverse=maximizing)
+            root_moves = [move for _, move in root_scores]
+            if best_move is not None:
+                root_moves.remove(best_move)
+                root_moves.insert(0, best_move)
+            if self.budget_exhausted():
+                break
 
         self.best_score = best_score
+        return best_move
+
+    # The opponent played the move a pondering search assumed: from now on the search runs
+    # as a normal one, with the time limit counted from this moment (called from another
+    # thread than the search; the search reads the deadline every 1024 nodes)
+    def ponder_hit(self):
+        if self.time_limit is not None:
+            self.deadline = time.perf_counter() + self.time_limit
+        self.pondering = False
+
+    # Expected reply of the side to move in 'position': the transposition table move stored
+    # by the last search (the second move of its principal variation), 0 if there is none
+    def predicted_reply(self, position: BitboardPosition) -> int:
+        if self.tt is None:
+            return 0
+        entry = self.tt.probe(position.zobrist_key)
+        if entry is None or entry[3] not in position.generate_legal_moves():
+            return 0
+        return entry[3]
 
+    # Plays the bitboard move found by search_position() on the game's Board; returns its
+    # Piece and Move, or None, None if there is no move
+    def play_move(self, game_state: Game, best_move) -> tuple[Piece, Move]:
+        board = game_state.board
         if best_move is not None:
-            board.move(best_piece, best_move)
-            print(f"AI found a move after analyzing {self.moves_analyzed} moves (depth = {self.max_depth}). It's score is {best_score}.")
-            return best_piece, best_move
+            best_piece, board_move = self.board_move_for(board, best_move)
+            board.move(best_piece, board_move)
+            print(f"AI found a move after analyzing {self.moves_analyzed} moves (depth = {self.completed_depth}). It's score is {self.best_score}.")
+            if self.tt is not None:
+                print(f"Transposition table: {self.tt.hits} hits, {self.tt.misses} misses, {self.tt.collisions} collisions.")
+            return best_piece, board_move
         else: # this means AI didn't find any non-losing move so it should resing 
             return None, None
+
+
+# Process pool task of AI.search_root_parallel(): searches one root move on the worker's own
+# copy of the root position (unpickled from the task), with a fresh AI - an empty
+# transposition table and move ordering tables, so the score depends only on the arguments.
+# With 'shared_tt' the AI uses that shared table instead of an empty one of its own.
+# Returns (score, minimax nodes, moves analyzed); the score is None if the deadline passed
+# or the searching process set 'stop_flag'.
+def search_root_move(position: BitboardPosition, move: int, search_depth: int, alpha: float, beta: float,
+                     options: dict, deadline, shared_tt: Optional[SharedTranspositionTable] = None,
+                     stop_flag: Optional[SharedStopFlag] = None):
+    if shared_tt is not None:
+        options = dict(options, tt_size_mb=0)
+    ai = AI(max_depth=search_depth, iterative_deepening=False, **options)
+    if shared_tt is not None:
+        ai.tt = shared_tt
+    ai.deadline = deadline
+    ai.stop_flag = stop_flag
+    ai.can_abort = deadline is not None or stop_flag is not None
+    maximizing = position.side_to_move == WHITE_PIECE_COLOR
+    position.make_move(move)
+    try:
+        score = ai.minimax(position, None, 1, not maximizing, alpha, beta)
+    except SearchAborted:
+        score = None
+    return score, ai.nodes, ai.moves_analyzed
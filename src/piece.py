@@ -130,28 +130,27 @@ class Piece:
 class Pawn(Piece):
     def __init__(self, color: int):
         self.dir = -1 if color == WHITE_PIECE_COLOR else 1
-        self.en_passant = False # can the Pawn be captured en passant?
-        super().__init__("pawn", color, 1.0)
+        super().__init__("pawn", color, PIECE_VALUES[PAWN_PIECE])
         
 class Knight(Piece):
     def __init__(self, color: int):
-        super().__init__("knight", color, 3.0)
+        super().__init__("knight", color, PIECE_VALUES[KNIGHT_PIECE])
 
 class Bishop(Piece):
     def __init__(self, color: int):
-        super().__init__("bishop", color, 3.0)
+        super().__init__("bishop", color, PIECE_VALUES[BISHOP_PIECE])
 
 
 class Rook(Piece):
     def __init__(self, color: int):
-        super().__init__("rook", color, 5.0)
+        super().__init__("rook", color, PIECE_VALUES[ROOK_PIECE])
 
 
 class Queen(Piece):
     def __init__(self, color: int):
-        super().__init__("queen", color, 9.0)
+        super().__init__("queen", color, PIECE_VALUES[QUEEN_PIECE])
 
 
 class King(Piece):
     def __init__(self, color: int):
-        super().__init__("king", color, 10000.0)
\ No newline at end of file
+        super().__init__("king", color, PIECE_VALUES[KING_PIECE])
\ No newline at end of file
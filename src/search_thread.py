@@ -0,0 +1,73 @@
+from const import *
+from game import Game
+from bitboard import BitboardPosition
+import queue
+import threading
+from typing import Optional
+
+'''
+Background AI search for the GUI.
+
+Main.AI_turn() used to call AI.best_move() inside the pygame event loop, so the window
+froze (and was reported as not responding) for the whole search. SearchThread runs
+AI.search_position() on a daemon thread instead and hands the found move back through a
+queue; the event loop keeps drawing and polls result() once per frame, then plays the
+move on the Board itself with AI.play_move(). The Board is read only here, when the
+search position is converted, before the thread starts - the thread never touches it.
+
+The search is cancelled through Game.stopAI: cancel() sets it and waits for the thread,
+which notices the flag within 1024 search nodes (AI.budget_exhausted()).
+
+Pondering: with a 'ponder_move' the thread searches, during the opponent's turn and
+without a time limit, the position after that predicted reply. If the opponent plays it
+(ponder_key matches), ponder_hit() turns it into the AI's normal search, which has often
+finished already; otherwise the ponder search is cancelled.
+'''
+
+class SearchThread:
+    def __init__(self, ai, game_state: Game, ponder_move: int = 0):
+        self.ai = ai
+        self.game_state = game_state
+        self.position = BitboardPosition.from_board(game_state.board, game_state.current_player,
+                                                    game_state.position_history[:-1])
+        self.pondering = bool(ponder_move)
+        if self.pondering:
+            self.position.make_move(ponder_move)
+            self.ponder_key = self.position.zobrist_key # position the search is for
+        self.results: "queue.Queue[Optional[int]]" = queue.Queue(maxsize=1)
+        self.error = None # exception raised by the search, re-raised by result()
+        ai.stop_game = game_state
+        ai.pondering = self.pondering
+        self.thread = threading.Thread(target=self.run, name="AI search", daemon=True)
+        self.thread.start()
+
+    # FIXED BUG: an exception ended the thread without a result - thinking() turned False
+    # while result() kept raising queue.Empty, so the GUI waited for the AI move forever.
+    # The exception is kept and re-raised by result() in the GUI thread instead.
+    def run(self):
+        try:
+            self.results.put(self.ai.search_position(self.game_state, None, self.position))
+        except Exception as error:
+            self.error = error
+        finally:
+            self.ai.stop_game = None
+            self.ai.pondering = False
+
+    def ponder_hit(self):
+        self.pondering = False
+        self.ai.ponder_hit()
+
+    # True while the search is still running
+    def thinking(self) -> bool:
+        return self.thread.is_alive() and self.results.empty()
+
+    # The bitboard move found (None = AI resigns), or raises queue.Empty while still searching
+    # (and the exception of the search if it failed)
+    def result(self):
+        if self.error is not None:
+            raise self.error
+        return self.results.get_nowait()
+
+    def cancel(self):
+        self.game_state.stopAI = True
+        self.thread.join()
@@ -0,0 +1,188 @@
+from const import *
+from array import array
+from multiprocessing import shared_memory
+import struct
+from typing import Dict, Optional
+
+'''
+Fixed-size transposition table for the AI search.
+
+Results of searched positions are remembered by Zobrist key (zobrist.py), so a position
+reached again through a different move order (a transposition) is answered from the
+table instead of being searched again.
+
+The table lives in parallel typed arrays (array module - one machine value per slot, no
+per-entry Python objects) sized from a megabyte budget. Slots are grouped in buckets of
+two: slot 0 is depth-preferred (replaced only by a search at least as deep, or by the
+same position), slot 1 is always-replace (keeps the most recent entry). A bucket is
+chosen by the low bits of the key; the full key is stored to reject other positions
+sharing the bucket.
+
+SharedTranspositionTable keeps the same buckets in a multiprocessing.shared_memory block,
+so the worker processes of a parallel search probe and store into one table.
+'''
+
+# bound types of a stored score (0 marks an empty slot)
+TT_EXACT = 1 # score is exact
+TT_LOWER = 2 # search failed high: true score >= stored score
+TT_UPPER = 3 # search failed low: true score <= stored score
+
+# mate scores are depth-adjusted (MATE_SCORE - ply); scores above this are mates
+MATE_THRESHOLD = MATE_SCORE - MAX_PLY
+
+
+# Mate scores count plies from the root, but a stored position may be reached at another
+# ply later on - the table keeps them relative to the node ('ply' = node ply from root)
+def score_to_tt(score: float, ply: int) -> float:
+    if score > MATE_THRESHOLD:
+        return score + ply
+    if score < -MATE_THRESHOLD:
+        return score - ply
+    return score
+
+def score_from_tt(score: float, ply: int) -> float:
+    if score > MATE_THRESHOLD:
+        return score - ply
+    if score < -MATE_THRESHOLD:
+        return score + ply
+    return score
+
+
+class TranspositionTable:
+    ENTRY_BYTES = 8 + 8 + 4 + 1 + 1 # key, score, best move, depth, bound
+
+    def __init__(self, size_mb: int = TT_SIZE_MB):
+        self.size_mb = size_mb
+        entries = max(2, size_mb * 1024 * 1024 // self.ENTRY_BYTES)
+        buckets = 1 << ((entries // 2).bit_length() - 1) # power of two: bucket = key & mask
+        self.bucket_mask = buckets - 1
+        self.size = buckets * 2
+        self.keys = array('Q', bytes(8 * self.size))
+        self.scores = array('d', bytes(8 * self.size))
+        self.moves = array('I', bytes(4 * self.size))
+        self.depths = array('b', bytes(self.size))
+        self.bounds = array('b', bytes(self.size))
+        self.hits = 0
+        self.misses = 0
+        self.collisions = 0 # misses on a bucket occupied by other positions
+
+    def clear(self):
+        self.__init__(self.size_mb)
+
+    # Returns (depth, score, bound, best move) stored for 'key', or None
+    def probe(self, key: int):
+        index = (key & self.bucket_mask) << 1
+        bounds = self.bounds
+        keys = self.keys
+        for slot in (index, index + 1):
+            if bounds[slot] and keys[slot] == key:
+                self.hits += 1
+                return self.depths[slot], self.scores[slot], bounds[slot], self.moves[slot]
+        self.misses += 1
+        if bounds[index] or bounds[index + 1]:
+            self.collisions += 1
+        return None
+
+    def store(self, key: int, depth: int, score: float, bound: int, move: int):
+        slot = (key & self.bucket_mask) << 1
+        if self.bounds[slot] and self.keys[slot] != key and depth < self.depths[slot]:
+            slot += 1 # keep the deeper entry, replace the always-replace slot
+        self.keys[slot] = key
+        self.depths[slot] = depth
+        self.scores[slot] = score
+        self.bounds[slot] = bound
+        self.moves[slot] = move
+
+
+# a float score as the 64 bits of its IEEE double, and back
+_DOUBLE = struct.Struct('<d')
+_BITS = struct.Struct('<Q')
+
+def score_to_bits(score: float) -> int:
+    return _BITS.unpack(_DOUBLE.pack(score))[0]
+
+def score_from_bits(bits: int) -> float:
+    return _DOUBLE.unpack(_BITS.pack(bits))[0]
+
+
+# Shared tables already attached in this process, by shared memory name
+_attached_tables: Dict[str, 'SharedTranspositionTable'] = {}
+
+def attach_shared_table(size_mb: int, name: str):
+    table = _attached_tables.get(name)
+    if table is None:
+        table = _attached_tables[name] = SharedTranspositionTable(size_mb, name)
+    return table
+
+
+# Transposition table in a shared memory block, usable from several processes at once.
+# A slot is three 64-bit words: key ^ score bits ^ data, the score bits and the data
+# (move | depth << 32 | bound << 40). No locks: a store from another process running at
+# the same time can leave a slot half written, but then the XOR of its words no longer
+# gives the key and probe() treats it as a miss.
+# Pickling the table (e.g. as a process pool task argument) passes only its size and the
+# block name; the receiving process attaches to the same block, once per process.
+# The process that created the table must close() it, which also frees the block.
+class SharedTranspositionTable(TranspositionTable):
+    SLOT_WORDS = 3
+    ENTRY_BYTES = 8 * SLOT_WORDS
+
+    def __init__(self, size_mb: int = TT_SIZE_MB, name: Optional[str] = None):
+        self.size_mb = size_mb
+        entries = max(2, size_mb * 1024 * 1024 // self.ENTRY_BYTES)
+        buckets = 1 << ((entries // 2).bit_length() - 1)
+        self.bucket_mask = buckets - 1
+        self.size = buckets * 2
+        self.owner = name is None
+        if self.owner:
+            self.memory = shared_memory.SharedMemory(create=True, size=self.ENTRY_BYTES * self.size)
+        else:
+            self.memory = shared_memory.SharedMemory(name=name)
+        self.name = self.memory.name
+        assert self.memory.buf is not None # None only after close()
+        self.words = self.memory.buf.cast('Q') # a new block is zero-filled: all slots empty
+        self.hits = 0
+        self.misses = 0
+        self.collisions = 0
+
+    def __reduce__(self):
+        return attach_shared_table, (self.size_mb, self.name)
+
+    def clear(self):
+        self.words[:] = array('Q', bytes(self.ENTRY_BYTES * self.size))
+        self.hits = self.misses = self.collisions = 0
+
+    def close(self):
+        _attached_tables.pop(self.name, None)
+        self.words.release()
+        self.memory.close()
+        if self.owner:
+            self.memory.unlink()
+
+    def probe(self, key: int):
+        index = (key & self.bucket_mask) * (2 * self.SLOT_WORDS)
+        words = self.words
+        for slot in (index, index + self.SLOT_WORDS):
+            data = words[slot + 2]
+            score_bits = words[slot + 1]
+            if data and words[slot] ^ score_bits ^ data == key:
+                self.hits += 1
+                depth = (((data >> 32) & 0xFF) ^ 0x80) - 0x80 # signed byte
+                return depth, score_from_bits(score_bits), data >> 40, data & 0xFFFFFFFF
+        self.misses += 1
+        if words[index + 2] or words[index + self.SLOT_WORDS + 2]:
+            self.collisions += 1
+        return None
+
+    def store(self, key: int, depth: int, score: float, bound: int, move: int):
+        slot = (key & self.bucket_mask) * (2 * self.SLOT_WORDS)
+        words = self.words
+        data = words[slot + 2]
+        if data and words[slot] ^ words[slot + 1] ^ data != key \
+                and depth < (((data >> 32) & 0xFF) ^ 0x80) - 0x80:
+            slot += self.SLOT_WORDS # keep the deeper entry, replace the always-replace slot
+        score_bits = score_to_bits(score)
+        data = move | (depth & 0xFF) << 32 | bound << 40
+        words[slot + 1] = score_bits
+        words[slot + 2] = data
+        words[slot] = key ^ score_bits ^ data
@@ -0,0 +1,28 @@
+from const import *
+from typing import List
+import random
+
+'''
+Zobrist keys shared by Board and BitboardPosition, built once at import.
+
+The key of a position is the XOR of one random 64-bit number per (piece, square), one
+per castling rights mask, one per en passant file and SIDE_KEY when black is to move.
+A move changes only a few of these terms, so the key is updated with a handful of XORs
+per move instead of hashing the whole board, and equal positions get equal ints.
+
+The generator is seeded: keys are the same in every run and every process.
+'''
+
+PIECE_CODE_MASK = ANY_PIECE | WHITE_PIECE_COLOR # piece type | color, without the state bits
+
+_random = random.Random(0x2B992DDFA23249D6)
+
+# PIECE_KEYS[piece code][sq] with sq = row * 8 + col; code 0 (empty square) hashes to 0
+PIECE_KEYS: List[List[int]] = [[0] * (ROWS * COLS) for _ in range((KING_PIECE | WHITE_PIECE_COLOR) + 1)]
+for piece_type in PIECE_TYPES:
+    for color in (WHITE_PIECE_COLOR, BLACK_PIECE_COLOR):
+        PIECE_KEYS[piece_type | color] = [_random.getrandbits(64) for _ in range(ROWS * COLS)]
+
+SIDE_KEY: int = _random.getrandbits(64) # XORed in when black is to move
+CASTLING_KEYS: List[int] = [_random.getrandbits(64) for _ in range(16)] # indexed by castling rights bits
+EN_PASSANT_KEYS: List[int] = [_random.getrandbits(64) for _ in range(COLS)] # indexed by file
@@ -39,7 +39,7 @@ MIDDLEGAME_MOVES = [
 
 
 def play(game, from_sq, to_sq):
-    board = game.board_states[game.move_count]
+    board = game.board
     piece = board.squares[from_sq[0]][from_sq[1]].piece
     piece.clear_moves()
     board.calc_moves(piece, from_sq[0], from_sq[1])
@@ -52,8 +52,7 @@ def play(game, from_sq, to_sq):
 
 
 def game_at_start():
-    """Start position with one played move pair so that the search runs at
-    move_count >= 1 (undo_last_move() is a no-op at move_count <= 1)."""
+    """Start position with one played move pair (1. e4 e5)."""
     game = Game()
     play(game, (6, 4), (4, 4))  # e4
     play(game, (1, 4), (3, 4))  # e5
@@ -4,7 +4,14 @@ Pruning is a pure optimization: it must never change the move chosen at the
 root or its score, only the number of nodes visited. Each test runs the same
 search twice - AI(pruning=False) (plain minimax) vs AI(pruning=True) - from an
 identical position and asserts identical root score and chosen move, and that
-pruning did not analyze more moves than the plain search.
+pruning did not analyze more moves than the plain search. The pruned search runs
+without the transposition table (tt_size_mb=0) and both run one fixed-depth
+search (iterative_deepening=False). Null move pruning, late move reductions,
+futility pruning, razoring, PVS, aspiration windows and SEE pruning, which
+pruning=True also enables, are turned off, so only the cutoff is compared; the
+table, iterative deepening and those techniques have their own tests (e.g.
+tests/test_transposition.py, tests/test_iterative_deepening.py,
+tests/test_null_move.py, tests/test_pvs.py, tests/test_forward_pruning.py).
 
 The slow depth-2 middlegame comparison (plain minimax alone takes several
 seconds) is skipped by default. Enable it with:
@@ -42,7 +49,7 @@ MIDDLEGAME_MOVES = [
 
 
 def play(game, from_sq, to_sq):
-    board = game.board_states[game.move_count]
+    board = game.board
     piece = board.squares[from_sq[0]][from_sq[1]].piece
     piece.clear_moves()
     board.calc_moves(piece, from_sq[0], from_sq[1])
@@ -55,8 +62,7 @@ def play(game, from_sq, to_sq):
 
 
 def game_at_start():
-    """Start position with one played move pair so that the search runs at
-    move_count >= 1 (undo_last_move() is a no-op at move_count <= 1)."""
+    """Start position with one played move pair (1. e4 e5)."""
     game = Game()
     play(game, (6, 4), (4, 4))  # e4
     play(game, (1, 4), (3, 4))  # e5
@@ -72,7 +78,11 @@ def game_at_middlegame():
 
 def search(game_factory, depth, pruning):
     game = game_factory()
-    ai = AI(max_depth=depth, pruning=pruning)
+    # pruning=True also turns on the forward pruning and window techniques, which may
+    # change the result: only the alpha-beta cutoff is kept
+    ai = AI(max_depth=depth, pruning=pruning, tt_size_mb=0, iterative_deepening=False,
+            quiescence=False, null_move=False, late_move_reductions=False, futility=False,
+            pvs=False, aspiration=False, see=False)
     started = time.perf_counter()
     with contextlib.redirect_stdout(io.StringIO()):
         piece, move = ai.best_move(game, None)
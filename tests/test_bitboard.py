@@ -0,0 +1,231 @@
+"""Bitboard search backend - IMPROVEMENTS.md section 4.
+
+The AI search runs on BitboardPosition (src/bitboard.py) instead of copying
+Board objects. These tests pin it to the Board rules reference:
+- perft counts of the bitboard make/unmake tree match the same reference values
+  as tests/test_perft.py
+- the legal moves of a converted position are exactly the moves Board.calc_moves()
+  generates (castling, en passant and promotion included)
+- make_move() / unmake_move() restore the position exactly
+- the pin/checker-aware legal generator emits exactly the pseudo-legal moves that
+  survive a make / is_king_checked / unmake probe, in every node of the tested trees
+- Board.is_king_checked() (attack-table probing from the King square) agrees with
+  the bitboard check detection after every move of the tested positions
+
+Run standalone:  python .\tests\test_bitboard.py
+Or with pytest:  pytest tests
+"""
+import os
+import sys
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(REPO_ROOT, "tests"))
+sys.path.insert(0, os.path.join(REPO_ROOT, "src"))
+os.chdir(REPO_ROOT)  # asset paths inside src are relative to the repo root
+
+from const import (WHITE_PIECE_COLOR, BLACK_PIECE_COLOR, ROWS, COLS, PAWN_PIECE, ROOK_PIECE,
+                   QUEEN_PIECE)
+from bitboard import (BitboardPosition, MOVE_NORMAL, MOVE_DOUBLE_PUSH, MOVE_EN_PASSANT,
+                      MOVE_PROMOTION, square_index, encode_move, move_from, move_to, move_flag,
+                      move_captured, move_promotion)
+from piece import King, Pawn, Rook
+from test_perft import (DEEP, game_with_position, pieces_copy, start_position_pieces,
+                        kiwipete_pieces, cpw_position3_pieces)
+
+
+def play(game, from_sq, to_sq):
+    board = game.board
+    piece = board.squares[from_sq[0]][from_sq[1]].piece
+    piece.clear_moves()
+    board.calc_moves(piece, from_sq[0], from_sq[1])
+    for move in piece.moves:
+        if (move.final.row, move.final.col) == to_sq:
+            board.move(piece, move, clear_moves=False, ai_minimax=True)
+            game.prepare_board_state_for_next_move()
+            return
+    raise AssertionError(f"move {from_sq} -> {to_sq} was not generated")
+
+
+def position_of(pieces, current_player):
+    game = game_with_position(pieces_copy(pieces), current_player)
+    return BitboardPosition.from_board(game.board, current_player)
+
+
+def perft(position, depth):
+    if depth == 0:
+        return 1
+    nodes = 0
+    for move in position.generate_legal_moves():
+        position.make_move(move)
+        nodes += perft(position, depth - 1)
+        position.unmake_move()
+    return nodes
+
+
+def run_perft(name, pieces, current_player, expected_by_depth, deep_depths=()):
+    for depth, expected in expected_by_depth.items():
+        if depth in deep_depths and not DEEP:
+            print(f"SKIP: bitboard {name} perft({depth}) (enable with CHESS_PERFT_DEEP=1 or --deep)")
+            continue
+        position = position_of(pieces, current_player)
+        started = time.perf_counter()
+        nodes = perft(position, depth)
+        elapsed = time.perf_counter() - started
+        assert nodes == expected, \
+            f"bitboard {name} perft({depth}) = {nodes}, expected {expected}"
+        print(f"OK: bitboard {name} perft({depth}) = {nodes} in {elapsed:.2f}s")
+
+
+def board_legal_moves(game):
+    """All legal moves of the side to move according to Board.calc_moves(),
+    as (from_sq, to_sq) pairs."""
+    board = game.board
+    moves = set()
+    for row in range(ROWS):
+        for col in range(COLS):
+            if board.squares[row][col].has_team_piece(game.current_player):
+                piece = board.squares[row][col].piece
+                piece.clear_moves()
+                board.calc_moves(piece, row, col)
+                for move in piece.moves:
+                    moves.add((square_index(row, col), square_index(move.final.row, move.final.col)))
+    return moves
+
+
+def assert_same_moves(game):
+    position = BitboardPosition.from_board(game.board, game.current_player)
+    bitboard_moves = {(move_from(move), move_to(move)) for move in position.generate_legal_moves()}
+    assert bitboard_moves == board_legal_moves(game), \
+        f"bitboard: {sorted(bitboard_moves)}, board: {sorted(board_legal_moves(game))}"
+    return position
+
+
+def snapshot(position):
+    return (list(position.bitboards), dict(position.occupancy), position.occupied, list(position.mailbox),
+            position.side_to_move, position.castling_rights, position.en_passant_square,
+            position.halfmove_clock)
+
+
+def test_bitboard_perft_start_position():
+    run_perft("startpos", start_position_pieces(), WHITE_PIECE_COLOR,
+              {1: 20, 2: 400, 3: 8902, 4: 197281}, deep_depths=(4,))
+
+
+def test_bitboard_perft_kiwipete():
+    run_perft("kiwipete", kiwipete_pieces(), WHITE_PIECE_COLOR,
+              {1: 48, 2: 2039, 3: 97862})
+
+
+def test_bitboard_perft_cpw_position3():
+    run_perft("cpw-pos3", cpw_position3_pieces(), WHITE_PIECE_COLOR,
+              {1: 14, 2: 191, 3: 2812, 4: 43238})
+
+
+def test_same_moves_as_board_kiwipete():
+    # castling both sides, pins, captures
+    for color in (WHITE_PIECE_COLOR, BLACK_PIECE_COLOR):
+        assert_same_moves(game_with_position(kiwipete_pieces(), color))
+
+
+def test_same_moves_as_board_en_passant():
+    # 1.e4 a6 2.e5 d5 - white may capture d5 en passant
+    game = game_with_position(start_position_pieces(), WHITE_PIECE_COLOR)
+    for from_sq, to_sq in (((6, 4), (4, 4)), ((1, 0), (2, 0)), ((4, 4), (3, 4)), ((1, 3), (3, 3))):
+        play(game, from_sq, to_sq)
+    position = assert_same_moves(game)
+    assert position.en_passant_square == square_index(2, 3)
+    assert encode_move(square_index(3, 4), square_index(2, 3), MOVE_EN_PASSANT, PAWN_PIECE) \
+        in position.generate_legal_moves()
+
+
+def test_same_moves_as_board_promotion():
+    W, B = WHITE_PIECE_COLOR, BLACK_PIECE_COLOR
+    game = game_with_position([(King(W), 7, 4), (Pawn(W), 1, 0), (King(B), 0, 7), (Rook(B), 0, 1)], W)
+    position = assert_same_moves(game)
+    assert encode_move(square_index(1, 0), square_index(0, 1), MOVE_PROMOTION, ROOK_PIECE, QUEEN_PIECE) \
+        in position.generate_legal_moves()
+
+
+def test_move_encoding_round_trip_and_ordering():
+    move = encode_move(square_index(1, 0), square_index(0, 1), MOVE_PROMOTION, ROOK_PIECE, QUEEN_PIECE)
+    assert (move_from(move), move_to(move), move_flag(move), move_captured(move), move_promotion(move)) == \
+        (square_index(1, 0), square_index(0, 1), MOVE_PROMOTION, ROOK_PIECE, QUEEN_PIECE)
+    assert move < (1 << 32), "a move must fit an array('I') slot"
+    # ascending int order = captures first, most valuable victim first, then by origin square
+    queen_capture = encode_move(60, 4, captured=QUEEN_PIECE)
+    pawn_capture = encode_move(0, 9, captured=PAWN_PIECE)
+    quiet_early = encode_move(1, 18)
+    quiet_late = encode_move(62, 45)
+    assert sorted([quiet_late, pawn_capture, quiet_early, queen_capture]) == \
+        [queen_capture, pawn_capture, quiet_early, quiet_late]
+
+
+def test_make_unmake_restores_position():
+    for pieces in (start_position_pieces(), kiwipete_pieces(), cpw_position3_pieces()):
+        position = position_of(pieces, WHITE_PIECE_COLOR)
+        before = snapshot(position)
+        for move in position.generate_legal_moves():
+            position.make_move(move)
+            for reply in position.generate_legal_moves():
+                position.make_move(reply)
+                position.unmake_move()
+            position.unmake_move()
+            assert snapshot(position) == before, f"make/unmake of {move} changed the position"
+        assert position.history == []
+
+
+def assert_legal_equals_filtered(position, depth):
+    us = position.side_to_move
+    filtered = []
+    for move in position.generate_pseudo_moves():
+        position.make_move(move)
+        if not position.is_king_checked(us):
+            filtered.append(move)
+        position.unmake_move()
+    legal = position.generate_legal_moves()
+    assert sorted(legal) == sorted(filtered), \
+        f"legal generator: {sorted(set(legal) ^ set(filtered))} differ from make/test filtering"
+    if depth > 1:
+        for move in legal:
+            position.make_move(move)
+            assert_legal_equals_filtered(position, depth - 1)
+            position.unmake_move()
+
+
+def test_pin_aware_generator_matches_make_test_filter():
+    # Kiwipete: pins and discovered checks; CPW position 3: en passant along the King's rank
+    assert_legal_equals_filtered(position_of(kiwipete_pieces(), WHITE_PIECE_COLOR), 2)
+    assert_legal_equals_filtered(position_of(cpw_position3_pieces(), WHITE_PIECE_COLOR), 4)
+
+
+def test_board_check_detection_matches_bitboard():
+    for pieces in (kiwipete_pieces(), cpw_position3_pieces()):
+        for color in (WHITE_PIECE_COLOR, BLACK_PIECE_COLOR):
+            game = game_with_position(pieces_copy(pieces), color)
+            board = game.board
+            position = BitboardPosition.from_board(board, color)
+            # plain moves only (castling, en passant and promotion touch more than two squares),
+            # including the illegal ones that expose the own King
+            for move in position.generate_pseudo_moves():
+                if move_flag(move) not in (MOVE_NORMAL, MOVE_DOUBLE_PUSH):
+                    continue
+                from_row, from_col = divmod(move_from(move), COLS)
+                to_row, to_col = divmod(move_to(move), COLS)
+                # mirror the move on the Board the way in_check() probes do
+                moved, captured = board.squares[from_row][from_col].piece, board.squares[to_row][to_col].piece
+                board.squares[to_row][to_col].piece, board.squares[from_row][from_col].piece = moved, None
+                position.make_move(move)
+                for side in (WHITE_PIECE_COLOR, BLACK_PIECE_COLOR):
+                    assert board.is_king_checked(side) == position.is_king_checked(side), \
+                        f"check detection differs after {move} for side {side}"
+                position.unmake_move()
+                board.squares[from_row][from_col].piece, board.squares[to_row][to_col].piece = moved, captured
+
+
+if __name__ == "__main__":
+    tests = [(name, fn) for name, fn in sorted(globals().items()) if name.startswith("test_")]
+    for name, fn in tests:
+        fn()
+        print(f"OK: {name}")
+    print(f"All bitboard tests passed.")
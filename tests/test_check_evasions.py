@@ -0,0 +1,110 @@
+"""Check evasions in Board.calc_moves() - IMPROVEMENTS.md item 2.30.
+
+- Board.check_evasion_squares() is None without check, the checker (and the
+  squares between it and the King for a sliding checker) in single check, and
+  empty in double check
+- in check, calc_moves() gives the same moves as the bitboard generator: King
+  moves, captures of the checker, interpositions, and an en passant capture of
+  a checking pawn
+- in double check the pieces other than the King get no moves without a single
+  in_check() simulation, and in single check in_check() only runs for evasions
+
+Run standalone:  python .\tests\test_check_evasions.py
+Or with pytest:  pytest tests
+"""
+import os
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(REPO_ROOT, "tests"))
+sys.path.insert(0, os.path.join(REPO_ROOT, "src"))
+os.chdir(REPO_ROOT)  # asset paths inside src are relative to the repo root
+
+from const import WHITE_PIECE_COLOR, BLACK_PIECE_COLOR, ROWS, COLS
+from bitboard import BitboardPosition, move_from, move_to
+from piece import King, Queen, Rook, Bishop, Knight, Pawn
+from test_perft import game_with_position
+from test_alpha_beta import play
+
+W, B = WHITE_PIECE_COLOR, BLACK_PIECE_COLOR
+
+# white King e1 checked by the e5 Rook: Re4, Ne2 and Be3 block, K to d1 / d2 / f1 / f2
+ROOK_CHECK = [(King(W), 7, 4), (Rook(W), 4, 0), (Knight(W), 7, 6), (Bishop(W), 7, 2), (Pawn(W), 6, 0),
+              (King(B), 0, 4), (Rook(B), 3, 4)]
+# the same plus a black Knight on d3: double check
+DOUBLE_CHECK = ROOK_CHECK + [(Knight(B), 5, 3)]
+
+
+def board_moves(game):
+    board = game.board
+    moves = set()
+    for row in range(ROWS):
+        for col in range(COLS):
+            if board.squares[row][col].has_team_piece(game.current_player):
+                piece = board.squares[row][col].piece
+                piece.clear_moves()
+                board.calc_moves(piece, row, col)
+                moves.update(((row, col), (move.final.row, move.final.col)) for move in piece.moves)
+    return moves
+
+
+def bitboard_moves(game):
+    position = BitboardPosition.from_board(game.board, game.current_player)
+    return {(divmod(move_from(move), COLS), divmod(move_to(move), COLS)) for move in position.generate_legal_moves()}
+
+
+def test_evasion_squares():
+    assert game_with_position(ROOK_CHECK, W).board.check_evasion_squares(B) is None
+    assert game_with_position(ROOK_CHECK, W).board.check_evasion_squares(W) == {(3, 4), (4, 4), (5, 4), (6, 4)}
+    assert game_with_position(DOUBLE_CHECK, W).board.check_evasion_squares(W) == set()
+    knight_check = [(King(W), 7, 4), (King(B), 0, 4), (Knight(B), 5, 5)]
+    assert game_with_position(knight_check, W).board.check_evasion_squares(W) == {(5, 5)}
+
+
+def test_moves_in_check_match_the_bitboard_generator():
+    game = game_with_position(ROOK_CHECK, W)
+    moves = board_moves(game)
+    assert moves == bitboard_moves(game)
+    assert {final for initial, final in moves if initial != (7, 4)} == {(4, 4), (6, 4), (5, 4)}
+    game = game_with_position(DOUBLE_CHECK, W)
+    assert board_moves(game) == bitboard_moves(game)
+    assert {initial for initial, final in board_moves(game)} == {(7, 4)}
+
+
+def test_en_passant_capture_of_the_checking_pawn():
+    # 1... d5+ checks the King on e4; exd6 e.p. takes the checker
+    game = game_with_position([(King(W), 4, 4), (Pawn(W), 3, 4), (King(B), 0, 0), (Pawn(B), 1, 3)], B)
+    play(game, (1, 3), (3, 3))
+    moves = board_moves(game)
+    assert ((3, 4), (2, 3)) in moves
+    assert moves == bitboard_moves(game)
+
+
+def count_in_check(game, row, col):
+    board = game.board
+    calls = []
+    simulate = board.in_check
+    board.in_check = lambda piece, move: calls.append((move.final.row, move.final.col)) or simulate(piece, move)
+    piece = board.squares[row][col].piece
+    piece.clear_moves()
+    board.calc_moves(piece, row, col)
+    del board.in_check
+    return calls
+
+
+def test_in_check_simulations_only_for_evasions():
+    game = game_with_position(DOUBLE_CHECK, W)
+    for row, col in ((4, 0), (7, 6), (7, 2), (6, 0)):
+        assert count_in_check(game, row, col) == []
+    game = game_with_position(ROOK_CHECK, W)
+    assert count_in_check(game, 4, 0) == [(4, 4)] # the Rook on a4 has 12 pseudo-moves
+    assert set(count_in_check(game, 7, 2)) == {(5, 4)}
+    assert count_in_check(game, 6, 0) == []
+
+
+if __name__ == "__main__":
+    tests = [(name, fn) for name, fn in sorted(globals().items()) if name.startswith("test_")]
+    for name, fn in tests:
+        fn()
+        print(f"OK: {name}")
+    print(f"All check evasion tests passed.")
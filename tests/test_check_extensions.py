@@ -0,0 +1,146 @@
+"""Check extensions and in-search draw detection - IMPROVEMENTS.md item 2.28.
+
+- BitboardPosition.is_material_draw() scores the material signatures no side can
+  force mate with (K+minor vs K+minor, two Knights) and nothing else
+- BitboardPosition.is_repetition() finds a position repeated in the tree and a
+  position of the game before the search root (game_keys), and minimax() scores
+  it 0
+- with check extensions the search finds a mate in 2 starting with a check one
+  ply past its horizon (Philidor's smothered mate), without them it does not
+- the batched frontier flags the children repeating an earlier position and
+  keeps the result of the make/unmake frontier
+
+The frontier tests are skipped when NumPy is not installed (pip install numpy).
+
+Run standalone:  python .\tests\test_check_extensions.py
+Or with pytest:  pytest tests
+"""
+import contextlib
+import io
+import os
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(REPO_ROOT, "tests"))
+sys.path.insert(0, os.path.join(REPO_ROOT, "src"))
+os.chdir(REPO_ROOT)  # asset paths inside src are relative to the repo root
+
+from const import WHITE_PIECE_COLOR, BLACK_PIECE_COLOR, MATE_SCORE
+from bitboard import BitboardPosition, square_index, move_from, move_to
+from frontier import HAVE_NUMPY, frontier_scores
+from minimax import AI
+from piece import King, Queen, Rook, Bishop, Knight, Pawn
+from test_perft import game_with_position, game_from_start
+from test_alpha_beta import play, game_at_start
+from test_three_fold_repetition import KNIGHT_SHUFFLE
+
+W, B = WHITE_PIECE_COLOR, BLACK_PIECE_COLOR
+
+
+def position_of(pieces):
+    return BitboardPosition.from_board(game_with_position(pieces, W).board, W)
+
+
+def make(position, from_sq, to_sq):
+    position.make_move(next(move for move in position.generate_legal_moves()
+                            if move_from(move) == square_index(*from_sq) and move_to(move) == square_index(*to_sq)))
+
+
+def shuffled_game():
+    # 1. e4 e5 2. Nf3 Nf6 3. Ng1 Ng8 4. Nf3 Nf6 5. Ng1 - Ng8 repeats the position after
+    # 3... Ng8 (not the one after 1... e5, which has an en passant square)
+    game = game_at_start()
+    for from_sq, to_sq in KNIGHT_SHUFFLE + KNIGHT_SHUFFLE[:3]:
+        play(game, from_sq, to_sq)
+    return game
+
+
+def test_material_signature_draws():
+    kings = [(King(W), 7, 4), (King(B), 0, 4)]
+    for extra in ([], [(Bishop(W), 7, 2)], [(Knight(B), 0, 1)], [(Bishop(W), 7, 2), (Knight(B), 0, 1)],
+                  [(Knight(W), 7, 1), (Knight(W), 7, 6)]):
+        assert position_of(kings + extra).is_material_draw(), extra
+    for extra in ([(Pawn(W), 6, 0)], [(Rook(B), 0, 0)], [(Bishop(W), 7, 2), (Knight(W), 7, 1)],
+                  [(Bishop(W), 7, 2), (Bishop(W), 7, 5)], [(Queen(W), 7, 3), (Knight(B), 0, 1)]):
+        assert not position_of(kings + extra).is_material_draw(), extra
+
+
+def test_repetition_in_tree_and_in_game():
+    game = game_from_start()
+    position = BitboardPosition.from_board(game.board, W)
+    for ply, (from_sq, to_sq) in enumerate(KNIGHT_SHUFFLE * 2, start=1):
+        make(position, from_sq, to_sq)
+        assert position.is_repetition() == (ply >= 4), f"ply {ply}"
+
+    # the first three plies are played in the game, the fourth only in the search
+    game = shuffled_game()
+    position = BitboardPosition.from_board(game.board, B, game.position_history[:-1])
+    assert position.reversible_keys()[2] == game.position_history[-4]
+    make(position, *KNIGHT_SHUFFLE[3])
+    assert position.is_repetition()
+    assert not BitboardPosition.from_board(game.board, B).is_repetition() # without the game keys
+
+    ai = AI()
+    ai.search_depth = 3
+    assert ai.minimax(position, None, 1, True) == 0 and ai.repetitions == 1
+
+
+def philidor_game():
+    # 1. Qg8+ Rxg8 2. Nf7# - Kxg8 is illegal (Nh6)
+    return game_with_position([(King(W), 7, 0), (Queen(W), 5, 1), (Knight(W), 2, 7),
+                               (King(B), 0, 7), (Rook(B), 0, 3), (Pawn(B), 1, 6), (Pawn(B), 1, 7)], W)
+
+
+def search(game, **options):
+    ai = AI(**options)
+    with contextlib.redirect_stdout(io.StringIO()):
+        piece, move = ai.best_move(game, None)
+    return ai, (move.initial.row, move.initial.col, move.final.row, move.final.col)
+
+
+def test_check_extension_finds_mate_past_the_horizon():
+    for quiescence in (True, False):
+        ai, move = search(philidor_game(), max_depth=1, quiescence=quiescence)
+        assert move == (5, 1, 0, 6) and ai.best_score == MATE_SCORE - 3 and ai.extensions > 0
+        ai, move = search(philidor_game(), max_depth=1, quiescence=quiescence, check_extensions=False)
+        assert ai.best_score < MATE_SCORE - 100
+
+
+def shuffled_position():
+    game = shuffled_game()
+    return BitboardPosition.from_board(game.board, B, game.position_history[:-1])
+
+
+def test_frontier_flags_repetitions():
+    if not HAVE_NUMPY:
+        print("SKIP: frontier repetitions (pip install numpy)")
+        return
+    position = shuffled_position()
+    moves = position.generate_legal_moves()
+    scores, maybe_check = frontier_scores(position, moves)
+    for move, flagged in zip(moves, maybe_check.tolist()):
+        position.make_move(move)
+        assert flagged or not position.is_repetition()
+        position.unmake_move()
+    assert maybe_check.any()
+
+
+def test_batched_frontier_respects_repetitions():
+    if not HAVE_NUMPY:
+        print("SKIP: batched frontier repetitions (pip install numpy)")
+        return
+    results = []
+    for batch_frontier in (False, True):
+        ai = AI(max_depth=3, quiescence=False, batch_frontier=batch_frontier)
+        with contextlib.redirect_stdout(io.StringIO()):
+            move = ai.search_position(None, None, shuffled_position())
+        results.append((ai.best_score, move, ai.moves_analyzed, ai.repetitions > 0))
+    assert results[0] == results[1] and results[0][3]
+
+
+if __name__ == "__main__":
+    tests = [(name, fn) for name, fn in sorted(globals().items()) if name.startswith("test_")]
+    for name, fn in tests:
+        fn()
+        print(f"OK: {name}")
+    print(f"All check extension and draw detection tests passed.")
@@ -45,19 +45,16 @@ def game_with_position(pieces, current_player):
     """Build a Game whose current position (at move_count 1, as in a real game
     after the first move) contains exactly 'pieces' with 'current_player' to move."""
     game = Game()
-    board = game.board_states[0]
+    board = game.board
     for row in range(ROWS):
         for col in range(COLS):
             board.squares[row][col].piece = None
     for piece, row, col in pieces:
         board.squares[row][col].piece = piece
-    board.dump_to_squares_fast_method()
-    board.current_state.player_color = current_player
+    game.setup_position(current_player)
 
-    game.board_states[1].copy_board_content(board)
     game.move_count = 1
-    game.board_states[1].current_state.move_count = 1
-    game.current_player = current_player
+    board.current_state.move_count = 1
     game.first_move_made = True
     return game
 
@@ -66,9 +63,9 @@ def test_check_win_reports_only_the_mating_color():
     # Fool's mate: 1. f3 e5  2. g4 Qh4#
     game = Game()
     for from_sq, to_sq in [((6, 5), (5, 5)), ((1, 4), (3, 4)), ((6, 6), (4, 6))]:
-        play(game.board_states[game.move_count], from_sq, to_sq)
+        play(game.board, from_sq, to_sq)
         game.prepare_board_state_for_next_move()
-    play(game.board_states[game.move_count], (0, 3), (4, 7))  # Qh4#
+    play(game.board, (0, 3), (4, 7))  # Qh4#
 
     # before prepare_board_state_for_next_move() - the GUI call sites
     assert game.check_win(BLACK_PIECE_COLOR), "black delivered the mate"
@@ -10,7 +10,9 @@ Two closely related bugs:
   thousands performed inside minimax.
 
 Now the flag is set only after a two-square pawn push, and undo re-flags only a
-pawn whose recorded move was a double push.
+pawn whose recorded move was a double push. Since IMPROVEMENTS.md item 2.12 the
+flag is a single BoardState field (current_state.en_passant_pawn) instead of an
+attribute of every Pawn.
 
 Run standalone:  python .\tests\test_en_passant.py
 Or with pytest:  pytest tests
@@ -23,7 +25,7 @@ sys.path.insert(0, os.path.join(REPO_ROOT, "src"))
 os.chdir(REPO_ROOT)  # asset paths inside src are relative to the repo root
 
 from board import Board
-from const import WHITE_PIECE_COLOR, BLACK_PIECE_COLOR, ROWS, COLS
+from const import WHITE_PIECE_COLOR, BLACK_PIECE_COLOR, ROWS, COLS, EN_PASSANT_PAWN
 from game import Game
 from move import Move
 from piece import King, Pawn, Rook
@@ -69,8 +71,8 @@ def test_single_push_does_not_enable_en_passant():
     board.squares[2][3].piece.moved = True
     board.dump_to_squares_fast_method()
 
-    pawn = play(board, (2, 3), (3, 3))  # black single push, lands next to white pawn
-    assert not pawn.en_passant, "single push must not set the en passant flag"
+    play(board, (2, 3), (3, 3))  # black single push, lands next to white pawn
+    assert board.current_state.en_passant_pawn is None, "single push must not set the en passant flag"
     assert (2, 3) not in moves_of(board, 3, 4), "en passant capture of a single-pushed pawn is illegal"
 
 
@@ -79,8 +81,8 @@ def test_double_push_enables_en_passant():
     board.squares[1][3].piece = Pawn(BLACK_PIECE_COLOR)
     board.dump_to_squares_fast_method()
 
-    pawn = play(board, (1, 3), (3, 3))  # black double push
-    assert pawn.en_passant, "double push must set the en passant flag"
+    play(board, (1, 3), (3, 3))  # black double push
+    assert board.current_state.en_passant_pawn == (3, 3), "double push must set the en passant flag"
     assert (2, 3) in moves_of(board, 3, 4), "en passant capture must be offered"
 
     play(board, (3, 4), (2, 3))  # execute the en passant capture
@@ -94,9 +96,9 @@ def test_en_passant_flag_lasts_only_one_move():
     board.squares[5][1].piece = Rook(WHITE_PIECE_COLOR)
     board.dump_to_squares_fast_method()
 
-    pawn = play(board, (1, 3), (3, 3))  # black double push
+    play(board, (1, 3), (3, 3))  # black double push
     play(board, (5, 1), (4, 1))         # white plays something else
-    assert not pawn.en_passant, "the en passant flag must be cleared by the next move"
+    assert board.current_state.en_passant_pawn is None, "the en passant flag must be cleared by the next move"
     assert (2, 3) not in moves_of(board, 3, 4), "the en passant capture opportunity is gone"
 
 
@@ -105,52 +107,52 @@ def test_en_passant_flag_lasts_only_one_move():
 def game_play(game, from_sq, to_sq):
     """Make a move the way minimax does: move on the current board state, then
     prepare the next one."""
-    board = game.board_states[game.move_count]
+    board = game.board
     piece = play(board, from_sq, to_sq)
     game.prepare_board_state_for_next_move()
     return piece
 
 
 def flagged_pawn_squares(board):
+    """Squares whose int encoding carries the en passant bit - must agree with the
+    single current_state.en_passant_pawn field."""
     return {(row, col) for row in range(ROWS) for col in range(COLS)
-            if isinstance(board.squares[row][col].piece, Pawn)
-            and board.squares[row][col].piece.en_passant}
+            if board.squares_fast_method[row][col] & EN_PASSANT_PAWN}
 
 
 def test_undo_after_nonpawn_move_does_not_flag_it():
     game = Game()
-    knight = game_play(game, (7, 6), (5, 5))   # 1. white knight
+    game_play(game, (7, 6), (5, 5))            # 1. white knight
     game_play(game, (0, 1), (2, 2))            # 2. black knight
     game_play(game, (7, 1), (5, 2))            # 3. white knight
     game.undo_last_move()                      # last remaining move: black knight
-    black_knight = game.board_states[game.move_count].squares[2][2].piece
-    assert not getattr(black_knight, "en_passant", False), \
-        "undo must not put an en_passant flag on a knight"
-    assert not getattr(knight, "en_passant", False)
-    assert flagged_pawn_squares(game.board_states[game.move_count]) == set()
+    assert game.board.current_state.en_passant_pawn is None, \
+        "undo must not put an en passant flag on a knight"
+    assert flagged_pawn_squares(game.board) == set()
 
 
 def test_undo_after_single_push_does_not_flag_the_pawn():
     game = Game()
     game_play(game, (7, 6), (5, 5))            # 1. white knight
-    pawn = game_play(game, (1, 3), (2, 3))     # 2. black pawn SINGLE push
+    game_play(game, (1, 3), (2, 3))            # 2. black pawn SINGLE push
     game_play(game, (7, 1), (5, 2))            # 3. white knight
     game.undo_last_move()                      # last remaining move: the single push
-    assert not pawn.en_passant, \
+    assert game.board.current_state.en_passant_pawn is None, \
         "undo must not make a single-pushed pawn capturable en passant"
-    assert flagged_pawn_squares(game.board_states[game.move_count]) == set()
+    assert flagged_pawn_squares(game.board) == set()
 
 
 def test_undo_restores_en_passant_after_double_push():
     game = Game()
     game_play(game, (7, 6), (5, 5))            # 1. white knight
-    pawn = game_play(game, (1, 3), (3, 3))     # 2. black pawn DOUBLE push
+    game_play(game, (1, 3), (3, 3))            # 2. black pawn DOUBLE push
     game_play(game, (7, 1), (5, 2))            # 3. white knight (clears the flag)
-    assert not pawn.en_passant
+    assert game.board.current_state.en_passant_pawn is None
+    assert flagged_pawn_squares(game.board) == set()
     game.undo_last_move()                      # last remaining move: the double push
-    assert pawn.en_passant, \
+    assert game.board.current_state.en_passant_pawn == (3, 3), \
         "undo must restore the en passant flag of a freshly double-pushed pawn"
-    assert flagged_pawn_squares(game.board_states[game.move_count]) == {(3, 3)}
+    assert flagged_pawn_squares(game.board) == {(3, 3)}
 
 
 if __name__ == "__main__":
@@ -0,0 +1,124 @@
+"""Incremental tapered piece-square evaluation - IMPROVEMENTS.md item 2.25.
+
+- the packed middlegame/endgame score is blended by the game phase: the
+  middlegame value at the full phase, the endgame value at phase 0, clamped
+  after promotions
+- BitboardPosition.psqt / phase, updated by make_move() and restored by
+  unmake_move(), equal a full recomputation in every node of the tested trees
+  (castling, en passant, promotions with and without capture)
+- Board.current_state.psqt / phase, updated by Board.move() and restored by
+  undo_move(), equal a full recomputation, and both representations give the
+  same calculate_piece_score()
+- dump_to_squares_fast_method() recomputes them for a board edited by hand
+- the start position scores 0, and the King is scored by its middlegame table
+  with all pieces on the board and by its endgame table without them
+
+Run standalone:  python .\tests\test_evaluation.py
+Or with pytest:  pytest tests
+"""
+import os
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(REPO_ROOT, "tests"))
+sys.path.insert(0, os.path.join(REPO_ROOT, "src"))
+os.chdir(REPO_ROOT)  # asset paths inside src are relative to the repo root
+
+from const import WHITE_PIECE_COLOR, BLACK_PIECE_COLOR, ROWS, COLS, KING_PIECE
+from bitboard import BitboardPosition
+from evaluation import PSQT, PHASE_MAX, pack_score, unpack_score, tapered_score
+from piece import King, Pawn, Rook
+from board import Board
+from test_perft import (game_with_position, game_from_start, kiwipete_pieces, cpw_position3_pieces)
+
+W, B = WHITE_PIECE_COLOR, BLACK_PIECE_COLOR
+PROMOTION_PIECES = [(King(W), 7, 4), (Pawn(W), 1, 0), (King(B), 0, 7), (Rook(B), 0, 1)]
+
+
+def test_phase_tapering():
+    score = pack_score(100, -300)
+    assert unpack_score(score) == (100, -300)
+    assert tapered_score(score, PHASE_MAX) == 1.0
+    assert tapered_score(score, 0) == -3.0
+    assert tapered_score(score, PHASE_MAX // 2) == -1.0
+    assert tapered_score(score, PHASE_MAX + 4) == 1.0 # more pieces than at the start after promotions
+
+
+def assert_incremental_evaluation(position, depth):
+    assert (position.psqt, position.phase) == position.compute_evaluation()
+    if depth == 0:
+        return
+    for move in position.generate_legal_moves():
+        position.make_move(move)
+        assert_incremental_evaluation(position, depth - 1)
+        position.unmake_move()
+    assert (position.psqt, position.phase) == position.compute_evaluation()
+
+
+def test_bitboard_incremental_evaluation():
+    for pieces, color, depth in ((kiwipete_pieces(), W, 2), (cpw_position3_pieces(), W, 3),
+                                 (PROMOTION_PIECES, W, 3)):
+        game = game_with_position(pieces, color)
+        assert_incremental_evaluation(BitboardPosition.from_board(game.board, color), depth)
+
+
+def assert_board_incremental_evaluation(game, depth):
+    board = game.board
+    for row in range(ROWS):
+        for col in range(COLS):
+            if board.squares[row][col].has_team_piece(game.current_player):
+                piece = board.squares[row][col].piece
+                piece.clear_moves()
+                board.calc_moves(piece, row, col)
+                for move in list(piece.moves):
+                    board.move(piece, move, clear_moves=False, ai_minimax=True)
+                    game.prepare_board_state_for_next_move()
+                    state = board.current_state
+                    assert (state.psqt, state.phase) == board.compute_evaluation(), \
+                        f"incremental evaluation of {(row, col)} -> {(move.final.row, move.final.col)} is wrong"
+                    position = BitboardPosition.from_board(board, game.current_player)
+                    assert board.calculate_piece_score() == position.calculate_piece_score()
+                    if depth > 1:
+                        assert_board_incremental_evaluation(game, depth - 1)
+                    game.undo_last_move()
+    assert (board.current_state.psqt, board.current_state.phase) == board.compute_evaluation()
+
+
+def test_board_incremental_evaluation():
+    assert_board_incremental_evaluation(game_with_position(kiwipete_pieces(), W), 2)
+    assert_board_incremental_evaluation(game_with_position(PROMOTION_PIECES, W), 2)
+
+
+def test_board_edited_by_hand():
+    board = Board()
+    assert (board.current_state.psqt, board.current_state.phase) == (0, PHASE_MAX)
+    board.squares[7][3].piece = None # no white Queen
+    board.dump_to_squares_fast_method()
+    assert (board.current_state.psqt, board.current_state.phase) == board.compute_evaluation()
+    assert board.current_state.phase < PHASE_MAX
+    assert board.calculate_piece_score() < -8.0
+    assert board.calculate_piece_score() == BitboardPosition.from_board(board, W).calculate_piece_score()
+
+
+def test_start_position_and_king_tables():
+    game = game_from_start()
+    position = BitboardPosition.from_board(game.board, W)
+    assert position.phase == PHASE_MAX
+    assert position.calculate_piece_score() == game.board.calculate_piece_score() == 0.0
+
+    # the white King is sheltered on g1 in the middlegame and centralized on e4 in the endgame
+    g1, e4 = PSQT[KING_PIECE | W][7 * COLS + 6], PSQT[KING_PIECE | W][4 * COLS + 4]
+    assert tapered_score(g1, PHASE_MAX) > tapered_score(e4, PHASE_MAX)
+    assert tapered_score(e4, 0) > tapered_score(g1, 0)
+    endgame = [BitboardPosition.from_board(game_with_position([(King(W), row, col), (King(B), 0, 0)], W).board, W)
+               for row, col in ((7, 6), (4, 4))]
+    assert endgame[0].phase == 0
+    assert endgame[1].calculate_piece_score() > endgame[0].calculate_piece_score()
+
+
+if __name__ == "__main__":
+    tests = [(name, fn) for name, fn in sorted(globals().items()) if name.startswith("test_")]
+    for name, fn in tests:
+        fn()
+        print(f"OK: {name}")
+    print(f"All evaluation tests passed.")
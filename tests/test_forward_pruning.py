@@ -0,0 +1,73 @@
+"""Late move reductions, futility pruning and razoring - IMPROVEMENTS.md item 2.20.
+
+These prune by estimate, not by proof, so unlike alpha-beta (tests/test_alpha_beta.py)
+they may change the root score and move, which are therefore not compared. Each test
+searches the same position with AI(late_move_reductions=False, futility=False) and
+with both on, and asserts fewer nodes, a legal move, and that each technique actually
+fired. With a winning capture on the board (a hanging Queen) the pruned search still
+plays it.
+
+Run standalone:  python .\tests\test_forward_pruning.py
+Or with pytest:  pytest tests
+"""
+import contextlib
+import io
+import os
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(REPO_ROOT, "tests"))
+sys.path.insert(0, os.path.join(REPO_ROOT, "src"))
+os.chdir(REPO_ROOT)  # asset paths inside src are relative to the repo root
+
+from const import WHITE_PIECE_COLOR, BLACK_PIECE_COLOR
+from minimax import AI
+from test_perft import game_with_position, kiwipete_pieces, cpw_position3_pieces
+from test_alpha_beta import game_at_start, game_at_middlegame
+from test_null_move import legal_moves_of, HANGING_QUEEN, TAKES_THE_QUEEN
+
+
+def search(game, depth, **options):
+    ai = AI(max_depth=depth, **options)
+    with contextlib.redirect_stdout(io.StringIO()):
+        piece, move = ai.best_move(game, None)
+    assert move is not None, "search unexpectedly found no move"
+    return ai, (move.initial.row, move.initial.col, move.final.row, move.final.col)
+
+
+def assert_fewer_nodes_and_a_legal_move(name, game_factory, depth):
+    full, full_move = search(game_factory(), depth, late_move_reductions=False, futility=False)
+    pruned, pruned_move = search(game_factory(), depth)
+    assert pruned_move in legal_moves_of(game_factory()), f"{name}: {pruned_move} is not a legal move"
+    assert pruned.nodes < full.nodes, f"{name}: {pruned.nodes} nodes with forward pruning, {full.nodes} without"
+    assert (full.reduced_moves, full.futile_moves, full.razored_nodes) == (0, 0, 0)
+    return pruned
+
+
+def test_start_and_middlegame_depth_4():
+    for game_factory in (game_at_start, game_at_middlegame):
+        pruned = assert_fewer_nodes_and_a_legal_move(game_factory.__name__, game_factory, 4)
+        assert pruned.reduced_moves > 0 and pruned.futile_moves > 0
+
+
+def test_tactical_positions():
+    # Kiwipete (black to move): captures and pins everywhere; CPW position 3: en passant, checks
+    pruned = assert_fewer_nodes_and_a_legal_move(
+        "kiwipete", lambda: game_with_position(kiwipete_pieces(), BLACK_PIECE_COLOR), 3)
+    assert pruned.razored_nodes > 0
+    assert_fewer_nodes_and_a_legal_move(
+        "cpw-pos3", lambda: game_with_position(cpw_position3_pieces(), WHITE_PIECE_COLOR), 4)
+
+
+def test_winning_capture_is_kept():
+    pruned, pruned_move = search(game_with_position(HANGING_QUEEN, WHITE_PIECE_COLOR), 4)
+    assert pruned_move == TAKES_THE_QUEEN
+    assert pruned.reduced_moves > 0 and pruned.futile_moves > 0
+
+
+if __name__ == "__main__":
+    tests = [(name, fn) for name, fn in sorted(globals().items()) if name.startswith("test_")]
+    for name, fn in tests:
+        fn()
+        print(f"OK: {name}")
+    print(f"All forward pruning tests passed.")
@@ -0,0 +1,121 @@
+"""Batched NumPy frontier evaluation - IMPROVEMENTS.md item 2.26.
+
+- BitboardPosition.check_threats() finds every checking move: a normal move or
+  capture that gives check always lands on a check square of the moved piece
+  or moves a discoverer
+- frontier_scores() gives every unflagged child the score calculate_piece_score()
+  gives after make_move(), and flags every child that gives check
+- AI(quiescence=False, batch_frontier=True) keeps the root score, the move and
+  the moves analyzed of the make/unmake frontier
+- the batch is off with the quiescence search (the horizon is no static score)
+
+The NumPy tests are skipped when NumPy is not installed (pip install numpy).
+
+Run standalone:  python .\tests\test_frontier.py
+Or with pytest:  pytest tests
+"""
+import contextlib
+import io
+import os
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(REPO_ROOT, "tests"))
+sys.path.insert(0, os.path.join(REPO_ROOT, "src"))
+os.chdir(REPO_ROOT)  # asset paths inside src are relative to the repo root
+
+from const import WHITE_PIECE_COLOR
+from bitboard import BitboardPosition, MOVE_EN_PASSANT, move_from, move_to, move_flag
+from frontier import HAVE_NUMPY, frontier_scores
+from minimax import AI
+from test_perft import game_with_position, kiwipete_pieces, cpw_position3_pieces
+from test_alpha_beta import game_at_start, game_at_middlegame
+
+W = WHITE_PIECE_COLOR
+POSITIONS = (lambda: game_with_position(kiwipete_pieces(), W),
+             lambda: game_with_position(cpw_position3_pieces(), W), game_at_middlegame)
+
+
+def positions_in_tree(position, depth):
+    yield position
+    if depth:
+        for move in position.generate_legal_moves():
+            position.make_move(move)
+            yield from positions_in_tree(position, depth - 1)
+            position.unmake_move()
+
+
+def root_positions():
+    for game_factory in POSITIONS:
+        game = game_factory()
+        yield BitboardPosition.from_board(game.board, game.current_player)
+
+
+def test_check_threats_find_every_check():
+    checks_found = 0
+    for root in root_positions():
+        for position in positions_in_tree(root, 2):
+            checks, discoverers = position.check_threats()
+            for move in position.generate_legal_moves():
+                if move_flag(move) >= MOVE_EN_PASSANT:
+                    continue # not covered by check_threats()
+                piece = position.mailbox[move_from(move)]
+                flagged = checks[piece] >> move_to(move) & 1 or discoverers >> move_from(move) & 1
+                position.make_move(move)
+                gives_check = position.is_king_checked(position.side_to_move)
+                position.unmake_move()
+                assert flagged or not gives_check, f"check of {move} not found"
+                checks_found += gives_check
+    assert checks_found > 0
+
+
+def test_frontier_scores_match_make_move():
+    if not HAVE_NUMPY:
+        print("SKIP: frontier scores (pip install numpy)")
+        return
+    for root in root_positions():
+        for position in positions_in_tree(root, 2):
+            moves = position.generate_legal_moves()
+            if not moves:
+                continue
+            scores, maybe_check = frontier_scores(position, moves)
+            for move, score, flagged in zip(moves, scores.tolist(), maybe_check.tolist()):
+                position.make_move(move)
+                if position.is_king_checked(position.side_to_move):
+                    assert flagged, f"checking move {move} not flagged"
+                if not flagged:
+                    assert score == position.calculate_piece_score()
+                position.unmake_move()
+
+
+def search(game, depth, batch_frontier):
+    ai = AI(max_depth=depth, quiescence=False, batch_frontier=batch_frontier)
+    with contextlib.redirect_stdout(io.StringIO()):
+        piece, move = ai.best_move(game, None)
+    return ai, (move.initial.row, move.initial.col, move.final.row, move.final.col)
+
+
+def test_same_search_result_as_make_unmake():
+    if not HAVE_NUMPY:
+        print("SKIP: batched frontier search (pip install numpy)")
+        return
+    for game_factory in POSITIONS + (game_at_start,):
+        for depth in (2, 3):
+            single, single_move = search(game_factory(), depth, False)
+            batch, batch_move = search(game_factory(), depth, True)
+            assert batch.frontier_batches > 0
+            assert (batch.best_score, batch_move, batch.moves_analyzed) \
+                == (single.best_score, single_move, single.moves_analyzed)
+
+
+def test_off_with_quiescence():
+    assert not AI(batch_frontier=True).batch_frontier
+    assert AI(quiescence=False, batch_frontier=True).batch_frontier == HAVE_NUMPY
+
+
+if __name__ == "__main__":
+    tests = [(name, fn) for name, fn in sorted(globals().items()) if name.startswith("test_")]
+    for name, fn in tests:
+        fn()
+        print(f"OK: {name}")
+    print(f"All frontier tests passed.")
@@ -0,0 +1,106 @@
+"""Iterative deepening with a time / node budget - IMPROVEMENTS.md item 2.15.
+
+- a full iterative deepening search returns the same root score as one
+  fixed-depth search (the chosen move may be another move of equal score) -
+  without the reductions and pruning whose result depends on the move order
+- each iteration searches the root moves ordered by the previous iteration,
+  best move first
+- a node or time budget stops the search early with the best move of the last
+  completed iteration, and the first iteration always completes
+
+Run standalone:  python .\tests\test_iterative_deepening.py
+Or with pytest:  pytest tests
+"""
+import contextlib
+import io
+import os
+import sys
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(REPO_ROOT, "tests"))
+sys.path.insert(0, os.path.join(REPO_ROOT, "src"))
+os.chdir(REPO_ROOT)  # asset paths inside src are relative to the repo root
+
+from minimax import AI
+from test_alpha_beta import game_at_start, game_at_middlegame
+from test_parallel_search import WINDOW_INDEPENDENT
+
+
+def search(ai, game):
+    with contextlib.redirect_stdout(io.StringIO()):
+        piece, move = ai.best_move(game, None)
+    assert move is not None, "search unexpectedly found no move"
+    return piece, move
+
+
+def assert_legal(game, piece, move):
+    # best_move() has already played the move on the board; undo it and look it up
+    game.board.undo_move()
+    piece.clear_moves()
+    game.board.calc_moves(piece, move.initial.row, move.initial.col)
+    assert any(move == legal for legal in piece.moves), "the budgeted search played an illegal move"
+
+
+def test_same_score_as_fixed_depth_search():
+    for game_factory in (game_at_start, game_at_middlegame):
+        for depth in (2, 3):
+            fixed = AI(max_depth=depth, iterative_deepening=False, **WINDOW_INDEPENDENT)
+            deepening = AI(max_depth=depth, **WINDOW_INDEPENDENT)
+            search(fixed, game_factory())
+            search(deepening, game_factory())
+            assert deepening.best_score == fixed.best_score, \
+                f"{game_factory.__name__} depth {depth}: {deepening.best_score} != {fixed.best_score}"
+            assert deepening.completed_depth == depth
+
+
+def test_root_is_ordered_by_previous_iteration():
+    ai = AI(max_depth=3, aspiration=False) # one root search per iteration, no re-search
+    iterations = []
+    search_root = ai.search_root
+
+    def recording_search_root(game_state, screen, position, root_moves, *window):
+        result = search_root(game_state, screen, position, root_moves, *window)
+        iterations.append((list(root_moves), result[1]))
+        return result
+
+    ai.search_root = recording_search_root
+    search(ai, game_at_middlegame())
+    assert len(iterations) == 4  # depths 0..3
+    for (previous_order, previous_best), (order, _) in zip(iterations, iterations[1:]):
+        assert sorted(order) == sorted(previous_order)
+        assert order[0] == previous_best, "the previous best move must be searched first"
+
+
+def test_node_limit_returns_move_of_last_completed_iteration():
+    ai = AI(max_depth=6, node_limit=3000)
+    game = game_at_middlegame()
+    piece, move = search(ai, game)
+    assert ai.completed_depth is not None and ai.completed_depth < ai.max_depth
+    assert ai.nodes < 3000 + 1024, f"node budget overrun: {ai.nodes} nodes"
+    assert_legal(game, piece, move)
+
+
+def test_time_limit_stops_the_search():
+    ai = AI(max_depth=8, time_limit=0.2)
+    game = game_at_middlegame()
+    started = time.perf_counter()
+    piece, move = search(ai, game)
+    elapsed = time.perf_counter() - started
+    assert elapsed < 2.0, f"a 0.2 s budget took {elapsed:.2f} s"
+    assert ai.completed_depth < ai.max_depth
+    assert_legal(game, piece, move)
+
+
+def test_first_iteration_always_completes():
+    ai = AI(max_depth=4, node_limit=1)
+    piece, move = search(ai, game_at_start())
+    assert ai.completed_depth == 0
+
+
+if __name__ == "__main__":
+    tests = [(name, fn) for name, fn in sorted(globals().items()) if name.startswith("test_")]
+    for name, fn in tests:
+        fn()
+        print(f"OK: {name}")
+    print(f"All iterative deepening tests passed.")
@@ -0,0 +1,105 @@
+"""Killer, countermove and history move ordering - IMPROVEMENTS.md item 2.17.
+
+- quiet moves are ordered: promotions, the two killers of the ply, the
+  countermove of the opponent's last move, then by history score; captures stay
+  in front of them and the transposition table move in front of everything
+- a quiet beta cutoff updates the killers, the countermove and the history
+- the heuristics only reorder moves: the root score is unchanged and fewer
+  nodes are visited
+
+Run standalone:  python .\tests\test_move_ordering.py
+Or with pytest:  pytest tests
+"""
+import contextlib
+import io
+import os
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(REPO_ROOT, "tests"))
+sys.path.insert(0, os.path.join(REPO_ROOT, "src"))
+os.chdir(REPO_ROOT)  # asset paths inside src are relative to the repo root
+
+from const import WHITE_PIECE_COLOR, BLACK_PIECE_COLOR
+from bitboard import BitboardPosition, QUIET_BITS, move_promotion
+from minimax import AI, butterfly_index
+from piece import King, Rook, Pawn
+from test_perft import game_with_position, kiwipete_pieces
+from test_alpha_beta import game_at_start, game_at_middlegame
+
+
+def kiwipete_after_a_move():
+    position = BitboardPosition.from_board(game_with_position(kiwipete_pieces(), WHITE_PIECE_COLOR).board,
+                                           WHITE_PIECE_COLOR)
+    previous = position.generate_legal_moves()[-1]
+    position.make_move(previous) # black to move, with a previous move for the countermove table
+    return position, previous
+
+
+def test_quiet_moves_ordered_by_killers_countermove_and_history():
+    ai = AI(see=False) # every capture ahead of the quiet moves
+    position, previous = kiwipete_after_a_move()
+    quiet = [move for move in sorted(position.generate_legal_moves()) if move >= QUIET_BITS]
+    killer_1, killer_2, countermove, best_history, tt_move = quiet[-1], quiet[-2], quiet[-3], quiet[-4], quiet[-5]
+    ai.killers[1] = [killer_1, killer_2]
+    ai.countermoves[butterfly_index(previous)] = countermove
+    ai.history[BLACK_PIECE_COLOR][butterfly_index(best_history)] = 100
+
+    ordered = list(ai.collect_ordered_moves(position, 1, tt_move))
+    captures = len([move for move in ordered if move < QUIET_BITS])
+    assert ordered[0] == tt_move
+    assert all(move < QUIET_BITS for move in ordered[1:captures + 1]), "captures come before quiet moves"
+    assert ordered[captures + 1:captures + 5] == [killer_1, killer_2, countermove, best_history]
+    # the root (ply 0) keeps the plain order - best_move() orders it by the previous iteration
+    assert ai.collect_ordered_moves(position, 0) == sorted(position.generate_legal_moves())
+
+
+def test_promotions_are_the_first_quiet_moves():
+    W, B = WHITE_PIECE_COLOR, BLACK_PIECE_COLOR
+    game = game_with_position([(King(W), 7, 7), (King(B), 0, 4), (Rook(B), 0, 0), (Pawn(B), 6, 2)], B)
+    position = BitboardPosition.from_board(game.board, B)
+    ai = AI()
+    ai.killers[1] = [max(move for move in position.generate_legal_moves() if not move_promotion(move)), 0]
+    quiet = list(ai.collect_ordered_moves(position, 1))
+    assert move_promotion(quiet[0]) and quiet[1] == ai.killers[1][0]
+
+
+def test_quiet_cutoff_updates_the_tables():
+    ai = AI()
+    position, previous = kiwipete_after_a_move()
+    first, second = [move for move in position.generate_legal_moves() if move >= QUIET_BITS][:2]
+    ai.store_quiet_cutoff(position, first, 3, 2)
+    ai.store_quiet_cutoff(position, second, 3, 3)
+    assert ai.killers[3] == [second, first]
+    assert ai.countermoves[butterfly_index(previous)] == second
+    assert ai.history[BLACK_PIECE_COLOR][butterfly_index(first)] == 4
+    assert ai.history[BLACK_PIECE_COLOR][butterfly_index(second)] == 9
+    ai.store_quiet_cutoff(position, second, 3, 1) # a repeated killer is not stored twice
+    assert ai.killers[3] == [second, first]
+    ai.age_ordering_heuristics()
+    assert ai.killers[3] == [0, 0]
+    assert ai.history[BLACK_PIECE_COLOR][butterfly_index(second)] == 5
+
+
+def search(game_factory, depth, ordering_heuristics):
+    ai = AI(max_depth=depth, ordering_heuristics=ordering_heuristics)
+    with contextlib.redirect_stdout(io.StringIO()):
+        ai.best_move(game_factory(), None)
+    return ai.best_score, ai.nodes
+
+
+def test_same_score_with_fewer_nodes():
+    for game_factory in (game_at_start, game_at_middlegame):
+        score, nodes = search(game_factory, 3, False)
+        ordered_score, ordered_nodes = search(game_factory, 3, True)
+        assert ordered_score == score
+        assert ordered_nodes < nodes, \
+            f"{game_factory.__name__}: {ordered_nodes} nodes with the heuristics, {nodes} without"
+
+
+if __name__ == "__main__":
+    tests = [(name, fn) for name, fn in sorted(globals().items()) if name.startswith("test_")]
+    for name, fn in tests:
+        fn()
+        print(f"OK: {name}")
+    print(f"All move ordering tests passed.")
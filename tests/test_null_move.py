@@ -0,0 +1,106 @@
+"""Null move and null-move pruning - IMPROVEMENTS.md item 2.19.
+
+- BitboardPosition.make_null_move() passes the turn: side to move flipped, en
+  passant square cleared, Zobrist key updated incrementally, and
+  unmake_null_move() restores the position exactly
+- null-move pruning visits far fewer nodes and still plays a legal move, and it
+  keeps a winning capture (a hanging Queen). It prunes by estimate, so the root
+  score itself may differ from the search without it and is not compared
+- null-move pruning is never used with pawns only (zugzwang)
+
+Run standalone:  python .\tests\test_null_move.py
+Or with pytest:  pytest tests
+"""
+import contextlib
+import io
+import os
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(REPO_ROOT, "tests"))
+sys.path.insert(0, os.path.join(REPO_ROOT, "src"))
+os.chdir(REPO_ROOT)  # asset paths inside src are relative to the repo root
+
+from const import WHITE_PIECE_COLOR, BLACK_PIECE_COLOR, COLS
+from bitboard import BitboardPosition, NULL_MOVE, MOVE_DOUBLE_PUSH, move_flag, move_from, move_to
+from minimax import AI
+from piece import King, Queen, Pawn, Knight
+from test_bitboard import snapshot
+from test_perft import game_with_position, cpw_position3_pieces
+from test_alpha_beta import game_at_start, game_at_middlegame
+
+W, B = WHITE_PIECE_COLOR, BLACK_PIECE_COLOR
+# white to move wins the undefended Queen with Nxd5
+HANGING_QUEEN = [(King(W), 7, 6), (Knight(W), 5, 2), (Pawn(W), 6, 5), (Pawn(W), 6, 6), (Pawn(W), 6, 7),
+                 (King(B), 0, 6), (Queen(B), 3, 3), (Pawn(B), 1, 5), (Pawn(B), 1, 6), (Pawn(B), 1, 7)]
+TAKES_THE_QUEEN = (5, 2, 3, 3)
+
+
+def test_null_move_passes_the_turn_and_is_undone_exactly():
+    position = BitboardPosition.from_board(game_with_position(cpw_position3_pieces(), W).board, W)
+    double_push = next(move for move in position.generate_legal_moves() if move_flag(move) == MOVE_DOUBLE_PUSH)
+    position.make_move(double_push) # sets an en passant square, black to move
+    assert position.en_passant_square >= 0
+    before = snapshot(position)
+    key = position.zobrist_key
+    position.make_null_move()
+    assert position.side_to_move == W
+    assert position.en_passant_square == -1
+    assert position.history[-1][0] == NULL_MOVE
+    assert position.zobrist_key == position.compute_zobrist_key() != key
+    position.unmake_null_move()
+    assert snapshot(position) == before
+    assert position.zobrist_key == key
+
+
+def test_non_pawn_material():
+    position = BitboardPosition.from_board(
+        game_with_position([(King(W), 7, 4), (Pawn(W), 6, 0), (King(B), 0, 4), (Knight(B), 0, 1)], W).board, W)
+    assert not position.has_non_pawn_material(W)
+    assert position.has_non_pawn_material(B)
+
+
+# (from_row, from_col, to_row, to_col) of the legal moves of the side to move
+def legal_moves_of(game):
+    position = BitboardPosition.from_board(game.board, game.current_player)
+    return {divmod(move_from(move), COLS) + divmod(move_to(move), COLS) for move in position.generate_legal_moves()}
+
+
+def search(game, depth, null_move):
+    # late move reductions, futility pruning and static exchange evaluation off: they would
+    # share the saved nodes
+    ai = AI(max_depth=depth, null_move=null_move, late_move_reductions=False, futility=False, see=False)
+    with contextlib.redirect_stdout(io.StringIO()):
+        piece, move = ai.best_move(game, None)
+    assert move is not None, "search unexpectedly found no move"
+    return ai, (move.initial.row, move.initial.col, move.final.row, move.final.col)
+
+
+def test_far_fewer_nodes_and_a_legal_move():
+    for game_factory in (game_at_start, game_at_middlegame):
+        legal = legal_moves_of(game_factory())
+        full, full_move = search(game_factory(), 5, False)
+        pruned, pruned_move = search(game_factory(), 5, True)
+        assert pruned_move in legal
+        assert pruned.null_move_cutoffs > 0
+        assert pruned.nodes < full.nodes // 2, f"{pruned.nodes} nodes with null moves, {full.nodes} without"
+
+
+def test_winning_capture_is_kept():
+    pruned, pruned_move = search(game_with_position(HANGING_QUEEN, W), 5, True)
+    assert pruned_move == TAKES_THE_QUEEN
+    assert pruned.null_move_cutoffs > 0
+
+
+def test_no_null_move_with_pawns_only():
+    pieces = [(King(W), 7, 4), (Pawn(W), 6, 0), (Pawn(W), 6, 7), (King(B), 0, 4), (Pawn(B), 1, 3)]
+    ai, move = search(game_with_position(pieces, W), 4, True)
+    assert ai.null_move_cutoffs == 0
+
+
+if __name__ == "__main__":
+    tests = [(name, fn) for name, fn in sorted(globals().items()) if name.startswith("test_")]
+    for name, fn in tests:
+        fn()
+        print(f"OK: {name}")
+    print(f"All null move tests passed.")
@@ -0,0 +1,116 @@
+"""Parallel root search over a process pool - IMPROVEMENTS.md item 2.21.
+
+- AI(workers=N) searches the root moves in worker processes and chooses the
+  same move and score in every run at a fixed depth
+- with the window-independent search features it chooses the same move and
+  score as the single-process search
+- a time budget stops the parallel search like the single-process one
+- SearchThread.cancel() and a ponder hit's time limit reach the worker processes
+  in the middle of a batch (shared stop flag)
+
+Run standalone:  python .\tests\test_parallel_search.py
+Or with pytest:  pytest tests
+"""
+import contextlib
+import io
+import os
+import sys
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(REPO_ROOT, "tests"))
+sys.path.insert(0, os.path.join(REPO_ROOT, "src"))
+os.chdir(REPO_ROOT)  # asset paths inside src are relative to the repo root
+
+from bitboard import BitboardPosition
+from minimax import AI
+from search_thread import SearchThread
+from test_alpha_beta import game_at_start, game_at_middlegame
+from test_search_thread import wait_for_result
+
+# null move, late move reductions and futility prune by the window a move is searched with
+WINDOW_INDEPENDENT = dict(null_move=False, late_move_reductions=False, futility=False)
+
+
+def search(ai, game):
+    with contextlib.redirect_stdout(io.StringIO()):
+        piece, move = ai.best_move(game, None)
+    assert move is not None, "search unexpectedly found no move"
+    return ai.best_score, (move.initial.row, move.initial.col, move.final.row, move.final.col)
+
+
+def test_parallel_search_is_deterministic():
+    parallel = AI(max_depth=3, iterative_deepening=False, workers=2)
+    try:
+        first = search(parallel, game_at_middlegame())
+        second = search(parallel, game_at_middlegame())
+    finally:
+        parallel.close()
+    assert first == second, f"parallel search chose {first}, then {second}"
+
+
+def test_parallel_search_matches_single_process_search():
+    for game_factory in (game_at_start, game_at_middlegame):
+        single = AI(max_depth=3, iterative_deepening=False, **WINDOW_INDEPENDENT)
+        parallel = AI(max_depth=3, iterative_deepening=False, workers=3, **WINDOW_INDEPENDENT)
+        try:
+            expected = search(single, game_factory())
+            result = search(parallel, game_factory())
+        finally:
+            parallel.close()
+        assert result == expected, f"{game_factory.__name__}: parallel {result} != single process {expected}"
+        assert parallel.nodes > 0 and parallel.pool is None
+
+
+def test_parallel_search_stops_on_time_limit():
+    parallel = AI(max_depth=8, time_limit=0.5, workers=2)
+    try:
+        search(parallel, game_at_middlegame())
+    finally:
+        parallel.close()
+    assert parallel.completed_depth is not None and parallel.completed_depth < parallel.max_depth
+
+
+def test_cancel_stops_the_workers():
+    game = game_at_middlegame()
+    parallel = AI(max_depth=8, iterative_deepening=False, workers=2)
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            search = SearchThread(parallel, game)
+            time.sleep(1.5) # the pool is started and the depth 8 batch is running
+            assert search.thinking()
+            started = time.perf_counter()
+            search.cancel()
+            elapsed = time.perf_counter() - started
+    finally:
+        parallel.close()
+    assert elapsed < 1.0, f"cancel took {elapsed:.2f} s"
+    assert search.result() is None
+
+
+def test_ponder_hit_time_limit_stops_the_workers():
+    game = game_at_middlegame()
+    parallel = AI(max_depth=8, time_limit=0.5, workers=2)
+    ponder_move = BitboardPosition.from_board(game.board, game.current_player).generate_legal_moves()[0]
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            search = SearchThread(parallel, game, ponder_move=ponder_move)
+            time.sleep(1.5) # pondering: no time limit yet
+            assert search.thinking()
+            started = time.perf_counter()
+            search.ponder_hit()
+            move, polls = wait_for_result(search)
+            elapsed = time.perf_counter() - started
+    finally:
+        parallel.close()
+    assert move is not None
+    assert elapsed < 1.5, f"the search ran {elapsed:.2f} s after the ponder hit"
+    assert parallel.completed_depth < parallel.max_depth
+
+
+if __name__ == "__main__":
+    tests = [(name, fn) for name, fn in sorted(globals().items()) if name.startswith("test_")]
+    for name, fn in tests:
+        fn()
+        print(f"OK: {name}")
+    print(f"All parallel search tests passed.")
@@ -42,11 +42,11 @@ PAWN_HOME_ROW = {WHITE_PIECE_COLOR: 6, BLACK_PIECE_COLOR: 1}
 
 
 def game_with_position(pieces, current_player):
-    """Build a Game whose current position (at move_count 1, so that
-    undo_last_move() works as in a real game) contains exactly 'pieces'.
+    """Build a Game whose current position (at move_count 1, as in a real
+    game) contains exactly 'pieces'.
     Pawns placed outside their home row are marked as moved (no double push)."""
     game = Game()
-    board = game.board_states[0]
+    board = game.board
     for row in range(ROWS):
         for col in range(COLS):
             board.squares[row][col].piece = None
@@ -54,13 +54,10 @@ def game_with_position(pieces, current_player):
         if isinstance(piece, Pawn) and row != PAWN_HOME_ROW[piece.color]:
             piece.moved = True
         board.squares[row][col].piece = piece
-    board.dump_to_squares_fast_method()
-    board.current_state.player_color = current_player
+    game.setup_position(current_player)
 
-    game.board_states[1].copy_board_content(board)
     game.move_count = 1
-    game.board_states[1].current_state.move_count = 1
-    game.current_player = current_player
+    board.current_state.move_count = 1
     game.first_move_made = True
     return game
 
@@ -115,7 +112,7 @@ def perft(game, depth):
     same make/prepare/undo path AI.minimax() uses."""
     if depth == 0:
         return 1
-    board = game.board_states[game.move_count]
+    board = game.board
     nodes = 0
     for row in range(ROWS):
         for col in range(COLS):
@@ -148,7 +145,7 @@ def run_perft(name, pieces, current_player, expected_by_depth, deep_depths=()):
 
 
 def pieces_copy(pieces):
-    # fresh Piece objects for every run - Piece state (moved/en_passant) is mutable
+    # fresh Piece objects for every run - Piece state (moved) is mutable
     return [(piece.__class__(piece.color), row, col) for piece, row, col in pieces]
 
 
@@ -167,6 +164,46 @@ def test_perft_cpw_position3():
               {1: 14, 2: 191, 3: 2812})
 
 
+def game_snapshot(game):
+    board = game.board
+    pieces = [(square.piece, square.piece.moved)
+              for row in board.squares for square in row if square.has_piece()]
+    return (pieces, [list(row) for row in board.squares_fast_method], board.current_state.save(),
+            game.move_count, game.current_player, list(game.position_history))
+
+
+def assert_undo_restores(game, depth):
+    board = game.board
+    before = game_snapshot(game)
+    for row in range(ROWS):
+        for col in range(COLS):
+            if board.squares[row][col].has_team_piece(game.current_player):
+                piece = board.squares[row][col].piece
+                piece.clear_moves()
+                board.calc_moves(piece, row, col)
+                for move in list(piece.moves):
+                    board.move(piece, move, clear_moves=False, ai_minimax=True)
+                    game.prepare_board_state_for_next_move()
+                    assert board.current_state.zobrist_key == board.compute_zobrist_key(game.current_player), \
+                        f"incremental Zobrist key of {(row, col)} -> {(move.final.row, move.final.col)} is wrong"
+                    if depth > 1:
+                        assert_undo_restores(game, depth - 1)
+                    game.undo_last_move()
+                    assert game_snapshot(game) == before, \
+                        f"undo of {(row, col)} -> {(move.final.row, move.final.col)} changed the game"
+    assert len(board.undo_stack) == len(game.position_history) - 1
+
+
+def test_undo_restores_board_exactly():
+    # also checks the incremental Zobrist key against a full recomputation after every move
+    # castling with rook moved flags, captures, en passant flags and promotions
+    assert_undo_restores(game_with_position(kiwipete_pieces(), WHITE_PIECE_COLOR), 2)
+    assert_undo_restores(game_with_position(cpw_position3_pieces(), WHITE_PIECE_COLOR), 3)
+    W, B = WHITE_PIECE_COLOR, BLACK_PIECE_COLOR
+    assert_undo_restores(game_with_position(
+        [(King(W), 7, 4), (Pawn(W), 1, 0), (King(B), 0, 7), (Rook(B), 0, 1)], W), 2)
+
+
 if __name__ == "__main__":
     tests = [(name, fn) for name, fn in sorted(globals().items()) if name.startswith("test_")]
     for name, fn in tests:
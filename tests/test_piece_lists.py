@@ -0,0 +1,108 @@
+"""Per-color piece lists and King squares of Board - IMPROVEMENTS.md item 2.31.
+
+- Board.piece_squares holds the squares of the pieces of each color and
+  king_squares the King squares after every move and every undo of the test
+  trees (castling, captures, en passant, promotions), equal to a 64-square scan
+- dump_to_squares_fast_method() rebuilds them for a position set up square by
+  square
+- player_has_no_valid_moves(), has_any_valid_move() and
+  check_insufficient_mating_material() give the same answers from the piece
+  lists: mate, stalemate, K vs K+N and positions with legal moves
+
+Run standalone:  python .\tests\test_piece_lists.py
+Or with pytest:  pytest tests
+"""
+import contextlib
+import io
+import os
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(REPO_ROOT, "tests"))
+sys.path.insert(0, os.path.join(REPO_ROOT, "src"))
+os.chdir(REPO_ROOT)  # asset paths inside src are relative to the repo root
+
+from const import WHITE_PIECE_COLOR, BLACK_PIECE_COLOR, ROWS, COLS
+from piece import King, Queen, Rook, Knight, Pawn
+from test_perft import game_with_position, kiwipete_pieces, cpw_position3_pieces
+
+W, B = WHITE_PIECE_COLOR, BLACK_PIECE_COLOR
+
+
+def scanned_piece_squares(board):
+    squares = {W: set(), B: set()}
+    for row in range(ROWS):
+        for col in range(COLS):
+            piece = board.squares[row][col].piece
+            if piece is not None:
+                squares[piece.color].add((row, col))
+    return squares
+
+
+def assert_piece_lists(board, context):
+    assert board.piece_squares == scanned_piece_squares(board), context
+    for color in (W, B):
+        row, col = board.king_squares[color]
+        piece = board.squares[row][col].piece
+        assert isinstance(piece, King) and piece.color == color, context
+
+
+def walk(game, depth):
+    board = game.board
+    for row, col in sorted(board.piece_squares[game.current_player]):
+        piece = board.squares[row][col].piece
+        piece.clear_moves()
+        board.calc_moves(piece, row, col)
+        for move in list(piece.moves):
+            context = f"{(row, col)} -> {(move.final.row, move.final.col)}"
+            board.move(piece, move, clear_moves=False, ai_minimax=True)
+            game.prepare_board_state_for_next_move()
+            assert_piece_lists(board, context)
+            if depth > 1:
+                walk(game, depth - 1)
+            game.undo_last_move()
+            assert_piece_lists(board, "undo of " + context)
+
+
+def test_piece_lists_follow_moves_and_undo():
+    walk(game_with_position(kiwipete_pieces(), W), 2)
+    walk(game_with_position(cpw_position3_pieces(), W), 3)
+    walk(game_with_position([(King(W), 7, 4), (Pawn(W), 1, 0), (King(B), 0, 7), (Rook(B), 0, 1)], W), 2)
+
+
+def test_position_set_up_square_by_square():
+    game = game_with_position([(King(W), 7, 4), (King(B), 0, 4)], W)
+    board = game.board
+    board.squares[7][4].piece = None
+    board.squares[6][6].piece = King(W)
+    board.squares[2][2].piece = Knight(B)
+    board.dump_to_squares_fast_method()
+    assert board.piece_squares == {W: {(6, 6)}, B: {(0, 4), (2, 2)}}
+    assert board.king_squares[W] == (6, 6)
+
+
+def test_game_end_routines_use_the_piece_lists():
+    # Qb7 next to the cornered King: mate; the same Queen on c7: stalemate
+    mate = game_with_position([(King(W), 2, 1), (Queen(W), 1, 1), (King(B), 0, 0)], B).board
+    stalemate = game_with_position([(King(W), 2, 1), (Queen(W), 1, 2), (King(B), 0, 0)], B).board
+    with contextlib.redirect_stdout(io.StringIO()):
+        assert mate.player_has_no_valid_moves(B) and mate.is_king_checked(B)
+        assert stalemate.player_has_no_valid_moves(B) and not stalemate.is_king_checked(B)
+        assert not mate.has_any_valid_move(B) and mate.has_any_valid_move(W)
+        assert not mate.player_has_no_valid_moves(W)
+
+    knight = game_with_position([(King(W), 7, 4), (Knight(W), 7, 1), (King(B), 0, 4)], W).board
+    knight.current_state.white_pieces_count, knight.current_state.black_pieces_count = 2, 1
+    rook = game_with_position([(King(W), 7, 4), (Rook(W), 7, 0), (King(B), 0, 4)], W).board
+    rook.current_state.white_pieces_count, rook.current_state.black_pieces_count = 2, 1
+    with contextlib.redirect_stdout(io.StringIO()):
+        assert knight.check_insufficient_mating_material()
+        assert not rook.check_insufficient_mating_material()
+
+
+if __name__ == "__main__":
+    tests = [(name, fn) for name, fn in sorted(globals().items()) if name.startswith("test_")]
+    for name, fn in tests:
+        fn()
+        print(f"OK: {name}")
+    print(f"All piece list tests passed.")
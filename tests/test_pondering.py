@@ -0,0 +1,95 @@
+"""Pondering on the human's time - IMPROVEMENTS.md item 2.24.
+
+- AI.predicted_reply() is the legal reply the last search stored in the
+  transposition table (none without a table)
+- a pondering SearchThread searches the position after the predicted reply, and
+  its ponder_key is the key of that position played on the Board
+- while pondering the time limit does not stop the search; ponder_hit() starts
+  the clock and the search then stops like a normal one
+
+Run standalone:  python .\tests\test_pondering.py
+Or with pytest:  pytest tests
+"""
+import contextlib
+import io
+import os
+import sys
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(REPO_ROOT, "tests"))
+sys.path.insert(0, os.path.join(REPO_ROOT, "src"))
+os.chdir(REPO_ROOT)  # asset paths inside src are relative to the repo root
+
+from const import COLS
+from bitboard import BitboardPosition, move_from, move_to
+from minimax import AI
+from search_thread import SearchThread
+from test_alpha_beta import game_at_middlegame, play
+from test_search_thread import wait_for_result
+
+
+def game_after_AI_move(ai):
+    game = game_at_middlegame()
+    with contextlib.redirect_stdout(io.StringIO()):
+        piece, move = ai.best_move(game, None)
+    game.prepare_board_state_for_next_move()
+    return game
+
+
+# the human's position after a depth 3 AI move, and the reply that search predicts
+def predicted_game_and_reply():
+    ai = AI(max_depth=3)
+    game = game_after_AI_move(ai)
+    reply = ai.predicted_reply(BitboardPosition.from_board(game.board, game.current_player))
+    assert reply, "no predicted reply"
+    return game, reply
+
+
+def test_predicted_reply_is_legal():
+    ai = AI(max_depth=3)
+    game = game_after_AI_move(ai)
+    position = BitboardPosition.from_board(game.board, game.current_player)
+    reply = ai.predicted_reply(position)
+    assert reply in position.generate_legal_moves()
+    assert AI(max_depth=3, tt_size_mb=0).predicted_reply(position) == 0
+
+
+def test_ponder_key_matches_the_predicted_position_on_the_board():
+    ai = AI(max_depth=2)
+    game, reply = predicted_game_and_reply()
+    with contextlib.redirect_stdout(io.StringIO()):
+        ponder = SearchThread(ai, game, ponder_move=reply)
+        wait_for_result(ponder)
+    play(game, divmod(move_from(reply), COLS), divmod(move_to(reply), COLS))
+    assert BitboardPosition.from_board(game.board, game.current_player).zobrist_key == ponder.ponder_key
+
+
+def test_time_limit_applies_only_after_ponder_hit():
+    ai = AI(max_depth=4, time_limit=0.001)
+    game, reply = predicted_game_and_reply()
+    with contextlib.redirect_stdout(io.StringIO()):
+        ponder = SearchThread(ai, game, ponder_move=reply)
+        move, _ = wait_for_result(ponder)
+    assert move is not None and ai.completed_depth == 4, "the time limit stopped the ponder search"
+
+    ai = AI(max_depth=12, time_limit=0.3)
+    game, reply = predicted_game_and_reply()
+    with contextlib.redirect_stdout(io.StringIO()):
+        ponder = SearchThread(ai, game, ponder_move=reply)
+        time.sleep(0.6)
+        assert ponder.thinking(), "the ponder search stopped before the ponder hit"
+        started = time.perf_counter()
+        ponder.ponder_hit()
+        move, _ = wait_for_result(ponder)
+    elapsed = time.perf_counter() - started
+    assert move is not None and not ai.pondering
+    assert elapsed < 2.0, f"a 0.3 s budget after the ponder hit took {elapsed:.2f} s"
+
+
+if __name__ == "__main__":
+    tests = [(name, fn) for name, fn in sorted(globals().items()) if name.startswith("test_")]
+    for name, fn in tests:
+        fn()
+        print(f"OK: {name}")
+    print(f"All pondering tests passed.")
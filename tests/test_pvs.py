@@ -0,0 +1,82 @@
+"""Principal variation search and aspiration windows - IMPROVEMENTS.md item 2.18.
+
+- PVS (null-window scouts with re-search) and the root aspiration windows give
+  the same root score as full-window alpha-beta, with fewer nodes
+- the root search stops at the first move failing high out of the aspiration
+  window and searches every move when all of them fail low
+- a failed aspiration window is widened and searched again, ending with the
+  full-window score
+
+Run standalone:  python .\tests\test_pvs.py
+Or with pytest:  pytest tests
+"""
+import contextlib
+import io
+import os
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(REPO_ROOT, "tests"))
+sys.path.insert(0, os.path.join(REPO_ROOT, "src"))
+os.chdir(REPO_ROOT)  # asset paths inside src are relative to the repo root
+
+import minimax
+from const import WHITE_PIECE_COLOR
+from bitboard import BitboardPosition
+from minimax import AI
+from test_perft import game_with_position, kiwipete_pieces, cpw_position3_pieces
+from test_alpha_beta import game_at_start, game_at_middlegame
+from test_parallel_search import WINDOW_INDEPENDENT
+
+
+def search(game, depth, **options):
+    ai = AI(max_depth=depth, **options)
+    with contextlib.redirect_stdout(io.StringIO()):
+        ai.best_move(game, None)
+    return ai
+
+
+def test_same_score_with_fewer_nodes():
+    games = (game_at_start, game_at_middlegame,
+             lambda: game_with_position(kiwipete_pieces(), WHITE_PIECE_COLOR),
+             lambda: game_with_position(cpw_position3_pieces(), WHITE_PIECE_COLOR))
+    for game_factory in games:
+        full = search(game_factory(), 3, pvs=False, aspiration=False)
+        pvs = search(game_factory(), 3)
+        assert pvs.best_score == full.best_score
+        assert pvs.nodes < full.nodes, f"PVS searched {pvs.nodes} nodes, full window {full.nodes}"
+
+
+def test_root_search_stops_on_fail_high_and_reports_fail_low():
+    ai = AI(max_depth=2)
+    ai.search_depth = 1
+    position = BitboardPosition.from_board(game_with_position(kiwipete_pieces(), WHITE_PIECE_COLOR).board,
+                                           WHITE_PIECE_COLOR)
+    root_moves = list(ai.collect_ordered_moves(position))
+    with contextlib.redirect_stdout(io.StringIO()):
+        score, move, scores = ai.search_root(None, None, position, root_moves, -6.0, -5.0)
+        assert score >= -5.0 and scores[-1] == (score, move) and len(scores) < len(root_moves), \
+            "the search stops at the first move failing high"
+        score, move, scores = ai.search_root(None, None, position, root_moves, 5.0, 6.0)
+        assert score <= 5.0 and len(scores) == len(root_moves), "every move fails low"
+
+
+def test_failed_aspiration_window_is_searched_again():
+    # without the reductions and pruning whose result depends on the window
+    full = search(game_at_middlegame(), 3, aspiration=False, **WINDOW_INDEPENDENT)
+    window = minimax.ASPIRATION_WINDOW
+    minimax.ASPIRATION_WINDOW = 0.0 # every iteration fails its window at least once
+    try:
+        narrow = search(game_at_middlegame(), 3, pvs=False, **WINDOW_INDEPENDENT)
+    finally:
+        minimax.ASPIRATION_WINDOW = window
+    assert narrow.researches >= 3
+    assert narrow.best_score == full.best_score
+
+
+if __name__ == "__main__":
+    tests = [(name, fn) for name, fn in sorted(globals().items()) if name.startswith("test_")]
+    for name, fn in tests:
+        fn()
+        print(f"OK: {name}")
+    print(f"All principal variation search tests passed.")
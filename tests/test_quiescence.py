@@ -0,0 +1,89 @@
+"""Quiescence search at the minimax horizon - IMPROVEMENTS.md item 2.16.
+
+- the captures-only generator emits exactly the captures (en passant included)
+  and Queen promotions of the full legal move list
+- captures are searched in MVV-LVA order
+- the AI no longer grabs a defended pawn with its Queen at the horizon, and
+  still takes a free piece
+- a 1-ply search with quiescence finds what a 2-ply search without it finds in
+  a simple exchange, while visiting fewer nodes
+
+Run standalone:  python .\tests\test_quiescence.py
+Or with pytest:  pytest tests
+"""
+import contextlib
+import io
+import os
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(REPO_ROOT, "tests"))
+sys.path.insert(0, os.path.join(REPO_ROOT, "src"))
+os.chdir(REPO_ROOT)  # asset paths inside src are relative to the repo root
+
+from const import WHITE_PIECE_COLOR, BLACK_PIECE_COLOR, ANY_PIECE
+from bitboard import BitboardPosition, MOVE_PROMOTION, move_from, move_captured, move_flag
+from minimax import AI, CAPTURE_VALUES
+from piece import King, Queen, Pawn, Knight, Rook, Bishop
+from test_perft import game_with_position, kiwipete_pieces, cpw_position3_pieces
+
+W, B = WHITE_PIECE_COLOR, BLACK_PIECE_COLOR
+
+
+def best_move_of(game, **options):
+    ai = AI(tt_size_mb=0, **options)
+    with contextlib.redirect_stdout(io.StringIO()):
+        piece, move = ai.best_move(game, None)
+    assert move is not None, "search unexpectedly found no move"
+    return ((move.initial.row, move.initial.col), (move.final.row, move.final.col)), ai
+
+
+def test_captures_only_generator_matches_full_list():
+    for pieces in (kiwipete_pieces(), cpw_position3_pieces()):
+        for color in (W, B):
+            position = BitboardPosition.from_board(game_with_position(pieces, color).board, color)
+            tactical = [move for move in position.generate_legal_moves()
+                        if move_captured(move) or move_flag(move) == MOVE_PROMOTION]
+            assert sorted(position.generate_legal_captures()) == sorted(tactical)
+
+
+def test_captures_are_ordered_mvv_lva():
+    # the Queen on d5 is attacked by a pawn and a rook, the Knight on f5 by the pawn
+    game = game_with_position([(King(W), 7, 4), (Pawn(W), 4, 4), (Rook(W), 3, 0),
+                               (King(B), 0, 4), (Queen(B), 3, 3), (Knight(B), 3, 5)], W)
+    position = BitboardPosition.from_board(game.board, W)
+    captures = AI().collect_ordered_captures(position, 0)
+    order = [(CAPTURE_VALUES[position.mailbox[move_from(move)] & ANY_PIECE], CAPTURE_VALUES[move_captured(move)])
+             for move in captures]
+    # pawn takes Queen, rook takes Queen, pawn takes Knight
+    assert order == [(1.0, 9.0), (5.0, 9.0), (1.0, 3.0)]
+
+
+def test_queen_does_not_take_defended_pawn():
+    # Qxd5 wins a pawn at the horizon of a 1-ply search, but exd5 wins the Queen back
+    pieces = [(King(W), 7, 4), (Queen(W), 7, 3), (Pawn(W), 6, 0),
+              (King(B), 0, 4), (Pawn(B), 3, 3), (Pawn(B), 2, 4)]
+    greedy, _ = best_move_of(game_with_position(pieces, W), max_depth=0, quiescence=False)
+    assert greedy == ((7, 3), (3, 3)), "without quiescence the 1-ply search takes the pawn"
+    quiet, _ = best_move_of(game_with_position(pieces, W), max_depth=0)
+    assert quiet != ((7, 3), (3, 3)), "quiescence must see the pawn recapture"
+
+
+def test_takes_a_hanging_piece_and_matches_deeper_search():
+    # the black Bishop on b4 hangs to Nxb4; the Knight on d3 would be lost after Nxe5?? dxe5
+    pieces = [(King(W), 7, 6), (Knight(W), 5, 3), (Pawn(W), 6, 0),
+              (King(B), 0, 6), (Bishop(B), 4, 1), (Pawn(B), 3, 4), (Pawn(B), 2, 3)]
+    deep, deep_ai = best_move_of(game_with_position(pieces, W), max_depth=1, quiescence=False)
+    quiet, quiet_ai = best_move_of(game_with_position(pieces, W), max_depth=0)
+    assert quiet == deep == ((5, 3), (4, 1))
+    # same material won - the piece-square terms differ by the quiet reply of the deeper search
+    assert abs(quiet_ai.best_score - deep_ai.best_score) < 0.5
+    assert quiet_ai.nodes < deep_ai.nodes
+
+
+if __name__ == "__main__":
+    tests = [(name, fn) for name, fn in sorted(globals().items()) if name.startswith("test_")]
+    for name, fn in tests:
+        fn()
+        print(f"OK: {name}")
+    print(f"All quiescence tests passed.")
@@ -0,0 +1,99 @@
+"""Background AI search for the GUI - IMPROVEMENTS.md item 2.23.
+
+- SearchThread runs the search off the calling thread: the caller keeps running
+  while it thinks, and the move it hands back is the move best_move() plays
+- setting Game.stopAI (SearchThread.cancel()) stops the search within moments,
+  even during the first iteration, and the thread hands back no move
+- the search thread never touches the Board
+- an exception raised by the search is re-raised by result() in the calling
+  thread instead of leaving it waiting for a move
+
+Run standalone:  python .\tests\test_search_thread.py
+Or with pytest:  pytest tests
+"""
+import contextlib
+import io
+import os
+import queue
+import sys
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(REPO_ROOT, "tests"))
+sys.path.insert(0, os.path.join(REPO_ROOT, "src"))
+os.chdir(REPO_ROOT)  # asset paths inside src are relative to the repo root
+
+from minimax import AI
+from search_thread import SearchThread
+from test_alpha_beta import game_at_middlegame
+
+
+def wait_for_result(search, timeout=30.0):
+    started = time.perf_counter()
+    polls = 0
+    while time.perf_counter() - started < timeout:
+        try:
+            return search.result(), polls
+        except queue.Empty:
+            polls += 1 # the caller is free to do other work (draw frames) meanwhile
+            time.sleep(0.01)
+    raise AssertionError("the search thread did not finish in time")
+
+
+def test_background_search_plays_the_best_move():
+    expected_game = game_at_middlegame()
+    with contextlib.redirect_stdout(io.StringIO()):
+        expected_piece, expected_move = AI(max_depth=3, iterative_deepening=False).best_move(expected_game, None)
+
+    game = game_at_middlegame()
+    placement_before = [row[:] for row in game.board.squares_fast_method]
+    ai = AI(max_depth=3, iterative_deepening=False)
+    with contextlib.redirect_stdout(io.StringIO()):
+        search = SearchThread(ai, game)
+        move, polls = wait_for_result(search)
+        assert game.board.squares_fast_method == placement_before, "the search thread changed the Board"
+        piece, board_move = ai.play_move(game, move)
+    assert polls > 0, "the search blocked the calling thread"
+    assert board_move == expected_move
+    assert ai.stop_game is None
+
+
+def test_cancel_stops_the_first_iteration():
+    game = game_at_middlegame()
+    ai = AI(max_depth=8, iterative_deepening=False)
+    with contextlib.redirect_stdout(io.StringIO()):
+        search = SearchThread(ai, game)
+        time.sleep(0.2)
+        assert search.thinking()
+        started = time.perf_counter()
+        search.cancel()
+        elapsed = time.perf_counter() - started
+    assert elapsed < 1.0, f"cancel took {elapsed:.2f} s"
+    assert search.result() is None, "a cancelled search must not hand back a move"
+    assert not search.thinking()
+
+
+def test_search_error_is_re_raised_by_result():
+    game = game_at_middlegame()
+    ai = AI(max_depth=3)
+    def failing_search(game_state, screen, position):
+        raise RuntimeError("search failed")
+    ai.search_position = failing_search
+    search = SearchThread(ai, game)
+    search.thread.join()
+    assert not search.thinking()
+    try:
+        search.result()
+    except RuntimeError as error:
+        assert str(error) == "search failed"
+    else:
+        raise AssertionError("result() must re-raise the exception of the search")
+    assert ai.stop_game is None
+
+
+if __name__ == "__main__":
+    tests = [(name, fn) for name, fn in sorted(globals().items()) if name.startswith("test_")]
+    for name, fn in tests:
+        fn()
+        print(f"OK: {name}")
+    print(f"All search thread tests passed.")
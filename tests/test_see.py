@@ -0,0 +1,102 @@
+"""Static exchange evaluation - IMPROVEMENTS.md item 2.27.
+
+- BitboardPosition.see() resolves the whole capture sequence on the square: a
+  Queen taking a defended pawn loses material, a rook backed by a second rook
+  on the file (x-ray) wins the pawn, and the King never recaptures into a
+  defended square
+- collect_ordered_moves() puts losing captures after the quiet moves and keeps
+  the other captures in front
+- AI(see=True) keeps the root score and move of AI(see=False) with fewer nodes
+
+Run standalone:  python .\tests\test_see.py
+Or with pytest:  pytest tests
+"""
+import contextlib
+import io
+import os
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(REPO_ROOT, "tests"))
+sys.path.insert(0, os.path.join(REPO_ROOT, "src"))
+os.chdir(REPO_ROOT)  # asset paths inside src are relative to the repo root
+
+from const import WHITE_PIECE_COLOR, BLACK_PIECE_COLOR
+from bitboard import BitboardPosition, QUIET_BITS, square_index, move_from, move_to
+from minimax import AI
+from piece import King, Queen, Rook, Knight, Pawn
+from test_perft import game_with_position, kiwipete_pieces
+from test_alpha_beta import game_at_middlegame
+
+W, B = WHITE_PIECE_COLOR, BLACK_PIECE_COLOR
+
+
+def position_of(pieces):
+    return BitboardPosition.from_board(game_with_position(pieces, W).board, W)
+
+
+def see_of(pieces, from_sq, to_sq):
+    position = position_of(pieces)
+    move = next(move for move in position.generate_legal_moves()
+                if move_from(move) == square_index(*from_sq) and move_to(move) == square_index(*to_sq))
+    return position.see(move)
+
+
+def test_queen_takes_defended_pawn_and_pawn_takes_knight():
+    pieces = [(King(W), 7, 7), (Queen(W), 7, 3), (Pawn(W), 4, 2),
+              (King(B), 0, 0), (Pawn(B), 3, 3), (Pawn(B), 2, 4), (Knight(B), 3, 1)]
+    assert see_of(pieces, (7, 3), (3, 3)) == 1.0 - 9.0 # Qxd5 exd5
+    assert see_of(pieces, (4, 2), (3, 1)) == 3.0       # cxb5, nothing recaptures
+    assert see_of(pieces, (4, 2), (3, 3)) == 1.0       # cxd5 exd5 Qxd5
+
+
+def test_x_ray_attackers_join_the_exchange():
+    # Rxe5 Rxe5 Rxe5: the e1 rook behind the e2 rook recaptures
+    doubled = [(King(W), 7, 7), (Rook(W), 7, 4), (Rook(W), 6, 4),
+               (King(B), 0, 0), (Pawn(B), 3, 4), (Rook(B), 0, 4)]
+    assert see_of(doubled, (6, 4), (3, 4)) == 1.0
+    single = [(King(W), 7, 7), (Rook(W), 7, 3), (Rook(W), 6, 4),
+              (King(B), 0, 0), (Pawn(B), 3, 4), (Rook(B), 0, 4)]
+    assert see_of(single, (6, 4), (3, 4)) == 1.0 - 5.0
+
+
+def test_king_does_not_recapture_a_defended_square():
+    guarded = [(King(W), 7, 7), (Rook(W), 7, 4), (Knight(W), 3, 3), (King(B), 0, 4), (Pawn(B), 1, 4)]
+    assert see_of(guarded, (7, 4), (1, 4)) == 1.0 # Rxe7, Kxe7 is illegal (Nd5)
+    unguarded = [(King(W), 7, 7), (Rook(W), 7, 4), (King(B), 0, 4), (Pawn(B), 1, 4)]
+    assert see_of(unguarded, (7, 4), (1, 4)) == 1.0 - 5.0
+
+
+def test_losing_captures_are_ordered_after_quiet_moves():
+    position = position_of([(King(W), 7, 7), (Queen(W), 7, 3), (Pawn(W), 4, 2),
+                            (King(B), 0, 0), (Pawn(B), 3, 3), (Pawn(B), 2, 4), (Knight(B), 3, 1)])
+    ordered = list(AI().collect_ordered_moves(position, 1))
+    queen_takes = next(move for move in ordered if move_from(move) == square_index(7, 3)
+                       and move_to(move) == square_index(3, 3))
+    assert ordered[-1] == queen_takes
+    assert ordered[0] < QUIET_BITS and ordered[1] < QUIET_BITS # cxb5, cxd5
+    assert all(move >= QUIET_BITS for move in ordered[2:-1])
+
+
+def search(game, see):
+    ai = AI(max_depth=3, see=see)
+    with contextlib.redirect_stdout(io.StringIO()):
+        piece, move = ai.best_move(game, None)
+    return ai, (move.initial.row, move.initial.col, move.final.row, move.final.col)
+
+
+def test_same_result_with_fewer_nodes():
+    for game_factory in (game_at_middlegame, lambda: game_with_position(kiwipete_pieces(), W)):
+        plain, plain_move = search(game_factory(), False)
+        see, see_move = search(game_factory(), True)
+        assert (see.best_score, see_move) == (plain.best_score, plain_move)
+        assert see.see_pruned > 0
+        assert see.nodes < plain.nodes, f"{see.nodes} nodes with SEE, {plain.nodes} without"
+
+
+if __name__ == "__main__":
+    tests = [(name, fn) for name, fn in sorted(globals().items()) if name.startswith("test_")]
+    for name, fn in tests:
+        fn()
+        print(f"OK: {name}")
+    print(f"All static exchange evaluation tests passed.")
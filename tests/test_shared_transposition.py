@@ -0,0 +1,109 @@
+"""Shared-memory transposition table - IMPROVEMENTS.md item 2.22.
+
+- SharedTranspositionTable: the same probe/store results, replacement scheme and
+  counters as TranspositionTable
+- a slot whose XOR check word does not match (a half-written entry) is a miss
+- a table passed to another process attaches to the same shared memory: stores
+  of either process are found by the other
+- the parallel search with AI(shared_tt=True) keeps the single-process root
+  score and move, and its workers' results end up in the main process's table
+
+Run standalone:  python .\tests\test_shared_transposition.py
+Or with pytest:  pytest tests
+"""
+import contextlib
+import io
+import multiprocessing
+import os
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(REPO_ROOT, "tests"))
+sys.path.insert(0, os.path.join(REPO_ROOT, "src"))
+os.chdir(REPO_ROOT)  # asset paths inside src are relative to the repo root
+
+from bitboard import BitboardPosition
+from minimax import AI
+from transposition import SharedTranspositionTable, TT_EXACT, TT_LOWER, TT_UPPER
+from test_alpha_beta import game_at_middlegame
+from test_parallel_search import WINDOW_INDEPENDENT, search
+
+
+def store_and_probe(tt, key, other_key):
+    # runs in a pool worker: 'tt' arrives pickled as the name of the shared block
+    tt.store(key, 2, -0.75, TT_LOWER, 99)
+    return tt.probe(other_key)
+
+
+def test_store_probe_and_replacement():
+    tt = SharedTranspositionTable(1)
+    try:
+        key = 0x1234_5678_9ABC_DEF0
+        assert tt.probe(key) is None
+        tt.store(key, 3, 1.5, TT_EXACT, 4242)
+        assert tt.probe(key) == (3, 1.5, TT_EXACT, 4242)
+        assert (tt.hits, tt.misses, tt.collisions) == (1, 1, 0)
+        deep, shallow, newest = 5, 5 + (tt.bucket_mask + 1), 5 + 2 * (tt.bucket_mask + 1)
+        tt.store(deep, 4, 1.0, TT_LOWER, 1)
+        tt.store(shallow, 2, -2.0, TT_UPPER, 2)  # shallower: goes to the always-replace slot
+        tt.store(newest, 1, 3.0, TT_EXACT, 3)    # replaces the always-replace slot only
+        assert tt.probe(deep) == (4, 1.0, TT_LOWER, 1)
+        assert tt.probe(shallow) is None
+        assert tt.probe(newest) == (1, 3.0, TT_EXACT, 3)
+        assert tt.collisions == 1
+        tt.clear()
+        assert tt.probe(deep) is None
+    finally:
+        tt.close()
+
+
+def test_half_written_slot_is_a_miss():
+    tt = SharedTranspositionTable(1)
+    try:
+        key = 0x0FED_CBA9_8765_4321
+        tt.store(key, 3, 1.5, TT_EXACT, 4242)
+        slot = (key & tt.bucket_mask) * 2 * tt.SLOT_WORDS
+        tt.words[slot + 1] ^= 1 # the score word of another store landed, the check word not yet
+        assert tt.probe(key) is None
+    finally:
+        tt.close()
+
+
+def test_table_is_shared_with_another_process():
+    tt = SharedTranspositionTable(1)
+    try:
+        tt.store(111, 4, 2.5, TT_EXACT, 7)
+        with multiprocessing.get_context("spawn").Pool(1) as pool:
+            seen_by_worker = pool.apply(store_and_probe, (tt, 222, 111))
+        assert seen_by_worker == (4, 2.5, TT_EXACT, 7)
+        assert tt.probe(222) == (2, -0.75, TT_LOWER, 99)
+    finally:
+        tt.close()
+
+
+def test_parallel_search_with_shared_table():
+    single = AI(max_depth=3, iterative_deepening=False, **WINDOW_INDEPENDENT)
+    parallel = AI(max_depth=3, iterative_deepening=False, workers=2, shared_tt=True, **WINDOW_INDEPENDENT)
+    try:
+        expected = search(single, game_at_middlegame())
+        game = game_at_middlegame()
+        root = BitboardPosition.from_board(game.board, game.current_player)
+        result = search(parallel, game)
+        # the positions after the root moves were stored by the workers
+        stored = 0
+        for move in root.generate_legal_moves():
+            root.make_move(move)
+            stored += parallel.tt.probe(root.zobrist_key) is not None
+            root.unmake_move()
+    finally:
+        parallel.close()
+    assert result == expected, f"shared table search {result} != single process {expected}"
+    assert stored > 0, "no worker result reached the main process's table"
+
+
+if __name__ == "__main__":
+    tests = [(name, fn) for name, fn in sorted(globals().items()) if name.startswith("test_")]
+    for name, fn in tests:
+        fn()
+        print(f"OK: {name}")
+    print(f"All shared transposition table tests passed.")
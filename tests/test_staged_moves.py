@@ -0,0 +1,89 @@
+"""Staged lazy move picker - IMPROVEMENTS.md item 2.29.
+
+- generate_legal_captures() and generate_legal_quiets() split the legal moves:
+  together they are generate_legal_moves(), with no move in both
+- BitboardPosition.is_legal_move() accepts exactly the moves the generator
+  produces, for moves taken from other positions of the tree (killers, table moves)
+- AI.staged_moves() yields the moves of collect_ordered_moves() in the same order
+  (table move, captures, killers, countermove / history, losing captures)
+- the quiet moves are not generated while the table move and the captures are
+  searched
+
+Run standalone:  python .\tests\test_staged_moves.py
+Or with pytest:  pytest tests
+"""
+import contextlib
+import io
+import os
+import random
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(REPO_ROOT, "tests"))
+sys.path.insert(0, os.path.join(REPO_ROOT, "src"))
+os.chdir(REPO_ROOT)  # asset paths inside src are relative to the repo root
+
+from bitboard import QUIET_BITS
+from minimax import AI
+from test_frontier import root_positions, positions_in_tree
+from test_alpha_beta import game_at_middlegame
+
+
+def tree_positions(depth):
+    for root in root_positions():
+        yield from positions_in_tree(root, depth)
+
+
+def test_captures_and_quiets_split_the_legal_moves():
+    for position in tree_positions(2):
+        captures = position.generate_legal_captures()
+        quiets = position.generate_legal_quiets()
+        assert sorted(captures + quiets) == sorted(position.generate_legal_moves())
+        assert not set(captures) & set(quiets)
+
+
+def test_is_legal_move_matches_the_generator():
+    candidates = set()
+    for position in tree_positions(1):
+        candidates.update(position.generate_pseudo_moves())
+    for position in tree_positions(1):
+        legal = set(position.generate_legal_moves())
+        for move in candidates:
+            assert position.is_legal_move(move) == (move in legal), f"move {move}"
+        assert not position.is_legal_move(0)
+
+
+def test_same_order_as_collect_ordered_moves():
+    ai = AI(max_depth=3)
+    with contextlib.redirect_stdout(io.StringIO()):
+        ai.best_move(game_at_middlegame(), None) # fills the history and countermove tables
+    rng = random.Random(7)
+    for position in tree_positions(2):
+        moves = position.generate_legal_moves()
+        if not moves:
+            continue
+        quiets = [move for move in moves if move >= QUIET_BITS] or [0]
+        for ply in (0, 1, 2):
+            ai.killers[ply] = [rng.choice(quiets), rng.choice(quiets)]
+            first_move = rng.choice(moves + [0])
+            expected = list(ai.collect_ordered_moves(position, ply, first_move))
+            assert list(ai.staged_moves(position, ply, first_move)) == expected
+
+
+def test_quiet_moves_generated_only_when_needed():
+    position = next(root_positions()) # Kiwipete: 8 captures
+    ai = AI(see=False)
+    staged = ai.staged_moves(position, 1)
+    searched = [next(staged) for _ in position.generate_legal_captures()]
+    assert all(move < QUIET_BITS or move & 0x3F for move in searched) # captures and promotions
+    assert ai.quiet_buffers[1] == []
+    searched += list(staged)
+    assert sorted(searched) == sorted(position.generate_legal_moves()) and ai.quiet_buffers[1]
+
+
+if __name__ == "__main__":
+    tests = [(name, fn) for name, fn in sorted(globals().items()) if name.startswith("test_")]
+    for name, fn in tests:
+        fn()
+        print(f"OK: {name}")
+    print(f"All staged move picker tests passed.")
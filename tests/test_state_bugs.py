@@ -55,7 +55,7 @@ def play(board, from_sq, to_sq):
 def game_play(game, from_sq, to_sq):
     """Make a move the way minimax does: move on the current board state, then
     prepare the next one."""
-    board = game.board_states[game.move_count]
+    board = game.board
     piece = play(board, from_sq, to_sq)
     game.prepare_board_state_for_next_move()
     return piece
@@ -68,7 +68,7 @@ def test_capture_sets_flag_and_decrements_counter_without_external_call():
     game_play(game, (6, 4), (4, 4))   # 1. e4
     game_play(game, (1, 3), (3, 3))   # 1... d5
     game_play(game, (4, 4), (3, 3))   # 2. exd5 - no set_capturing_move_flag() call
-    state = game.board_states[game.move_count].current_state
+    state = game.board.current_state
     assert state.captured, "a capture must set the captured flag inside move() itself"
     assert state.black_pieces_count == 15, "black must be one piece down after exd5"
     assert state.white_pieces_count == 16
@@ -78,9 +78,9 @@ def test_stale_captured_flag_is_not_reused_for_a_quiet_move():
     game = Game()
     # poison the flag the way stale search state used to: pretend the previous
     # node was a capture
-    game.board_states[game.move_count].current_state.captured = True
+    game.board.current_state.captured = True
     game_play(game, (7, 6), (5, 5))   # 1. Nf3 - a quiet move
-    state = game.board_states[game.move_count].current_state
+    state = game.board.current_state
     assert not state.captured, "a quiet move must clear the captured flag"
     assert state.white_pieces_count == 16 and state.black_pieces_count == 16, \
         "a quiet move must not decrement any piece counter"
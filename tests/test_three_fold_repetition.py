@@ -2,9 +2,8 @@
 
 The old method was dead code: it returned False on its first line and referenced
 a field (last_n_board_positions) that no longer exists. The new implementation
-compares position keys built from the per-state squares_fast_method snapshots
-(the only reliable history - Piece objects are shared between board states) and
-follows FIDE article 9.2: same placement, same side to move, same castling
+compares the Zobrist position keys recorded in Game.position_history (IMPROVEMENTS.md
+item 2.13) and follows FIDE article 9.2: same placement, same side to move, same castling
 rights, same en passant flag. The moved-flag of pieces other than the castling
 king/rooks must NOT distinguish positions, while lost castling rights MUST.
 
@@ -21,6 +20,7 @@ os.chdir(REPO_ROOT)  # asset paths inside src are relative to the repo root
 from const import WHITE_PIECE_COLOR, BLACK_PIECE_COLOR
 from game import Game
 from piece import King, Pawn, Rook
+from zobrist import CASTLING_KEYS
 from test_perft import game_with_position
 
 
@@ -36,7 +36,7 @@ def play(board, from_sq, to_sq):
 
 
 def game_play(game, from_sq, to_sq):
-    play(game.board_states[game.move_count], from_sq, to_sq)
+    play(game.board, from_sq, to_sq)
     game.prepare_board_state_for_next_move()
 
 
@@ -54,7 +54,7 @@ def test_knight_shuffle_detected_on_third_occurrence():
             assert not detected, f"false repetition report after ply {ply}"
         else:
             # start position occurred at ply 0, 4 and 8 (the initial occurrence
-            # must count even though board_states[0] was overwritten by ply 1)
+            # must count although the board has been updated in place since)
             assert detected, "third occurrence of the start position not detected"
     assert game.three_fold_repetition_detected
     assert game.check_draw(), "check_draw() must report the repetition draw"
@@ -67,7 +67,7 @@ def test_gui_timing_before_prepare_also_detected():
     moves = KNIGHT_SHUFFLE * 2
     for from_sq, to_sq in moves[:-1]:
         game_play(game, from_sq, to_sq)
-    play(game.board_states[game.move_count], *moves[-1])  # last ply: no prepare
+    play(game.board, *moves[-1])  # last ply: no prepare
     assert game.check_three_fold_repetition(), \
         "repetition not detected at the GUI (pre-prepare) call timing"
 
@@ -83,15 +83,18 @@ def test_lost_castling_rights_distinguish_positions():
     identical. The moved-flags themselves must NOT leak into the placement component
     (they enter only through the rights)."""
     game = game_with_position(rooks_and_kings(), WHITE_PIECE_COLOR)
-    key_with_rights = game.position_key(0)  # board_states[0] keeps the initial snapshot
+    key_with_rights = game.position_history[0]  # key of the initial position
+    rights_before = game.board.castling_rights()
     shuffle = [((7, 7), (6, 7)), ((0, 7), (1, 7)),
                ((6, 7), (7, 7)), ((1, 7), (0, 7))]
     for from_sq, to_sq in shuffle:
         game_play(game, from_sq, to_sq)
-    key_after_shuffle = game.position_key(4)  # home placement again, rights burned
-    assert key_after_shuffle[0] == key_with_rights[0], \
+    key_after_shuffle = game.position_key()  # home placement again, rights burned
+    rights_after = game.board.castling_rights()
+    assert rights_after != rights_before
+    assert key_after_shuffle ^ CASTLING_KEYS[rights_after] == key_with_rights ^ CASTLING_KEYS[rights_before], \
         "identical placement expected - moved flags must be masked out of it"
-    assert key_after_shuffle[2] != key_with_rights[2], \
+    assert key_after_shuffle != key_with_rights, \
         "burned castling rights must make the position distinct"
 
 
@@ -115,15 +118,26 @@ def test_rook_shuffle_repetition_detected():
 def test_en_passant_flag_distinguishes_positions():
     game = game_with_position(
         rooks_and_kings() + [(Pawn(BLACK_PIECE_COLOR), 3, 3)], WHITE_PIECE_COLOR)
-    board = game.board_states[game.move_count]
-    key_without_flag = game.position_key(game.move_count)
-    board.squares[3][3].piece.en_passant = True
-    board.dump_to_squares_fast_method()
-    key_with_flag = game.position_key(game.move_count)
+    board = game.board
+    key_without_flag = game.position_key()
+    board.current_state.en_passant_pawn = (3, 3)
+    board.setup_position(WHITE_PIECE_COLOR)
+    key_with_flag = game.position_key()
     assert key_with_flag != key_without_flag, \
         "an en-passant-capturable pawn must make the position distinct"
 
 
+def test_position_set_up_by_hand_gets_its_own_key():
+    # a Game edited square by square must not keep the key of the start position
+    game = Game()
+    start_key = game.position_key()
+    game.board.squares[7][3].piece = None # no white Queen
+    game.setup_position(BLACK_PIECE_COLOR)
+    assert game.position_key() == game.board.compute_zobrist_key(BLACK_PIECE_COLOR) != start_key
+    assert game.position_history == [game.position_key()]
+    assert game.current_player == game.board.current_state.player_color == BLACK_PIECE_COLOR
+
+
 def test_no_false_positive_in_normal_opening():
     game = Game()
     for from_sq, to_sq in [((6, 4), (4, 4)), ((1, 4), (3, 4)),
@@ -0,0 +1,113 @@
+"""Transposition table and Zobrist keys - IMPROVEMENTS.md item 2.14.
+
+- TranspositionTable: probe/store round trip, depth-preferred + always-replace
+  buckets, hit/miss/collision counters, mate scores stored relative to the node
+- BitboardPosition.zobrist_key: the incrementally updated key equals a full
+  recomputation in every node of the tested trees, and equals the Board key of
+  the same position
+- AI with the table chooses the same root move and score as without it, while
+  analyzing fewer moves
+
+Run standalone:  python .\tests\test_transposition.py
+Or with pytest:  pytest tests
+"""
+import contextlib
+import io
+import os
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(REPO_ROOT, "tests"))
+sys.path.insert(0, os.path.join(REPO_ROOT, "src"))
+os.chdir(REPO_ROOT)  # asset paths inside src are relative to the repo root
+
+from const import WHITE_PIECE_COLOR, BLACK_PIECE_COLOR, MATE_SCORE
+from bitboard import BitboardPosition
+from minimax import AI
+from transposition import (TranspositionTable, TT_EXACT, TT_LOWER, TT_UPPER, score_to_tt,
+                           score_from_tt)
+from test_perft import game_with_position, kiwipete_pieces, cpw_position3_pieces
+from test_alpha_beta import game_at_start, game_at_middlegame
+
+
+def test_store_and_probe():
+    tt = TranspositionTable(1)
+    key = 0x1234_5678_9ABC_DEF0
+    assert tt.probe(key) is None
+    tt.store(key, 3, 1.5, TT_EXACT, 4242)
+    assert tt.probe(key) == (3, 1.5, TT_EXACT, 4242)
+    assert (tt.hits, tt.misses, tt.collisions) == (1, 1, 0)
+    # same bucket, other position: a miss counted as a collision
+    assert tt.probe(key + tt.bucket_mask + 1) is None
+    assert tt.collisions == 1
+
+
+def test_depth_preferred_and_always_replace_slots():
+    tt = TranspositionTable(1)
+    deep, shallow, newest = 5, 5 + (tt.bucket_mask + 1), 5 + 2 * (tt.bucket_mask + 1)
+    tt.store(deep, 4, 1.0, TT_LOWER, 1)
+    tt.store(shallow, 2, 2.0, TT_UPPER, 2)   # shallower: goes to the always-replace slot
+    assert tt.probe(deep) == (4, 1.0, TT_LOWER, 1)
+    assert tt.probe(shallow) == (2, 2.0, TT_UPPER, 2)
+    tt.store(newest, 1, 3.0, TT_EXACT, 3)    # replaces the always-replace slot only
+    assert tt.probe(deep) is not None
+    assert tt.probe(shallow) is None
+    assert tt.probe(newest) == (1, 3.0, TT_EXACT, 3)
+    tt.store(deep, 1, 0.5, TT_EXACT, 7)      # the same position may always be updated
+    assert tt.probe(deep) == (1, 0.5, TT_EXACT, 7)
+
+
+def test_mate_scores_are_stored_relative_to_the_node():
+    # white mates 3 plies below a node at ply 2: MATE_SCORE - 5 at the root
+    stored = score_to_tt(MATE_SCORE - 5, 2)
+    assert score_from_tt(stored, 2) == MATE_SCORE - 5
+    # the same node reached at ply 4: the mate is 2 plies further from the root
+    assert score_from_tt(stored, 4) == MATE_SCORE - 7
+    assert score_from_tt(score_to_tt(-(MATE_SCORE - 5), 2), 4) == -(MATE_SCORE - 7)
+    assert score_from_tt(score_to_tt(1.5, 2), 4) == 1.5
+
+
+def assert_incremental_keys(position, depth):
+    assert position.zobrist_key == position.compute_zobrist_key()
+    if depth == 0:
+        return
+    for move in position.generate_legal_moves():
+        position.make_move(move)
+        assert_incremental_keys(position, depth - 1)
+        position.unmake_move()
+    assert position.zobrist_key == position.compute_zobrist_key()
+
+
+def test_bitboard_zobrist_key_is_incremental():
+    # castling, captures, promotions (kiwipete) and en passant (CPW position 3)
+    for pieces, depth in ((kiwipete_pieces(), 2), (cpw_position3_pieces(), 3)):
+        for color in (WHITE_PIECE_COLOR, BLACK_PIECE_COLOR):
+            game = game_with_position(pieces, color)
+            position = BitboardPosition.from_board(game.board, color)
+            assert position.zobrist_key == game.board.current_state.zobrist_key, \
+                "Board and BitboardPosition must hash the same position to the same key"
+            assert_incremental_keys(position, depth)
+
+
+def search(game_factory, depth, tt_size_mb):
+    ai = AI(max_depth=depth, tt_size_mb=tt_size_mb, iterative_deepening=False)
+    with contextlib.redirect_stdout(io.StringIO()):
+        piece, move = ai.best_move(game_factory(), None)
+    return ai.best_score, (move.initial.row, move.initial.col, move.final.row, move.final.col), ai.moves_analyzed
+
+
+def test_search_with_table_chooses_the_same_move():
+    for game_factory in (game_at_start, game_at_middlegame):
+        score, move, moves_analyzed = search(game_factory, 3, 0)
+        tt_score, tt_move, tt_moves_analyzed = search(game_factory, 3, 1)
+        assert (tt_score, tt_move) == (score, move)
+        assert tt_moves_analyzed < moves_analyzed, \
+            f"the table must save work: {tt_moves_analyzed} vs {moves_analyzed} moves analyzed"
+
+
+if __name__ == "__main__":
+    tests = [(name, fn) for name, fn in sorted(globals().items()) if name.startswith("test_")]
+    for name, fn in tests:
+        fn()
+        print(f"OK: {name}")
+    print(f"All transposition table tests passed.")
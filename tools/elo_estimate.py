@@ -22,6 +22,7 @@ Usage:
     python .\tools\elo_estimate.py                  # 100 games, depth 2, ~1 h
     python .\tools\elo_estimate.py --quick          # 20 games, rough estimate
     python .\tools\elo_estimate.py --games 40 --depth 3 --levels 1320 1500
+    python .\tools\elo_estimate.py --depth 4 --time-limit 1   # at most ~1 s per app move
     python .\tools\elo_estimate.py --selftest       # verify the Elo math only
 """
 import argparse
@@ -98,16 +99,16 @@ def uci_to_squares(uci):
 
 
 class AppEngine:
-    def __init__(self, depth):
+    def __init__(self, depth, time_limit=None, workers=1):
         self.game = Game()
-        self.ai = AI(max_depth=depth)
+        self.ai = AI(max_depth=depth, time_limit=time_limit, workers=workers)
 
     def push_uci(self, uci):
         """Apply an external (opening or Stockfish) move to the app's board."""
         if len(uci) == 5 and uci[4] != "q":
             raise GameDiscarded(f"underpromotion {uci} not representable (app auto-queens)")
         (from_row, from_col), to_sq = uci_to_squares(uci)
-        board = self.game.board_states[self.game.move_count]
+        board = self.game.board
         piece = board.squares[from_row][from_col].piece
         if piece is None:
             raise GameDiscarded(f"no piece on origin square of {uci} (desync)")
@@ -135,7 +136,7 @@ class AppEngine:
 
     def board_fen(self):
         """Piece placement in FEN form, for the desync check."""
-        board = self.game.board_states[self.game.move_count]
+        board = self.game.board
         ranks = []
         for row in range(8):
             rank, empties = "", 0
@@ -171,9 +172,17 @@ def adjudicate(engine, chess_board, level):
     return 0.5, "adjudicated %d cp" % cp
 
 
-def play_game(engine, level, depth, movetime, opening, app_is_white):
+def play_game(engine, level, depth, movetime, opening, app_is_white, time_limit=None, workers=1):
     """Play one game; returns (score for the app in {0, 0.5, 1}, reason)."""
-    app = AppEngine(depth)
+    app = AppEngine(depth, time_limit, workers)
+    try:
+        return play_app_game(app, engine, level, movetime, opening, app_is_white)
+    finally:
+        app.ai.close()
+
+
+def play_app_game(app, engine, level, movetime, opening, app_is_white):
+    """The game loop of play_game(), on an already created AppEngine."""
     chess_board = chess.Board()
     for uci in opening:
         app.push_uci(uci)
@@ -333,6 +342,10 @@ def main():
     parser.add_argument("--depth", type=int, default=2)
     parser.add_argument("--levels", type=int, nargs="+", default=[1320, 1400, 1500, 1700])
     parser.add_argument("--movetime", type=float, default=0.05)
+    parser.add_argument("--time-limit", type=float, default=None,
+                        help="app seconds per move (iterative deepening up to --depth)")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="app processes searching root moves in parallel")
     parser.add_argument("--seed", type=int, default=1)
     parser.add_argument("--stockfish", default=None)
     parser.add_argument("--quick", action="store_true", help="20 games, rough estimate")
@@ -376,7 +389,8 @@ def main():
                 opening = OPENINGS[rng.randrange(len(OPENINGS))]
                 try:
                     score, reason = play_game(engine, level, args.depth,
-                                              args.movetime, opening, app_is_white)
+                                              args.movetime, opening, app_is_white,
+                                              args.time_limit, args.workers)
                 except GameDiscarded as exc:
                     discarded += 1
                     print(f"game {game_no}: DISCARDED - {exc}")